@@ -0,0 +1,282 @@
+"""
+Benchmark for the CONJURE sculpting kernels.
+
+Drives deform_mesh_with_viscosity (every brush, every radius level) and the
+legacy deform_mesh on synthetic icospheres and on the sample generated model,
+feeding them a replayed fingertip stream through the same hand-to-scene
+mapping the modal operator uses. Runs headless inside Blender:
+
+    blender -b --factory-startup --python benchmarks/bench_sculpt.py -- [options]
+
+Options (after the '--'):
+    --subdivisions 3 4 5 6 7   Icosphere subdivision levels to run.
+    --no-model                 Skip data/generated_models/genMesh.glb.
+    --frames 30                Timed frames per case (after --warmup frames).
+    --stream PATH              Replay a recorded stream: one fingertips.json
+                               frame per line (JSON Lines). A synthetic
+                               circling-hand stream is used otherwise.
+    --output PATH              Where to write the results JSON.
+    --baseline PATH            Compare ms/frame against a previous results JSON.
+    --threshold 0.2            Allowed slowdown versus the baseline (0.2 = 20%).
+    --update-baseline          Write the results to --baseline instead of comparing.
+
+For every case it reports ms/frame (mean and p95), vertices/s (mesh vertices
+processed per second) and the peak Python allocation measured with
+tracemalloc in a separate, untimed pass. The exit code is 1 if any case is
+slower than the baseline by more than the threshold, so the script can gate CI.
+"""
+
+import argparse
+import json
+import math
+import sys
+import time
+import tracemalloc
+from collections import deque
+from pathlib import Path
+
+import bmesh
+import bpy
+import mathutils
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / "scripts" / "addons"))
+
+from conjure import config, mesh_cache, operator_main  # noqa: E402
+
+SAMPLE_MODEL_PATH = PROJECT_ROOT / "data" / "generated_models" / "genMesh.glb"
+DEFAULT_OUTPUT_PATH = PROJECT_ROOT / "benchmarks" / "results.json"
+
+
+class BrushState:
+    """The operator attributes the deformation code reads, without a running modal operator."""
+
+    def __init__(self, radius_index):
+        self._current_radius_index = radius_index
+        self._flatten_plane = None
+
+
+def parse_args():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    parser = argparse.ArgumentParser(description="Benchmark the CONJURE sculpting kernels.")
+    parser.add_argument("--subdivisions", type=int, nargs="+", default=[3, 4, 5, 6, 7])
+    parser.add_argument("--no-model", action="store_true")
+    parser.add_argument("--frames", type=int, default=30)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--stream", type=Path, default=None)
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT_PATH)
+    parser.add_argument("--baseline", type=Path, default=None)
+    parser.add_argument("--threshold", type=float, default=0.2)
+    parser.add_argument("--update-baseline", action="store_true")
+    return parser.parse_args(argv)
+
+
+# --- Fingertip streams ---
+
+def synthetic_stream(frame_count):
+    """One hand circling slowly in front of the camera, fingers spread around its center."""
+    frames = []
+    for t in range(frame_count):
+        angle = 2.0 * math.pi * t / max(frame_count, 1)
+        cx, cy = 0.5 + 0.08 * math.cos(angle), 0.5 + 0.08 * math.sin(angle)
+        z = -0.05 + 0.02 * math.sin(2.0 * angle)
+        tips = [
+            {"x": cx + 0.04 * math.cos(f * 2.0 * math.pi / 5), "y": cy + 0.04 * math.sin(f * 2.0 * math.pi / 5), "z": z}
+            for f in range(5)
+        ]
+        frames.append({"right_hand": {"fingertips": tips}})
+    return frames
+
+
+def load_stream(path):
+    with open(path, 'r') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def stream_positions(frames):
+    """Maps every frame of a stream to its list of world-space fingertip positions."""
+    positions = []
+    for frame in frames:
+        tips = []
+        for hand_key in ("left_hand", "right_hand"):
+            for tip in ((frame.get(hand_key) or {}).get("fingertips") or [])[:5]:
+                tips.append(operator_main.map_hand_to_3d_space(tip["x"], tip["y"], tip["z"]))
+        positions.append(tips)
+    return positions
+
+
+# --- Scene setup ---
+
+def reset_scene():
+    bpy.ops.wm.read_factory_settings(use_empty=True)
+    # Same camera placement as operator_main.setup_scene.
+    camera_data = bpy.data.cameras.new(config.GESTURE_CAMERA_NAME)
+    camera = bpy.data.objects.new(config.GESTURE_CAMERA_NAME, camera_data)
+    camera.location = (0, -5, 0)
+    camera.rotation_euler = (math.radians(90), 0, 0)
+    bpy.context.scene.collection.objects.link(camera)
+    bpy.context.view_layer.update()
+
+
+def make_icosphere(subdivisions):
+    mesh = bpy.data.meshes.new(f"ico{subdivisions}")
+    bm = bmesh.new()
+    bmesh.ops.create_icosphere(bm, subdivisions=subdivisions, radius=1.0)
+    bm.to_mesh(mesh)
+    bm.free()
+    obj = bpy.data.objects.new(config.DEFORM_OBJ_NAME, mesh)
+    bpy.context.scene.collection.objects.link(obj)
+    return obj
+
+
+def import_sample_model():
+    bpy.ops.import_scene.gltf(filepath=str(SAMPLE_MODEL_PATH))
+    meshes = [obj for obj in bpy.context.selected_objects if obj.type == 'MESH']
+    if not meshes:
+        return None
+    obj = meshes[0]
+    obj.name = config.DEFORM_OBJ_NAME
+    return obj
+
+
+# --- Measurement ---
+
+def run_frames(kernel, mesh_obj, positions, frame_range, brush_type, radius_index):
+    """Runs the kernel over the given stream frames. Returns the per-frame times in ms."""
+    history = deque(maxlen=config.MAX_HISTORY_STEPS)
+    state = BrushState(radius_index)
+    initial_volume = mesh_volume(mesh_obj)
+    times = []
+    previous_center = None
+    for i in frame_range:
+        fingers = positions[i % len(positions)]
+        center = sum(fingers, mathutils.Vector()) / len(fingers) if fingers else None
+        start = time.perf_counter()
+        if kernel == 'LEGACY':
+            operator_main.deform_mesh(mesh_obj, fingers, initial_volume)
+        else:
+            move = center - previous_center if brush_type == 'GRAB' and previous_center is not None else None
+            operator_main.deform_mesh_with_viscosity(
+                mesh_obj, fingers, initial_volume, history, state,
+                brush_type=brush_type, hand_move_vector=move
+            )
+        times.append((time.perf_counter() - start) * 1000.0)
+        previous_center = center
+    return times
+
+
+def mesh_volume(mesh_obj):
+    return mesh_cache.get_mesh_cache(mesh_obj).volume(mesh_cache.read_coords(mesh_obj.data))
+
+
+def benchmark_case(mesh_obj, rest_coords, positions, kernel, brush_type, radius_index, args):
+    def restore():
+        mesh_obj.data.vertices.foreach_set("co", rest_coords.ravel())
+        mesh_obj.data.update()
+        # Start every run from warm caches, as the operator does after an import.
+        mesh_cache.invalidate(mesh_obj)
+        mesh_cache.warm(mesh_obj)
+
+    restore()
+    run_frames(kernel, mesh_obj, positions, range(args.warmup), brush_type, radius_index)
+    restore()
+    times = np.array(run_frames(kernel, mesh_obj, positions, range(args.frames), brush_type, radius_index))
+
+    # Memory is measured in a separate pass, since tracemalloc slows everything down.
+    restore()
+    tracemalloc.start()
+    run_frames(kernel, mesh_obj, positions, range(min(args.frames, 5)), brush_type, radius_index)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    restore()
+
+    vert_count = len(mesh_obj.data.vertices)
+    mean_ms = float(times.mean())
+    return {
+        "vertices": vert_count,
+        "ms_per_frame": mean_ms,
+        "p95_ms": float(np.percentile(times, 95)),
+        "vertices_per_second": vert_count / (mean_ms / 1000.0) if mean_ms > 0 else 0.0,
+        "peak_memory_mb": peak / (1024 * 1024),
+    }
+
+
+def benchmark_mesh(label, mesh_obj, positions, args, results):
+    rest_coords = mesh_cache.read_coords(mesh_obj.data).copy()
+    cases = [('LEGACY', 'PINCH', 1)] + [
+        ('VISCOSITY', brush, radius)
+        for brush in config.BRUSH_TYPES
+        for radius in range(len(config.RADIUS_LEVELS))
+    ]
+    for kernel, brush_type, radius_index in cases:
+        radius_name = config.RADIUS_LEVELS[radius_index]['name']
+        key = f"{label}/legacy" if kernel == 'LEGACY' else f"{label}/{brush_type}/{radius_name}"
+        results[key] = benchmark_case(mesh_obj, rest_coords, positions, kernel, brush_type, radius_index, args)
+        r = results[key]
+        print(f"{key:<32} {r['vertices']:>8} verts  {r['ms_per_frame']:>9.2f} ms/frame  "
+              f"{r['p95_ms']:>9.2f} p95  {r['vertices_per_second'] / 1e6:>7.2f} Mverts/s  {r['peak_memory_mb']:>7.2f} MB")
+
+
+def compare(results, baseline, threshold):
+    """Returns the list of cases slower than the baseline by more than the threshold."""
+    regressions = []
+    for key, result in results.items():
+        previous = baseline.get(key)
+        if not previous:
+            continue
+        limit = previous["ms_per_frame"] * (1.0 + threshold)
+        if result["ms_per_frame"] > limit:
+            regressions.append(f"{key}: {result['ms_per_frame']:.2f} ms/frame (baseline {previous['ms_per_frame']:.2f}, limit {limit:.2f})")
+    return regressions
+
+
+def main():
+    args = parse_args()
+    results = {}
+
+    meshes = [(f"ico{s}", lambda s=s: make_icosphere(s)) for s in args.subdivisions]
+    if not args.no_model:
+        if SAMPLE_MODEL_PATH.exists():
+            meshes.append(("genMesh", import_sample_model))
+        else:
+            print(f"Warning: sample model not found at {SAMPLE_MODEL_PATH}, skipping.")
+
+    for label, create in meshes:
+        reset_scene()
+        mesh_obj = create()
+        if mesh_obj is None:
+            print(f"Warning: could not create mesh '{label}', skipping.")
+            continue
+        frames = load_stream(args.stream) if args.stream else synthetic_stream(max(args.frames, args.warmup, 1))
+        benchmark_mesh(label, mesh_obj, stream_positions(frames), args, results)
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=4)
+    print(f"Results written to {args.output}")
+
+    if args.baseline is None:
+        return 0
+    if args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=4)
+        print(f"Baseline updated: {args.baseline}")
+        return 0
+    if not args.baseline.exists():
+        print(f"Baseline {args.baseline} not found; run with --update-baseline to create it.")
+        return 0
+
+    with open(args.baseline, 'r') as f:
+        regressions = compare(results, json.load(f), args.threshold)
+    if regressions:
+        print(f"FAIL: {len(regressions)} case(s) regressed by more than {args.threshold:.0%}:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print(f"OK: no case regressed by more than {args.threshold:.0%}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,223 @@
+"""
+Workflow template layer for the CONJURE ComfyUI pipeline.
+
+Every workflow in 'comfyui/workflows/' is read and parsed once at startup.
+Its node bindings are checked against the schema declared in
+WORKFLOW_BINDINGS, so a renamed node or input is reported when the launcher
+starts instead of halfway through a generation. Payloads are then produced
+by structural copy of the parsed template: only the nodes that receive
+bound values or seeds are copied, everything else is shared.
+
+When Blender's fast capture has already written depth passes next to the
+input images ('<name>_depth.png'), build(precomputed_depth=True) swaps every
+depth estimator fed directly by a LoadImage node for a LoadImage of that
+depth pass, so ComfyUI skips the estimator entirely.
+
+Usage:
+    templates = load_workflow_templates(workflows_dir)
+    workflow = templates["promptMaker"].build(output_dir="/abs/path")
+    run_workflow(workflow, client_id)
+"""
+
+import random
+from pathlib import Path
+
+from comfyui.api_wrapper import load_workflow
+
+# --- BINDING SCHEMA ---
+# Maps a template name (the workflow file stem) to its relative path, the
+# named bindings the launcher fills in per request, and fixed overrides that
+# are baked into the template once at load time.
+#
+#   "bindings":  {binding_name: [(node_id, input_name), ...]}
+#   "overrides": {(node_id, input_name): value}
+#
+# Every workflow also accepts an optional 'seed' binding. When it is omitted,
+# each literal seed input gets a fresh random value so ComfyUI never returns
+# a cached result.
+_MV2MV_STANDARD_BINDINGS = {
+    "prompt_file": [("120", "file_path")],
+    "output_dir": [("124", "output_path")],
+}
+
+_MV2MV_TURBO_BINDINGS = {
+    "prompt_file": [("120", "file_path"), ("198", "file_path")],
+    "output_dir": [("165", "output_path"), ("187", "output_path"), ("164", "output_path")],
+}
+
+_MV2MV_TURBO_OVERRIDES = {
+    ("165", "filename_prefix"): "mv_1",
+    ("187", "filename_prefix"): "mv_3",
+    ("164", "filename_prefix"): "mv_4",
+}
+
+_MV23D_OVERRIDES = {
+    ("13", "filename_prefix"): "CONJURE/copyMesh",
+}
+
+WORKFLOW_BINDINGS = {
+    "promptMaker": {
+        "path": "promptMaker.json",
+        "bindings": {
+            "output_dir": [("139", "output_path"), ("142", "output_path"), ("143", "output_path")],
+        },
+    },
+    "mv2mv1": {"path": "standard/mv2mv1.json", "bindings": _MV2MV_STANDARD_BINDINGS},
+    "mv2mv2": {"path": "standard/mv2mv2.json", "bindings": _MV2MV_STANDARD_BINDINGS},
+    "mv2mv3": {"path": "standard/mv2mv3.json", "bindings": _MV2MV_STANDARD_BINDINGS},
+    "mv2mv1turbo": {"path": "turbo/mv2mv1turbo.json", "bindings": _MV2MV_TURBO_BINDINGS, "overrides": _MV2MV_TURBO_OVERRIDES},
+    "mv2mv2turbo": {"path": "turbo/mv2mv2turbo.json", "bindings": _MV2MV_TURBO_BINDINGS, "overrides": _MV2MV_TURBO_OVERRIDES},
+    "mv2mv3turbo": {"path": "turbo/mv2mv3turbo.json", "bindings": _MV2MV_TURBO_BINDINGS, "overrides": _MV2MV_TURBO_OVERRIDES},
+    "mv23D": {"path": "mv23D.json", "overrides": _MV23D_OVERRIDES},
+    "mv23Dturbo": {"path": "turbo/mv23Dturbo.json", "overrides": _MV23D_OVERRIDES},
+}
+
+MAX_SEED = 9999999999
+
+# Preprocessors whose output can be replaced by a depth pass rendered in Blender.
+DEPTH_ESTIMATOR_CLASSES = {"DepthAnythingV2Preprocessor"}
+
+
+class WorkflowBindingError(Exception):
+    """Raised when a workflow does not match its declared binding schema."""
+    pass
+
+
+class WorkflowTemplate:
+    """A parsed, validated workflow that produces ready-to-send payloads."""
+
+    def __init__(self, name: str, path: Path, nodes: dict, bindings: dict, overrides: dict):
+        self.name = name
+        self.path = path
+        self.bindings = bindings
+
+        # Fixed overrides are applied once, to a private copy of the affected nodes.
+        self._nodes = dict(nodes)
+        for (node_id, input_name), value in overrides.items():
+            node = self._nodes[node_id]
+            self._nodes[node_id] = {**node, "inputs": {**node["inputs"], input_name: value}}
+
+        # Literal seed inputs only. Inputs that are links (e.g. a KSampler fed
+        # by a Seed node) are left alone so the graph stays intact.
+        self._seed_nodes = [
+            node_id for node_id, node in self._nodes.items()
+            if "seed" in node.get("inputs", {}) and not isinstance(node["inputs"]["seed"], list)
+        ]
+
+        # Depth estimators that read straight from a LoadImage node, mapped to
+        # the depth pass file name Blender writes for that image.
+        self.depth_nodes = {}
+        for node_id, node in self._nodes.items():
+            if node.get("class_type") not in DEPTH_ESTIMATOR_CLASSES:
+                continue
+            source = node["inputs"].get("image")
+            source_node = self._nodes.get(source[0]) if isinstance(source, list) else None
+            if source_node and source_node.get("class_type") == "LoadImage":
+                self.depth_nodes[node_id] = f"{Path(source_node['inputs']['image']).stem}_depth.png"
+
+        # The set of nodes that must be copied for every payload.
+        self._mutable_nodes = set(self._seed_nodes)
+        for targets in bindings.values():
+            self._mutable_nodes.update(node_id for node_id, _ in targets)
+
+    def build(self, seed: int | None = None, precomputed_depth: bool = False, **values) -> dict:
+        """
+        Returns a new workflow payload with the given binding values applied.
+
+        Args:
+            seed: Optional fixed seed. A random seed is used per node if omitted.
+            precomputed_depth: Replace depth estimators with the depth passes
+                rendered by Blender (see depth_nodes for the expected files).
+            **values: One keyword argument per declared binding.
+
+        Returns:
+            A workflow dictionary ready to pass to run_workflow.
+        """
+        unknown = set(values) - set(self.bindings)
+        missing = set(self.bindings) - set(values)
+        if unknown or missing:
+            raise WorkflowBindingError(
+                f"Workflow '{self.name}' expects bindings {sorted(self.bindings)}, "
+                f"got {sorted(values)} (missing: {sorted(missing)}, unknown: {sorted(unknown)})"
+            )
+
+        payload = dict(self._nodes)
+        for node_id in self._mutable_nodes:
+            node = self._nodes[node_id]
+            payload[node_id] = {**node, "inputs": dict(node["inputs"])}
+
+        for binding_name, value in values.items():
+            for node_id, input_name in self.bindings[binding_name]:
+                payload[node_id]["inputs"][input_name] = value
+
+        for node_id in self._seed_nodes:
+            payload[node_id]["inputs"]["seed"] = seed if seed is not None else random.randint(0, MAX_SEED)
+
+        if precomputed_depth:
+            # LoadImage's first output is an IMAGE, like the estimator's, so
+            # every downstream link stays valid.
+            for node_id, depth_file in self.depth_nodes.items():
+                payload[node_id] = {
+                    "inputs": {"image": depth_file},
+                    "class_type": "LoadImage",
+                    "_meta": {"title": f"Precomputed depth ({depth_file})"},
+                }
+
+        skipped = len(self.depth_nodes) if precomputed_depth else 0
+        print(f"Built workflow '{self.name}' ({len(values)} bindings, {len(self._seed_nodes)} seeds, {skipped} depth estimators skipped).")
+        return payload
+
+
+def _validate(name: str, nodes: dict, bindings: dict, overrides: dict) -> list:
+    """Returns a list of human-readable binding errors for one workflow."""
+    errors = []
+    targets = [target for binding in bindings.values() for target in binding]
+    for node_id, input_name in targets + list(overrides):
+        node = nodes.get(node_id)
+        if node is None:
+            errors.append(f"{name}: node {node_id} not found")
+        elif input_name not in node.get("inputs", {}):
+            errors.append(f"{name}: input '{input_name}' not found in node {node_id} ({node.get('class_type')})")
+        elif isinstance(node["inputs"][input_name], list):
+            errors.append(f"{name}: input '{input_name}' of node {node_id} is a link, not a value")
+    return errors
+
+
+def load_workflow_templates(workflows_dir: Path, schema: dict = WORKFLOW_BINDINGS) -> dict:
+    """
+    Loads and validates every workflow declared in the binding schema.
+
+    Args:
+        workflows_dir: The 'comfyui/workflows' directory.
+        schema: The binding schema to validate against.
+
+    Returns:
+        A dictionary mapping template names to WorkflowTemplate objects.
+
+    Raises:
+        WorkflowBindingError: If any workflow is missing, unreadable or does
+            not match its declared bindings. All problems are reported at once.
+    """
+    templates = {}
+    errors = []
+    for name, spec in schema.items():
+        path = Path(workflows_dir) / spec["path"]
+        nodes = load_workflow(str(path))
+        if not nodes:
+            errors.append(f"{name}: could not load {path}")
+            continue
+
+        bindings = spec.get("bindings", {})
+        overrides = spec.get("overrides", {})
+        workflow_errors = _validate(name, nodes, bindings, overrides)
+        if workflow_errors:
+            errors.extend(workflow_errors)
+            continue
+
+        templates[name] = WorkflowTemplate(name, path, nodes, bindings, overrides)
+
+    if errors:
+        raise WorkflowBindingError("Workflow binding check failed:\n  " + "\n  ".join(errors))
+
+    print(f"Loaded {len(templates)} workflow templates from {workflows_dir}.")
+    return templates
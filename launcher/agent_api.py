@@ -1,14 +1,24 @@
 """
 ElevenLabs API integration for conversational agent.
 Handles voice interaction and response generation.
+
+Replies are streamed: the "spoken" field is parsed out of the partial JSON
+while the completion is still arriving and spoken sentence by sentence
+(see streaming.py), so speech starts long before the reply is complete.
 """
 import os
 import json
+import threading
+from collections import deque
 from openai import OpenAI
 from pathlib import Path
 from instruction_manager import InstructionManager
-from elevenlabs import play
 from elevenlabs.client import ElevenLabs
+import launcher.config as config
+from streaming import PcmPlayer, SentenceChunker, SpokenFieldParser, StreamingSpeaker
+from conversation_memory import ConversationMemory, llm_summarizer
+from prompts import PromptFile
+from tts_cache import TTSCache, cache_key
 
 # --- ElevenLabs Configuration ---
 # You can find your Voice ID in the Voice Lab on the ElevenLabs website.
@@ -17,71 +27,251 @@ TTS_VOICE_ID = "90ipbRoKi4CpHXvKVtl0"
 # This is the latest and highest-quality model.
 TTS_MODEL_ID = "eleven_flash_v2_5"
 
+FALLBACK_SYSTEM_PROMPT = "You are a helpful 3D design assistant named Conjure. Respond in JSON."
+
 class ConversationalAgent:
     def __init__(self, openai_api_key: str, instruction_manager: InstructionManager):
         if not openai_api_key:
             raise ValueError("OpenAI API key not found. Please set the OPENAI_API_KEY environment variable.")
-        self.openai_client = OpenAI(api_key=openai_api_key)
+        self.openai_client = OpenAI(api_key=openai_api_key, base_url=config.OPENAI_BASE_URL)
         
         elevenlabs_api_key = os.environ.get("ELEVENLABS_API_KEY")
         if not elevenlabs_api_key:
             raise ValueError("ElevenLabs API key not found. Please set the ELEVENLABS_API_KEY environment variable.")
-        self.elevenlabs_client = ElevenLabs(api_key=elevenlabs_api_key)
+        if config.ELEVENLABS_BASE_URL:
+            self.elevenlabs_client = ElevenLabs(api_key=elevenlabs_api_key, base_url=config.ELEVENLABS_BASE_URL)
+        else:
+            self.elevenlabs_client = ElevenLabs(api_key=elevenlabs_api_key)
 
         self.instruction_manager = instruction_manager
-        self.history = []
-        self.system_prompt = self._load_system_prompt()
-        self.history.append({"role": "system", "content": self.system_prompt})
+        # Prompt files are read on first use and reloaded when edited.
+        self.system_prompt_file = PromptFile(config.AGENT_PROMPT_PATH, fallback=FALLBACK_SYSTEM_PROMPT)
+        self.user_prompt_file = PromptFile(config.USER_PROMPT_PATH)
+        self._prefix_version = None
+        # Keeps each request within a token budget; older turns are summarized.
+        self.memory = ConversationMemory(summarize=llm_summarizer(self.openai_client))
+        # Token usage of recent requests, including how much came from the prompt cache.
+        self.turn_metrics = deque(maxlen=50)
+        # Synthesized sentences are kept on disk, so stock phrases play instantly.
+        self.tts_cache = TTSCache(config.TTS_CACHE_DIR, config.TTS_CACHE_MAX_BYTES) if config.TTS_CACHE_MAX_BYTES else None
 
-    def _load_system_prompt(self):
-        try:
-            prompt_path = Path(__file__).parent.parent / "devnotes" / "agentPrompt.txt"
-            with open(prompt_path, 'r', encoding='utf-8') as f:
-                return f.read()
-        except FileNotFoundError:
-            # The agentToolset.txt was deleted, so we can't rely on the old prompt.
-            print("WARNING: devnotes/agentPrompt.txt not found. Agent will use a basic prompt.")
-            return "You are a helpful 3D design assistant named Conjure. Respond in JSON."
+    def _refresh_prefix(self):
+        """
+        Rebuilds the static request prefix (system prompt, then tool schema)
+        when the prompt file has changed. Between changes the prefix is the
+        same string every turn, so the API can serve it from its prompt cache.
+        """
+        system_prompt = self.system_prompt_file.text
+        if self.system_prompt_file.version == self._prefix_version:
+            return
+        self._prefix_version = self.system_prompt_file.version
+        prefix = [{"role": "system", "content": system_prompt}]
+        if self.instruction_manager is not None:
+            prefix.append({"role": "system", "content": "Tool schema (JSON):\n" + self.instruction_manager.tool_schema()})
+        self.memory.set_prefix(prefix)
 
     def get_response(self, user_message):
-        self.history.append({"role": "user", "content": user_message})
+        """
+        Runs a whole turn in the calling thread: streamed completion and
+        speech, then instruction dispatch. Returns the spoken text, or None
+        on failure. The launcher uses AgentTurnPipeline instead, which runs
+        the same stages off its main loop.
+        """
+        speaker = self.open_speaker()
+        response_str = self.complete_stream(user_message, on_spoken=speaker.feed)
+        spoken_text = self.process_response(response_str) if response_str is not None else None
+        speaker.close()
+        return spoken_text
+
+    def _request_messages(self, user_message):
+        self.memory.add("user", user_message)
+        self._refresh_prefix()
+        self._refresh_pinned_facts()
+        return self.memory.messages()
+
+    def _record_reply(self, agent_response_str):
+        self.memory.add("assistant", agent_response_str)
+
+    def _refresh_pinned_facts(self):
+        """Pins the session facts the agent must not lose as old turns are summarized."""
+        user_prompt = self.user_prompt_file.text
+        self.memory.pin("Current design prompt (userPrompt.txt)", user_prompt.strip() if user_prompt else None)
+
+        if self.instruction_manager is None:
+            return
+        state = self.instruction_manager.state_manager.get_state()
+        self.memory.pin("Generation mode", state.get("generation_mode"))
+        if state.get("selection_request"):
+            self.memory.pin("Selected concept option", state["selection_request"])
+
+    def complete(self, user_message):
+        """Sends the user message to the LLM. Returns the raw JSON reply, or None on failure."""
+        messages = self._request_messages(user_message)
 
         try:
             response = self.openai_client.chat.completions.create(
-                model="gpt-4o",
-                messages=self.history,
+                model=config.AGENT_MODEL,
+                messages=messages,
                 response_format={"type": "json_object"}
             )
             
             agent_response_str = response.choices[0].message.content
-            self.history.append({"role": "assistant", "content": agent_response_str})
-
-            # Keep history from getting too long
-            if len(self.history) > 10:
-                self.history = [self.history[0]] + self.history[-9:]
-
-            return self._parse_and_process_response(agent_response_str)
+            self._record_reply(agent_response_str)
+            self._record_usage(response.usage)
+            return agent_response_str
 
         except Exception as e:
             print(f"Error calling OpenAI API: {e}")
             return None
 
-    def _play_agent_response(self, text: str):
-        """Converts text to speech and plays it using ElevenLabs."""
+    def complete_stream(self, user_message, on_spoken):
+        """
+        Like complete(), but streams the reply. 'on_spoken' is called with
+        each new piece of the "spoken" field as soon as it has been generated.
+        Returns the full raw JSON reply, or None on failure.
+        """
+        messages = self._request_messages(user_message)
+        parser = SpokenFieldParser("spoken")
+        parts = []
+        usage = None
+
         try:
-            print("AGENT_API: Generating audio from ElevenLabs...")
-            audio = self.elevenlabs_client.text_to_speech.convert(
-                text=text,
-                voice_id=TTS_VOICE_ID,
-                model_id=TTS_MODEL_ID,
+            stream = self.openai_client.chat.completions.create(
+                model=config.AGENT_MODEL,
+                messages=messages,
+                response_format={"type": "json_object"},
+                stream=True,
+                # The usage, with the cached token count, arrives in a last chunk without choices.
+                stream_options={"include_usage": True}
             )
-            print("AGENT_API: Playing audio...")
-            play(audio)
-            print("AGENT_API: Audio playback finished.")
+            for chunk in stream:
+                if getattr(chunk, "usage", None):
+                    usage = chunk.usage
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+                parts.append(delta)
+                spoken = parser.feed(delta)
+                if spoken:
+                    on_spoken(spoken)
+
         except Exception as e:
-            print(f"AGENT_API: Error playing ElevenLabs audio: {e}")
+            print(f"Error calling OpenAI API: {e}")
+            return None
+
+        agent_response_str = "".join(parts)
+        self._record_reply(agent_response_str)
+        self._record_usage(usage)
+        return agent_response_str
+
+    def _record_usage(self, usage):
+        """Logs the token usage of a request and how much of its prompt was a cache hit."""
+        if usage is None:
+            return
+        details = getattr(usage, "prompt_tokens_details", None)
+        # Older SDKs keep fields they don't know about as plain dicts.
+        cached = details.get("cached_tokens") if isinstance(details, dict) else getattr(details, "cached_tokens", None)
+        prompt_tokens = usage.prompt_tokens or 0
+        metrics = {
+            "prompt_tokens": prompt_tokens,
+            "cached_tokens": cached or 0,
+            "completion_tokens": usage.completion_tokens or 0,
+            "cache_hit_ratio": (cached or 0) / prompt_tokens if prompt_tokens else 0.0,
+            "local_estimate": self.memory.token_usage(),
+        }
+        self.turn_metrics.append(metrics)
+        print(f"AGENT_API: Tokens: prompt={metrics['prompt_tokens']} "
+              f"(cached {metrics['cached_tokens']}, {metrics['cache_hit_ratio']:.0%}), "
+              f"completion={metrics['completion_tokens']}")
+
+    def open_speaker(self, player=None, on_sentence=None):
+        """
+        Returns a StreamingSpeaker that speaks text fed to it sentence by
+        sentence. close() it to finish the speech and wait for playback.
+        """
+        return StreamingSpeaker(
+            self._synthesize_stream,
+            player or PcmPlayer(config.TTS_SAMPLE_RATE),
+            on_sentence=on_sentence
+        )
 
-    def _parse_and_process_response(self, response_str):
+    def speak(self, text: str):
+        """Speaks the given text. Blocks until playback has finished."""
+        speaker = self.open_speaker()
+        speaker.feed(text)
+        speaker.close()
+
+    def _synthesize_stream(self, text: str):
+        """Returns an iterator over the raw PCM chunks of the spoken text, from the cache or ElevenLabs."""
+        if self.tts_cache is None:
+            return self._synthesize_remote(text)
+        key = cache_key(text, TTS_VOICE_ID, TTS_MODEL_ID, config.TTS_OUTPUT_FORMAT)
+        return self.tts_cache.stream(key, lambda: self._synthesize_remote(text))
+
+    def presynthesize(self, phrases):
+        """
+        Fills the TTS cache with the given phrases on a background thread.
+        Phrases are split into the same sentence chunks the speaker uses, so
+        the cached entries are exactly the ones playback will ask for.
+        """
+        if self.tts_cache is None:
+            return None
+
+        def run():
+            chunker = SentenceChunker()
+            pending = []
+            for phrase in phrases:
+                for chunk in chunker.feed(phrase) + chunker.flush():
+                    key = cache_key(chunk, TTS_VOICE_ID, TTS_MODEL_ID, config.TTS_OUTPUT_FORMAT)
+                    if not self.tts_cache.contains(key) and chunk not in pending:
+                        pending.append(chunk)
+            for chunk in pending:
+                try:
+                    for _ in self._synthesize_stream(chunk):
+                        pass
+                except Exception as e:
+                    print(f"AGENT_API: Could not pre-synthesize '{chunk}': {e}")
+                    return
+            if pending:
+                print(f"AGENT_API: Pre-synthesized {len(pending)} stock phrases.")
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        return thread
+
+    def _synthesize_remote(self, text: str):
+        """Streams the raw PCM chunks of the spoken text from ElevenLabs."""
+        tts = self.elevenlabs_client.text_to_speech
+        # The streaming endpoint is 'convert_as_stream' in elevenlabs 1.x and 'stream' in 2.x.
+        stream = getattr(tts, "stream", None) or tts.convert_as_stream
+        return stream(
+            text=text,
+            voice_id=TTS_VOICE_ID,
+            model_id=TTS_MODEL_ID,
+            output_format=config.TTS_OUTPUT_FORMAT,
+        )
+
+    def record_local_turn(self, user_message, spoken_text, instruction):
+        """
+        Adds a turn that was answered without the LLM (see IntentRouter) to
+        the conversation, in the same JSON form as the agent's own replies.
+        """
+        self.memory.add("user", user_message)
+        self.memory.add("assistant", json.dumps({"spoken": spoken_text, "instruction": instruction}))
+        self._note_instruction(instruction)
+
+    def _note_instruction(self, instruction):
+        if instruction.get("tool_name") == "select_concept":
+            self.memory.pin("Selected concept option", (instruction.get("parameters") or {}).get("option_id"))
+
+    def process_response(self, response_str):
+        """
+        Parses a reply and dispatches its instruction right away, so Blender
+        and the launcher can start on it while the reply is still being spoken.
+        Returns the text to speak, or None if the reply could not be parsed.
+        """
         try:
             response_json = json.loads(response_str)
             
@@ -95,13 +285,13 @@ class ConversationalAgent:
                     f.write(user_prompt or "") # Always write, use empty string if prompt is null
                 print("Updated userPrompt.txt.")
 
-            if spoken_text:
-                print(f"AGENT: {spoken_text}")
-                self._play_agent_response(spoken_text)
-            
             if instruction:
+                self._note_instruction(instruction)
                 self.instruction_manager.execute_instruction(instruction)
-            
+
+            if spoken_text:
+                print(f"AGENT: {spoken_text}")
+
             return spoken_text
 
         except json.JSONDecodeError:
@@ -0,0 +1,185 @@
+"""
+Runs agent turns off the launcher's main loop.
+
+A turn goes through four stages: speech-to-text, the LLM completion, the
+dispatch of its instruction to the InstructionManager, and speech playback,
+which already starts while the completion is streaming in.
+The stages run on two worker threads joined by a queue: one finishes the
+transcription of released push-to-talk recordings, the other talks to the
+agent. The main loop only submits work and returns, so generation requests,
+Blender commands and subprocess checks keep being serviced during a turn,
+and the user can start the next utterance while the last reply is playing.
+
+Commands the IntentRouter recognizes skip the LLM: they are dispatched
+locally and answered with a fixed phrase.
+
+Every stage is timed, along with the time to the first spoken sentence and
+to the first audio; the timings of recent turns are kept in 'timings'.
+"""
+
+import queue
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+IDLE_STATUS = "Say something..."
+ERROR_REPLY = "I had a problem processing that. Please try again."
+
+
+@contextmanager
+def _timed(stage, timings):
+    """Records the duration of the enclosed block in ms under 'stage'."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = (time.perf_counter() - start) * 1000.0
+
+
+class AgentTurnPipeline:
+    """Transcribes, answers and speaks agent turns in submission order."""
+    def __init__(self, state_manager, voice_input_manager, agent, intent_router=None):
+        self.state_manager = state_manager
+        self.voice_input_manager = voice_input_manager
+        self.agent = agent
+        self.intent_router = intent_router
+        self.timings = deque(maxlen=50)
+        self.transcribing = False
+        self._recordings = queue.Queue()  # Submission times of released recordings; None stops the pipeline.
+        self._messages = queue.Queue()    # (text, timings, submitted_at) ready for the agent.
+        self._threads = []
+
+    def start(self):
+        for target in (self._transcribe_loop, self._agent_loop):
+            thread = threading.Thread(target=target, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=5.0):
+        """Lets the turns already submitted finish, then stops the workers."""
+        if not self._threads:
+            return
+        self._recordings.put(None)
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def submit_recording(self):
+        """Queues the recording that was just released for transcription."""
+        self.transcribing = True
+        self._recordings.put(time.perf_counter())
+
+    def submit_text(self, text):
+        """Queues a typed or otherwise already transcribed user message."""
+        self._messages.put((text, {}, time.perf_counter()))
+
+    # --- Workers ---
+
+    def _transcribe_loop(self):
+        while True:
+            submitted_at = self._recordings.get()
+            if submitted_at is None:
+                # Forward the stop so the agent worker drains its queue first.
+                self._messages.put(None)
+                break
+
+            start = time.perf_counter()
+            text = self.voice_input_manager.stop_recording_and_transcribe()
+            self.transcribing = False
+            timings = {"stt": (time.perf_counter() - start) * 1000.0}
+
+            if not text:
+                self.state_manager.set_ui_state({"dialogue": {"status": IDLE_STATUS}})
+                continue
+
+            print(f"\n>>> Sending to Agent: '{text}'")
+            self.state_manager.set_ui_state({
+                "dialogue": {
+                    "user_transcript": text,
+                    "agent_response": "..."
+                }
+            })
+            self._messages.put((text, timings, submitted_at))
+
+    def _agent_loop(self):
+        while True:
+            item = self._messages.get()
+            if item is None:
+                break
+            text, timings, submitted_at = item
+            try:
+                self._run_turn(text, timings)
+            except Exception as e:
+                print(f"AGENT_PIPELINE: Turn failed: {e}")
+                self._show_reply(ERROR_REPLY)
+            timings["total"] = (time.perf_counter() - submitted_at) * 1000.0
+            self.timings.append(timings)
+            print("AGENT_PIPELINE: Turn timings: " + ", ".join(f"{stage}={ms:.0f}ms" for stage, ms in timings.items()))
+
+    def _run_turn(self, text, timings):
+        if self.intent_router is not None:
+            with _timed("route", timings):
+                intent = self.intent_router.route(text)
+            if intent is not None:
+                self._run_local_turn(text, intent, timings)
+                return
+
+        start = time.perf_counter()
+        shown = []
+
+        def show_sentence(sentence):
+            # The dialogue grows sentence by sentence, in step with the speech.
+            shown.append(sentence)
+            if len(shown) == 1:
+                timings["first_sentence"] = (time.perf_counter() - start) * 1000.0
+            self.state_manager.set_ui_state({
+                "dialogue": {
+                    "agent_response": " ".join(shown),
+                    "status": "Speaking..."
+                }
+            })
+
+        # Speech starts while the completion is still streaming in.
+        speaker = self.agent.open_speaker(on_sentence=show_sentence)
+        try:
+            with _timed("llm", timings):
+                response_str = self.agent.complete_stream(text, on_spoken=speaker.feed)
+
+            # The instruction is dispatched as soon as the reply is complete,
+            # while its speech is still playing.
+            spoken_text = None
+            if response_str is not None:
+                with _timed("dispatch", timings):
+                    spoken_text = self.agent.process_response(response_str)
+        finally:
+            with _timed("tts", timings):
+                speaker.close()
+            if speaker.first_audio_at is not None:
+                timings["first_audio"] = (speaker.first_audio_at - start) * 1000.0
+
+        if not spoken_text:
+            self._show_reply(ERROR_REPLY)
+            return
+        self._show_reply(spoken_text)
+
+    def _run_local_turn(self, text, intent, timings):
+        """Answers a command the router already dispatched."""
+        self.agent.record_local_turn(text, intent.reply, {"tool_name": intent.tool_name, "parameters": intent.parameters})
+        self.state_manager.set_ui_state({
+            "dialogue": {
+                "agent_response": intent.reply,
+                "status": "Speaking..."
+            }
+        })
+        with _timed("tts", timings):
+            self.agent.speak(intent.reply)
+        self._show_reply(intent.reply)
+
+    def _show_reply(self, reply):
+        self.state_manager.set_ui_state({
+            "dialogue": {
+                "agent_response": reply,
+                "status": IDLE_STATUS
+            }
+        })
@@ -0,0 +1,234 @@
+"""
+Ordered command queue between the agent, the launcher and Blender.
+
+Every instruction becomes a command with a monotonically increasing id.
+Commands for Blender are written to COMMAND_QUEUE_JSON, which only the
+launcher writes; Blender runs them in id order and reports back through
+COMMAND_ACKS_JSON, which only Blender writes. Neither side rewrites the
+other's file, so a second instruction can no longer overwrite the first
+before it has been consumed. Commands for the launcher itself
+(generation and selection requests) stay in memory and are taken by the
+main loop.
+
+A command that is still waiting to be picked up absorbs duplicates. For
+commands in COMMAND_LATEST_WINS (e.g. a second "select option" before the
+first was handled, or a new material for the same segment) the newer one
+replaces the older one under a new id, so nothing is lost if the older
+one was already running. An identical command is only dropped where that
+can't lose anything: for the launcher's own commands, whose pick-up is
+known exactly, and for the idempotent ones in COMMAND_IDEMPOTENT. Blender may already be running a
+command it hasn't acknowledged yet, so a second "undo" or "add a sphere"
+is always queued again.
+
+Each acknowledgement records when the command was picked up and when it
+finished, giving per-command delivery and total latencies.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+
+import launcher.config as config
+
+BLENDER = "blender"
+LAUNCHER = "launcher"
+
+
+def _read_json(path):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class CommandQueue:
+    """Queues commands with ids, coalesces duplicates and tracks acknowledgements."""
+    def __init__(self, queue_path=None, ack_path=None):
+        self.queue_path = queue_path or config.COMMAND_QUEUE_JSON
+        self.ack_path = ack_path or config.COMMAND_ACKS_JSON
+        self.queue_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._pending = []       # Commands not acknowledged yet, oldest first.
+        self._ack_signature = None
+        self._dirty = False      # The queue file still needs writing (e.g. it was locked by a reader).
+        self.latencies = {}      # Command -> deque of (delivery_ms, total_ms).
+        self.coalesced = {}      # Command -> number of duplicates absorbed.
+        self._listeners = []     # Called with no arguments when a command is queued.
+
+        # Ids carry on from the last run, so Blender never sees an id twice.
+        previous = _read_json(self.queue_path)
+        acks = _read_json(self.ack_path)
+        self._next_id = max(previous.get("next_id", 1), acks.get("acked_through", 0) + 1)
+        # Commands left over from the last run are stale; start empty.
+        with self._lock:
+            self._write()
+
+    # --- Producing ---
+
+    def push(self, command, params=None, target=BLENDER):
+        """Queues a command and returns its id (an existing one if it was coalesced)."""
+        params = params or {}
+        # Drop what Blender has finished, so only commands still queued are candidates.
+        self.poll_acks()
+        with self._lock:
+            for entry in list(self._pending):
+                if entry["command"] != command or entry["target"] != target or entry["received_at"] is not None:
+                    continue
+                if entry["params"] == params:
+                    if target == LAUNCHER or command in config.COMMAND_IDEMPOTENT:
+                        self._count_coalesced(command)
+                        print(f"COMMAND_QUEUE: {command} is already queued as #{entry['id']}.")
+                        return entry["id"]
+                    # A repeat of a repeatable command: queue it again.
+                    continue
+                same_target = all(entry["params"].get(key) == params.get(key)
+                                  for key in config.COMMAND_LATEST_WINS.get(command, ()))
+                if command in config.COMMAND_LATEST_WINS and same_target:
+                    # Replaced under a new id: Blender may be running the old one right now.
+                    self._pending.remove(entry)
+                    self._count_coalesced(command)
+                    print(f"COMMAND_QUEUE: #{entry['id']} {command} superseded before it ran.")
+
+            entry = {
+                "id": self._next_id,
+                "command": command,
+                "params": params,
+                "target": target,
+                "enqueued_at": time.time(),
+                "received_at": None,
+            }
+            self._next_id += 1
+            self._pending.append(entry)
+            if target == BLENDER:
+                self._write()
+        print(f"COMMAND_QUEUE: Queued #{entry['id']} {command} for {target}: {params}")
+        for callback in self._listeners:
+            callback()
+        return entry["id"]
+
+    def add_listener(self, callback):
+        """Registers a callback for new commands, e.g. to wake the launcher's loop."""
+        self._listeners.append(callback)
+
+    def _count_coalesced(self, command):
+        self.coalesced[command] = self.coalesced.get(command, 0) + 1
+
+    def _write(self):
+        """Writes the pending Blender commands atomically. Called with the lock held."""
+        payload = {
+            "next_id": self._next_id,
+            "commands": [
+                {key: entry[key] for key in ("id", "command", "params", "enqueued_at")}
+                for entry in self._pending if entry["target"] == BLENDER
+            ],
+        }
+        temp_path = self.queue_path.with_suffix(".tmp")
+        try:
+            with open(temp_path, 'w') as f:
+                json.dump(payload, f, indent=4)
+            os.replace(temp_path, self.queue_path)
+            self._dirty = False
+        except OSError as e:
+            # Typically Blender reading the file on Windows; retried on the next poll.
+            print(f"COMMAND_QUEUE: Could not write the queue file, will retry: {e}")
+            self._dirty = True
+
+    # --- Consuming ---
+
+    def take(self, target=LAUNCHER):
+        """Returns the commands for 'target' that nobody has picked up yet, oldest first."""
+        now = time.time()
+        with self._lock:
+            entries = [e for e in self._pending if e["target"] == target and e["received_at"] is None]
+            for entry in entries:
+                entry["received_at"] = now
+        return entries
+
+    def ack(self, command_id, status="done"):
+        """Acknowledges a command the launcher handled itself."""
+        with self._lock:
+            entry = next((e for e in self._pending if e["id"] == command_id), None)
+            if entry is None:
+                return
+            self._pending.remove(entry)
+        self._record(entry, status, entry["received_at"] or time.time(), time.time())
+
+    def poll_acks(self):
+        """Reads Blender's acknowledgements if they changed. Returns the newly acknowledged ids."""
+        with self._lock:
+            if self._dirty:
+                self._write()
+        try:
+            stat = os.stat(self.ack_path)
+        except FileNotFoundError:
+            return []
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if signature == self._ack_signature:
+            return []
+        acks = _read_json(self.ack_path)
+        if not acks:
+            return []  # Half-written; read it again next time.
+        self._ack_signature = signature
+
+        acked_through = acks.get("acked_through", 0)
+        details = acks.get("acks", {})
+        with self._lock:
+            done = [e for e in self._pending if e["target"] == BLENDER and e["id"] <= acked_through]
+            for entry in done:
+                self._pending.remove(entry)
+            if done:
+                self._write()
+
+        now = time.time()
+        for entry in done:
+            detail = details.get(str(entry["id"]), {})
+            self._record(entry, detail.get("status", "done"),
+                         detail.get("received_at", now), detail.get("done_at", now))
+        return [entry["id"] for entry in done]
+
+    def _record(self, entry, status, received_at, done_at):
+        delivery_ms = max(0.0, (received_at - entry["enqueued_at"]) * 1000.0)
+        total_ms = max(0.0, (done_at - entry["enqueued_at"]) * 1000.0)
+        command = entry["command"]
+        if command not in self.latencies:
+            self.latencies[command] = deque(maxlen=config.COMMAND_METRICS_WINDOW)
+        self.latencies[command].append((delivery_ms, total_ms))
+        print(f"COMMAND_QUEUE: #{entry['id']} {command} {status} after {total_ms:.0f} ms "
+              f"(picked up after {delivery_ms:.0f} ms).")
+
+    # --- Metrics ---
+
+    def pending_count(self):
+        with self._lock:
+            return len(self._pending)
+
+    def metrics(self):
+        """Returns {command: {count, coalesced, delivery/total mean and p95 in ms}}."""
+        metrics = {}
+        for command, samples in self.latencies.items():
+            delivery = [d for d, _ in samples]
+            total = [t for _, t in samples]
+            metrics[command] = {
+                "count": len(samples),
+                "coalesced": self.coalesced.get(command, 0),
+                "delivery_mean_ms": sum(delivery) / len(delivery),
+                "delivery_p95_ms": _percentile(delivery, 0.95),
+                "total_mean_ms": sum(total) / len(total),
+                "total_p95_ms": _percentile(total, 0.95),
+            }
+        return metrics
+
+    def report(self):
+        """Prints the latency metrics, one line per command."""
+        for command, m in sorted(self.metrics().items()):
+            print(f"  {command:<22} n={m['count']:<4} coalesced={m['coalesced']:<3} "
+                  f"delivery {m['delivery_mean_ms']:6.0f} ms (p95 {m['delivery_p95_ms']:6.0f}), "
+                  f"total {m['total_mean_ms']:7.0f} ms (p95 {m['total_p95_ms']:7.0f})")
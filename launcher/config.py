@@ -20,6 +20,8 @@ ASSETS_DIR = DATA_DIR / "assets"
 # File paths
 STATE_JSON = INPUT_DIR / "state.json"
 FINGERTIPS_JSON = INPUT_DIR / "fingertips.json"
+COMMAND_QUEUE_JSON = INPUT_DIR / "command_queue.json"  # Written by the launcher only.
+COMMAND_ACKS_JSON = INPUT_DIR / "command_acks.json"    # Written by Blender only.
 SCENE_BLEND = BLENDER_DIR / "scene.blend"
 
 # --- PATHS ---
@@ -31,4 +33,57 @@ BLENDER_EXECUTABLE_PATH = r"C:\Program Files\Blender Foundation\Blender 4.4\blen
 # If your ComfyUI installation is elsewhere, please update this path.
 COMFYUI_ROOT_PATH = Path("C:/ComfyUI/ComfyUI_windows_portable_nvidia/ComfyUI_windows_portable/ComfyUI")
 COMFYUI_OUTPUT_PATH = COMFYUI_ROOT_PATH / "output"
-COMFYUI_CONJURE_OUTPUT_PATH = COMFYUI_OUTPUT_PATH / "CONJURE" 
\ No newline at end of file
+COMFYUI_CONJURE_OUTPUT_PATH = COMFYUI_OUTPUT_PATH / "CONJURE" 
+# --- VOICE INPUT ---
+# Which speech-to-text backend transcribes the recorded segments:
+# 'whisper' (OpenAI API), 'local' (faster-whisper, offline) or 'stub' (no audio is sent anywhere).
+STT_BACKEND = "whisper"
+STT_LOCAL_MODEL = "base.en"      # faster-whisper model name used by the 'local' backend.
+VAD_BLOCK_MS = 30                # Audio is analysed in blocks of this length.
+VAD_THRESHOLD = 0.01             # RMS level above which a block counts as speech.
+VAD_SILENCE_MS = 450             # A pause this long after speech closes the current segment.
+VAD_PREROLL_MS = 150             # Audio kept before the first speech block of a segment.
+VAD_MIN_SPEECH_MS = 120          # Segments with less speech than this are dropped as noise.
+VAD_MAX_SEGMENT_S = 12.0         # Long stretches of speech are cut into segments of at most this length.
+STT_TAIL_MS = 150                # Audio still captured after push-to-talk is released.
+TRIM_PEAK_THRESHOLD = 0.01       # Blocks at the edges of a segment whose peak stays below this are trimmed.
+AUDIO_RING_SECONDS = 30.0        # Size of the preallocated recording buffer; must exceed VAD_MAX_SEGMENT_S.
+
+# --- AGENT ---
+# Endpoints can be redirected, e.g. to launcher/fake_agent_server.py for latency measurements.
+OPENAI_BASE_URL = os.environ.get("CONJURE_OPENAI_BASE_URL")          # None uses the public OpenAI API.
+ELEVENLABS_BASE_URL = os.environ.get("CONJURE_ELEVENLABS_BASE_URL")  # None uses the public ElevenLabs API.
+AGENT_MODEL = "gpt-4o"
+INTENT_FAST_PATH = True          # Resolve simple commands ("undo", "select option two") without the LLM.
+TTS_OUTPUT_FORMAT = "pcm_22050"  # Raw 16-bit mono PCM, so audio chunks can be played as they arrive.
+TTS_SAMPLE_RATE = 22050          # Must match TTS_OUTPUT_FORMAT.
+TTS_MIN_CHUNK_CHARS = 24         # Shorter sentences are merged with the next one before synthesis.
+TTS_CACHE_DIR = DATA_DIR / "tts_cache"
+TTS_CACHE_MAX_BYTES = 200 * 1024 * 1024  # Least recently played audio is evicted beyond this; 0 disables the cache.
+# Spoken often enough to synthesize at startup (the intent router's replies are added to these).
+TTS_PRESYNTHESIZE_PHRASES = [
+    "Welcome to CONJURE.",
+    "Generating concepts now.",
+]
+
+# --- COMMAND QUEUE ---
+# A newer command of these kinds replaces a queued one that hasn't run yet, if they agree on
+# the listed parameters: a material for another segment is a different command, not a newer one.
+COMMAND_LATEST_WINS = {"spawn_primitive": (), "select_concept": (), "apply_material": ("segment_id",)}
+# Blender commands that can be dropped when an identical one is still queued. Repeatable ones
+# (undo_last_action, spawn_primitive) are never deduplicated.
+COMMAND_IDEMPOTENT = {"import_last_model", "export_final_model", "request_segmentation",
+                      "isolate_segment", "apply_material"}
+COMMAND_METRICS_WINDOW = 100     # Latency samples kept per command.
+# How often the launcher checks whether another process changed the state or ack files
+# (a stat() per file; the state is only parsed when one changed).
+FILE_WATCH_INTERVAL_SECONDS = 0.05
+
+# --- CONVERSATION MEMORY ---
+MEMORY_TOKEN_BUDGET = 3000        # Max tokens of pinned facts, summary and turns sent per request.
+MEMORY_PINNED_MAX_TOKENS = 500    # Each pinned fact (e.g. a long userPrompt.txt) is cut to this.
+MEMORY_MIN_MESSAGES = 4           # The latest messages are always kept verbatim, whatever their size.
+MEMORY_SUMMARY_MODEL = "gpt-4o-mini"
+MEMORY_SUMMARY_MAX_TOKENS = 300   # Length cap of the rolling summary of evicted turns.
+USER_PROMPT_PATH = DATA_DIR / "generated_text" / "userPrompt.txt"
+AGENT_PROMPT_PATH = PROJECT_ROOT / "devnotes" / "agentPrompt.txt"  # Reloaded when it changes on disk.
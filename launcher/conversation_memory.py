@@ -0,0 +1,251 @@
+"""
+Token-budgeted conversation memory for the agent.
+
+Every message is stored with its token count (tiktoken if it is installed,
+otherwise an estimate of four characters per token). When the conversation
+outgrows MEMORY_TOKEN_BUDGET, the oldest turns are evicted and folded into a
+rolling summary by a background thread, so no request waits on it. Until
+the summary is updated, evicted turns are still sent verbatim as far as the
+budget allows. Pinned facts (the current design prompt, the chosen option,
+the generation mode) are sent with every request, however old the turn that
+set them, each cut to MEMORY_PINNED_MAX_TOKENS. The budget covers the
+pinned facts, the summary (counted at its cap) and all turns; only the
+static prefix and the latest MEMORY_MIN_MESSAGES are outside it.
+
+A request is laid out so that as much of it as possible repeats the
+previous request byte for byte, which lets the API serve it from its
+prompt cache:
+    static prefix (system prompt, tool schema), summary of earlier turns,
+    recent turns, pinned facts, newest message.
+The summary only changes on eviction and the turns only grow, so each
+request shares everything up to the previous reply with the one before.
+"""
+
+import json
+import threading
+
+import launcher.config as config
+
+MESSAGE_OVERHEAD_TOKENS = 4  # Role and separators the chat format adds to every message.
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+
+class TokenCounter:
+    """Counts tokens with tiktoken when available, else estimates chars / 4."""
+    def __init__(self, model=None):
+        self._encoding = None
+        if tiktoken is not None:
+            try:
+                self._encoding = tiktoken.encoding_for_model(model or config.AGENT_MODEL)
+            except KeyError:
+                self._encoding = tiktoken.get_encoding("o200k_base")
+
+    @property
+    def exact(self):
+        return self._encoding is not None
+
+    def count(self, text):
+        if not text:
+            return 0
+        if self._encoding is not None:
+            return len(self._encoding.encode(text))
+        return len(text) // 4 + 1
+
+    def count_message(self, message):
+        return self.count(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+
+
+def readable_turn(message):
+    """Condenses a stored message to the text worth summarizing: agent replies are JSON."""
+    content = message["content"]
+    if message["role"] != "assistant":
+        return f"User: {content}"
+    try:
+        reply = json.loads(content)
+    except (json.JSONDecodeError, TypeError):
+        return f"Agent: {content}"
+    line = f"Agent: {reply.get('spoken') or ''}"
+    instruction = reply.get("instruction") or {}
+    if instruction.get("tool_name"):
+        line += f" [ran {instruction['tool_name']} {json.dumps(instruction.get('parameters') or {})}]"
+    return line
+
+
+class ConversationMemory:
+    """
+    Holds the conversation and builds the message list for each request.
+
+    Args:
+        prefix: The static messages every request starts with (see set_prefix).
+        counter: TokenCounter used for all budgets.
+        summarize: Callable (previous_summary, evicted_lines) -> new summary.
+            If it is None or fails, the evicted lines are appended as-is and
+            the summary is cut to MEMORY_SUMMARY_MAX_TOKENS.
+    """
+    def __init__(self, prefix=None, counter=None, summarize=None,
+                 budget=None, min_messages=None):
+        self.prefix = list(prefix or [])
+        self.counter = counter or TokenCounter()
+        self.summarize = summarize
+        self.budget = config.MEMORY_TOKEN_BUDGET if budget is None else budget
+        self.min_messages = config.MEMORY_MIN_MESSAGES if min_messages is None else min_messages
+
+        self.turns = []          # (message, tokens), oldest first.
+        self.evicted = []        # Messages dropped from 'turns' but not yet in the summary.
+        self.summary = ""
+        self.pinned = {}         # Label -> value, in insertion order.
+        self._lock = threading.Lock()
+        self._summarizing = False
+
+    # --- Contents ---
+
+    def add(self, role, content):
+        message = {"role": role, "content": content}
+        with self._lock:
+            self.turns.append((message, self.counter.count_message(message)))
+        self._evict()
+
+    def set_prefix(self, messages):
+        """Replaces the static messages every request starts with."""
+        with self._lock:
+            self.prefix = list(messages)
+
+    def pin(self, label, value):
+        """Keeps 'label: value' in every request. A None or empty value unpins it."""
+        if value in (None, ""):
+            self.pinned.pop(label, None)
+            return
+        value = self._truncate(str(value), config.MEMORY_PINNED_MAX_TOKENS, keep_end=False)
+        if self.pinned.get(label) != value:
+            self.pinned[label] = value
+            # Larger facts leave less room for the turns.
+            self._evict()
+
+    def messages(self):
+        """Returns the message list for the next request."""
+        with self._lock:
+            messages = list(self.prefix)
+            if self.summary:
+                messages.append({"role": "system", "content": f"Summary of the earlier conversation:\n{self.summary}"})
+            messages.extend(self._evicted_within_budget())
+            recent = [message for message, _ in self.turns]
+            messages.extend(recent[:-1])
+            if self.pinned:
+                # Facts change often, so they go after everything that can be cached.
+                facts = "\n".join(f"- {label}: {value}" for label, value in self.pinned.items())
+                messages.append({"role": "system", "content": f"Current session facts:\n{facts}"})
+            messages.extend(recent[-1:])
+            return messages
+
+    def token_usage(self):
+        """Returns {part: tokens} for the next request, as counted locally."""
+        with self._lock:
+            return {
+                "prefix": sum(self.counter.count_message(m) for m in self.prefix),
+                "pinned": sum(self.counter.count(f"{k}: {v}") for k, v in self.pinned.items()),
+                "summary": self.counter.count(self.summary),
+                "evicted": sum(self.counter.count_message(m) for m in self.evicted),
+                "turns": sum(tokens for _, tokens in self.turns),
+            }
+
+    # --- Eviction and summary ---
+
+    def _turn_budget(self):
+        """Tokens left for turns once the pinned facts and a full summary are sent."""
+        pinned = sum(self.counter.count(f"{k}: {v}") for k, v in self.pinned.items())
+        return max(0, self.budget - pinned - config.MEMORY_SUMMARY_MAX_TOKENS)
+
+    def _evicted_within_budget(self):
+        """
+        The newest evicted messages that still fit the budget next to the
+        turns. The rest only reach the model through the summary.
+        Called with the lock held.
+        """
+        room = self._turn_budget() - sum(tokens for _, tokens in self.turns)
+        kept = []
+        for message in reversed(self.evicted):
+            room -= self.counter.count_message(message)
+            if room < 0:
+                break
+            kept.append(message)
+        return kept[::-1]
+
+    def _evict(self):
+        with self._lock:
+            budget = self._turn_budget()
+            used = sum(tokens for _, tokens in self.turns)
+            # Evict whole exchanges, so the history never starts with a lone reply.
+            while used > budget and len(self.turns) > self.min_messages:
+                message, tokens = self.turns.pop(0)
+                self.evicted.append(message)
+                used -= tokens
+                if len(self.turns) > 1 and self.turns[0][0]["role"] == "assistant":
+                    message, tokens = self.turns.pop(0)
+                    self.evicted.append(message)
+                    used -= tokens
+            if not self.evicted or self._summarizing:
+                return
+            self._summarizing = True
+        threading.Thread(target=self._summarize_evicted, daemon=True).start()
+
+    def _summarize_evicted(self):
+        while True:
+            with self._lock:
+                batch = list(self.evicted)
+                previous = self.summary
+                if not batch:
+                    self._summarizing = False
+                    return
+            lines = [readable_turn(message) for message in batch]
+            summary = None
+            if self.summarize:
+                try:
+                    summary = self.summarize(previous, lines)
+                except Exception as e:
+                    print(f"MEMORY: Summarization failed, keeping the turns verbatim: {e}")
+            if not summary:
+                summary = "\n".join(filter(None, [previous] + lines))
+            summary = self._truncate(summary, config.MEMORY_SUMMARY_MAX_TOKENS)
+
+            with self._lock:
+                self.summary = summary
+                del self.evicted[:len(batch)]
+            print(f"MEMORY: Folded {len(batch)} messages into the summary ({self.counter.count(summary)} tokens).")
+
+    def _truncate(self, text, max_tokens, keep_end=True):
+        """
+        Cuts 'text' to max_tokens, keeping its end (the most recent part of
+        a summary) or, with keep_end=False, its start.
+        """
+        if self.counter.count(text) <= max_tokens:
+            return text
+        lines = text.splitlines()
+        while len(lines) > 1 and self.counter.count("\n".join(lines)) > max_tokens:
+            lines.pop(0 if keep_end else -1)
+        text = "\n".join(lines)
+        while self.counter.count(text) > max_tokens:
+            cut = len(text) // 4 or 1
+            text = text[cut:] if keep_end else text[:-cut]
+        return text
+
+
+def llm_summarizer(openai_client, model=None):
+    """Returns a summarize callable that asks a small chat model to update the summary."""
+    def summarize(previous, lines):
+        prompt = (
+            "Update the running summary of a conversation between a user and CONJURE, a voice-driven "
+            "3D design assistant. Keep design decisions, requested changes, chosen options and open "
+            "questions; drop small talk. Answer with the updated summary only, at most a few sentences.\n\n"
+            f"Current summary:\n{previous or '(empty)'}\n\nNew turns:\n" + "\n".join(lines)
+        )
+        response = openai_client.chat.completions.create(
+            model=model or config.MEMORY_SUMMARY_MODEL,
+            messages=[{"role": "user", "content": prompt}],
+            max_tokens=config.MEMORY_SUMMARY_MAX_TOKENS,
+        )
+        return response.choices[0].message.content.strip()
+    return summarize
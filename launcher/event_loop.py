@@ -0,0 +1,67 @@
+"""
+Helpers for the launcher's asyncio event loop.
+
+Blocking work (ComfyUI workflows, file copies) runs on daemon threads that
+the loop awaits, so a shutdown never waits for a workflow that is still
+running. Changes other processes make to shared files are noticed by
+comparing their mtime and size, which costs a stat() per file and poll
+instead of a JSON parse.
+"""
+
+import asyncio
+import os
+import threading
+
+
+async def run_in_daemon_thread(func, *args):
+    """Runs func(*args) on a new daemon thread and returns its result."""
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def resolve(result, error):
+        if future.cancelled():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def run():
+        try:
+            result = func(*args)
+        except BaseException as e:
+            error = e
+            result = None
+        else:
+            error = None
+        try:
+            loop.call_soon_threadsafe(resolve, result, error)
+        except RuntimeError:
+            pass  # The loop was closed while the thread ran.
+
+    threading.Thread(target=run, name=getattr(func, "__name__", "job"), daemon=True).start()
+    return await future
+
+
+def file_signature(path):
+    """(mtime_ns, size) of a file, or None if it doesn't exist."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+async def watch_files(paths, on_change, interval):
+    """Calls on_change() whenever one of the files is created, modified or deleted."""
+    signatures = {path: file_signature(path) for path in paths}
+    while True:
+        await asyncio.sleep(interval)
+        changed = False
+        for path in paths:
+            signature = file_signature(path)
+            if signature != signatures[path]:
+                signatures[path] = signature
+                changed = True
+        if changed:
+            on_change()
@@ -0,0 +1,283 @@
+"""
+Local stand-in for the OpenAI chat and ElevenLabs text-to-speech APIs.
+
+Serves canned agent replies with configurable latencies, so the agent's
+time-to-first-audio can be measured without network access or API keys:
+
+    python launcher/fake_agent_server.py --measure
+
+runs a few turns through ConversationalAgent against an in-process server
+and reports, per turn, when the first sentence was parsed and when the
+first audio chunk reached the (silent) player, next to the non-streaming
+path (full reply, then full synthesis). With --check it also verifies that
+every turn's first audio reached the player before the reply had finished
+streaming, and exits with code 1 if not, so it can gate CI:
+
+    python launcher/fake_agent_server.py --check --port 0
+
+Without --measure the server just runs, and the launcher can be pointed at
+it with
+
+    CONJURE_OPENAI_BASE_URL=http://127.0.0.1:8765/v1
+    CONJURE_ELEVENLABS_BASE_URL=http://127.0.0.1:8765
+
+Endpoints:
+    POST /v1/chat/completions               Streamed (SSE) or plain reply. Usage
+                                            reports a simulated prompt cache: the
+                                            prefix shared with the previous request,
+                                            in 128-token steps from 1024 tokens on.
+    POST /v1/text-to-speech/<voice>[/stream] Silent 16-bit PCM, streamed in chunks.
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+DEFAULT_REPLY = {
+    "spoken": "Sure, I can do that. I'm generating three concepts from your current shape now. "
+              "They should appear in a few seconds, so have a look and pick your favourite.",
+    "instruction": {"tool_name": "generate_concepts", "parameters": {}},
+}
+
+
+class FakeAgentHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Set on the class by make_server().
+    settings = None
+    last_prompt = ""
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}") if length else {}
+        path = self.path.split("?")[0]
+        if path.endswith("/chat/completions"):
+            self._chat(body)
+        elif re.match(r"^/v1/text-to-speech/[^/]+(/stream)?$", path):
+            self._tts(body)
+        else:
+            self.send_error(404)
+
+    # --- Chat completions ---
+
+    def _chat(self, body):
+        settings = self.settings
+        reply = json.dumps(settings.reply)
+        usage = self._usage(body, reply)
+        time.sleep(settings.first_token_ms / 1000.0)
+
+        if not body.get("stream"):
+            # Tokens are still "generated" one by one, just not sent until the end.
+            time.sleep(settings.token_ms / 1000.0 * len(_tokens(reply)))
+            self._send_json({
+                "id": "chatcmpl-fake", "object": "chat.completion", "created": int(time.time()),
+                "model": body.get("model", "fake"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": reply}, "finish_reason": "stop"}],
+                "usage": usage,
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for token in _tokens(reply):
+            self._send_event(_chunk(body, {"content": token}, None))
+            time.sleep(settings.token_ms / 1000.0)
+        self._send_event(_chunk(body, {}, "stop"))
+        if (body.get("stream_options") or {}).get("include_usage"):
+            final = _chunk(body, {}, None)
+            final["choices"] = []
+            final["usage"] = usage
+            self._send_event(final)
+        self._write_chunk(b"data: [DONE]\n\n")
+        self._write_chunk(b"")
+
+    def _usage(self, body, reply):
+        prompt = json.dumps(body.get("messages", []))
+        shared = 0
+        for a, b in zip(prompt, FakeAgentHandler.last_prompt):
+            if a != b:
+                break
+            shared += 1
+        FakeAgentHandler.last_prompt = prompt
+        # About four characters per token; cache hits come in 128-token blocks from 1024 tokens.
+        prompt_tokens = len(prompt) // 4
+        cached = (shared // 4) // 128 * 128
+        completion_tokens = len(_tokens(reply))
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_tokens_details": {"cached_tokens": cached if cached >= 1024 else 0},
+        }
+
+    def _send_event(self, payload):
+        self._write_chunk(f"data: {json.dumps(payload)}\n\n".encode())
+
+    # --- Text to speech ---
+
+    def _tts(self, body):
+        settings = self.settings
+        text = body.get("text", "")
+        # Silence of roughly the length the sentence would take to say.
+        total_bytes = int(settings.sample_rate * settings.seconds_per_char * len(text)) * 2
+        time.sleep(settings.tts_first_byte_ms / 1000.0)
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        sent = 0
+        while sent < total_bytes:
+            size = min(settings.audio_chunk_bytes, total_bytes - sent)
+            self._write_chunk(bytes(size))
+            sent += size
+            # Synthesis runs faster than real time.
+            time.sleep(size / 2 / settings.sample_rate / settings.tts_speedup)
+        self._write_chunk(b"")
+
+    # --- HTTP helpers ---
+
+    def _send_json(self, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _write_chunk(self, data):
+        self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+
+def _tokens(text):
+    """Splits text into pieces of about the size of LLM tokens."""
+    return re.findall(r"\s*\S{1,4}", text) or [text]
+
+
+def _chunk(body, delta, finish_reason):
+    return {
+        "id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": int(time.time()),
+        "model": body.get("model", "fake"),
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+
+
+def make_server(args):
+    FakeAgentHandler.settings = args
+    return ThreadingHTTPServer((args.host, args.port), FakeAgentHandler)
+
+
+# --- Measurement ---
+
+class NullPlayer:
+    """Discards audio, like a muted PcmPlayer."""
+    def write(self, data):
+        pass
+
+    def close(self):
+        pass
+
+
+def measure(args):
+    server = make_server(args)
+    host, port = server.server_address
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    # The agent reads its endpoints from the config at import time.
+    os.environ["CONJURE_OPENAI_BASE_URL"] = f"http://{host}:{port}/v1"
+    os.environ["CONJURE_ELEVENLABS_BASE_URL"] = f"http://{host}:{port}"
+    os.environ.setdefault("OPENAI_API_KEY", "fake")
+    os.environ.setdefault("ELEVENLABS_API_KEY", "fake")
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    from agent_api import ConversationalAgent
+
+    agent = ConversationalAgent(openai_api_key=os.environ["OPENAI_API_KEY"], instruction_manager=None)
+    # Every turn should measure synthesis, and the silent audio must not end up in the real cache.
+    agent.tts_cache = None
+    streamed, blocking, reply_done = [], [], []
+
+    for turn in range(args.turns):
+        # Streaming path, as used by the launcher.
+        start = time.perf_counter()
+        first_sentence = []
+        speaker = agent.open_speaker(player=NullPlayer(), on_sentence=lambda s: first_sentence.append(time.perf_counter()))
+        agent.complete_stream("Make me some concepts.", on_spoken=speaker.feed)
+        reply_done.append((time.perf_counter() - start) * 1000.0)
+        speaker.close()
+        streamed.append(((first_sentence[0] - start) * 1000.0 if first_sentence else float("nan"),
+                         (speaker.first_audio_at - start) * 1000.0 if speaker.first_audio_at else float("nan")))
+
+        # Blocking path: whole reply, then the whole audio, then playback.
+        start = time.perf_counter()
+        reply = json.loads(agent.complete("Make me some concepts."))
+        audio = b"".join(agent._synthesize_stream(reply["spoken"]))
+        blocking.append((time.perf_counter() - start) * 1000.0)
+
+        print(f"turn {turn + 1}: first sentence {streamed[-1][0]:7.1f} ms, first audio {streamed[-1][1]:7.1f} ms, "
+              f"reply complete {reply_done[-1]:7.1f} ms (blocking path: {blocking[-1]:7.1f} ms, {len(audio)} bytes)")
+
+    for i, metrics in enumerate(agent.turn_metrics):
+        print(f"request {i + 1}: prompt {metrics['prompt_tokens']} tokens, cached {metrics['cached_tokens']} "
+              f"({metrics['cache_hit_ratio']:.0%})")
+
+    mean = lambda values: sum(values) / len(values)
+    print(f"\nMean time to first audio: streaming {mean([a for _, a in streamed]):.1f} ms, "
+          f"blocking {mean(blocking):.1f} ms")
+    server.shutdown()
+
+    # NaN (no audio at all) fails the comparison too.
+    late = [turn + 1 for turn, ((_, first_audio), done) in enumerate(zip(streamed, reply_done))
+            if not first_audio < done]
+    return late
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Fake OpenAI/ElevenLabs server for agent latency measurements.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765, help="0 picks a free port.")
+    parser.add_argument("--first-token-ms", type=float, default=400.0, help="Delay before the first LLM token.")
+    parser.add_argument("--token-ms", type=float, default=15.0, help="Delay between LLM tokens.")
+    parser.add_argument("--tts-first-byte-ms", type=float, default=200.0, help="Delay before the first audio chunk.")
+    parser.add_argument("--tts-speedup", type=float, default=4.0, help="How much faster than real time audio is produced.")
+    parser.add_argument("--seconds-per-char", type=float, default=0.06, help="Length of the fake speech per character.")
+    parser.add_argument("--sample-rate", type=int, default=22050)
+    parser.add_argument("--audio-chunk-bytes", type=int, default=4096)
+    parser.add_argument("--reply", type=Path, default=None, help="JSON file with the agent reply to serve.")
+    parser.add_argument("--measure", action="store_true", help="Measure time-to-first-audio against an in-process server.")
+    parser.add_argument("--check", action="store_true",
+                        help="Like --measure, but exit with code 1 unless audio starts before each reply is complete.")
+    parser.add_argument("--turns", type=int, default=3)
+    args = parser.parse_args()
+    args.reply = json.loads(args.reply.read_text(encoding="utf-8")) if args.reply else DEFAULT_REPLY
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.measure or args.check:
+        late = measure(args)
+        if args.check:
+            if late:
+                print(f"CHECK FAILED: first audio came after the complete reply in turn(s) {late}.")
+                sys.exit(1)
+            print("CHECK PASSED: first audio arrived before the reply was complete in every turn.")
+    else:
+        server = make_server(args)
+        print(f"Fake agent server listening on http://{args.host}:{server.server_address[1]}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            server.shutdown()
@@ -1,12 +1,30 @@
+import json
+
 from state_manager import StateManager
+from command_queue import CommandQueue, BLENDER, LAUNCHER
+
+# Parameters of every tool, as described to the agent. Sent as a fixed JSON
+# block right after the system prompt, so it is part of the cacheable prefix.
+TOOL_PARAMETERS = {
+    "spawn_primitive": {"primitive_type": ["Sphere", "Cube", "Cone", "Cylinder", "Disk", "Torus", "Head", "Body"]},
+    "generate_concepts": {},
+    "select_concept": {"option_id": [1, 2, 3]},
+    "request_segmentation": {},
+    "isolate_segment": {},
+    "apply_material": {"material_description": "string", "segment_id": "string or null"},
+    "export_final_model": {},
+    "undo_last_action": {},
+    "import_last_model": {},
+}
 
 class InstructionManager:
     """
     Receives instruction objects from the agent and triggers the corresponding
-    backend logic by updating the state file.
+    backend logic by queuing a command for Blender or the launcher's main loop.
     """
-    def __init__(self, state_manager: StateManager):
+    def __init__(self, state_manager: StateManager, command_queue: CommandQueue):
         self.state_manager = state_manager
+        self.command_queue = command_queue
         self.tool_map = {
             "spawn_primitive": self.spawn_primitive,
             "generate_concepts": self.generate_concepts,
@@ -19,6 +37,14 @@ class InstructionManager:
             "import_last_model": self.import_last_model,
         }
 
+    def tool_schema(self) -> str:
+        """
+        The available tools and their parameters as JSON. The output is
+        byte-for-byte stable between calls, so it can sit in a cached prompt prefix.
+        """
+        tools = [{"tool_name": name, "parameters": TOOL_PARAMETERS.get(name, {})} for name in sorted(self.tool_map)]
+        return json.dumps({"tools": tools}, sort_keys=True, separators=(",", ":"))
+
     def execute_instruction(self, instruction: dict):
         """
         Public method to execute a given instruction.
@@ -41,74 +67,61 @@ class InstructionManager:
 
     def spawn_primitive(self, params: dict):
         """
-        Handles the 'spawn_primitive' instruction by updating the state file
-        with a command for Blender.
+        Handles the 'spawn_primitive' instruction by queuing a command for Blender.
         """
         primitive_type = params.get("primitive_type")
         if not primitive_type:
             print("Error: spawn_primitive called without 'primitive_type' parameter.")
             return
-        
-        # This command will be read by the main operator in Blender
-        command_data = {
-            "command": "spawn_primitive",
-            "primitive_type": primitive_type
-        }
-        self.state_manager.update_state(command_data) 
+
+        # This command will be run by the main operator in Blender
+        self.command_queue.push("spawn_primitive", {"primitive_type": primitive_type})
 
     def generate_concepts(self, params: dict):
         """
-        Handles the 'generate_concepts' instruction by setting the
-        'generation_request' state for the main loop.
+        Handles the 'generate_concepts' instruction by queuing a generation
+        request for the main loop.
         """
-        # The main loop in launcher/main.py will detect this state change.
-        print("INFO: Setting state for concept generation request.")
-        self.state_manager.set_state("generation_request", "new")
+        # The main loop in launcher/main.py takes it from the queue.
+        print("INFO: Queuing concept generation request.")
+        self.command_queue.push("generate_concepts", target=LAUNCHER)
 
     def select_concept(self, params: dict):
         """
-        Handles the 'select_concept' instruction by setting the 'selection_request'
-        state, which is detected by the main loop in launcher/main.py.
+        Handles the 'select_concept' instruction by queuing a selection request,
+        which is taken by the main loop in launcher/main.py.
         """
         option_id = params.get("option_id")
         if option_id not in [1, 2, 3]:
             print(f"Error: select_concept called with invalid 'option_id': {option_id}")
             return
-        
-        print(f"INFO: Setting state for concept selection: {option_id}")
-        self.state_manager.set_state("selection_request", option_id)
+
+        print(f"INFO: Queuing concept selection: {option_id}")
+        self.command_queue.push("select_concept", {"option_id": option_id}, target=LAUNCHER)
 
     def request_segmentation(self, params: dict):
         """Handles the 'request_segmentation' instruction."""
-        print("INFO: Setting command for 'request_segmentation'")
-        self.state_manager.set_state("command", "request_segmentation")
+        self.command_queue.push("request_segmentation", target=BLENDER)
 
     def isolate_segment(self, params: dict):
         """Handles the 'isolate_segment' instruction."""
-        print("INFO: Setting command for 'isolate_segment'")
-        self.state_manager.set_state("command", "isolate_segment")
+        self.command_queue.push("isolate_segment", target=BLENDER)
 
     def apply_material(self, params: dict):
         """Handles the 'apply_material' instruction."""
-        print("INFO: Setting command for 'apply_material'")
-        command_data = {
-            "command": "apply_material",
+        self.command_queue.push("apply_material", {
             "material_description": params.get("material_description"),
             "segment_id": params.get("segment_id") # Can be None
-        }
-        self.state_manager.update_state(command_data)
+        }, target=BLENDER)
 
     def export_final_model(self, params: dict):
         """Handles the 'export_final_model' instruction."""
-        print("INFO: Setting command for 'export_final_model'")
-        self.state_manager.set_state("command", "export_final_model")
+        self.command_queue.push("export_final_model", target=BLENDER)
 
     def undo_last_action(self, params: dict):
         """Handles the 'undo_last_action' instruction."""
-        print("INFO: Setting command for 'undo_last_action'")
-        self.state_manager.set_state("command", "undo_last_action")
+        self.command_queue.push("undo_last_action", target=BLENDER)
 
     def import_last_model(self, params: dict):
         """Handles the 'import_last_model' instruction."""
-        print("INFO: Setting command for 'import_last_model'")
-        self.state_manager.set_state("command", "import_last_model") 
\ No newline at end of file
+        self.command_queue.push("import_last_model", target=BLENDER)
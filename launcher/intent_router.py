@@ -0,0 +1,133 @@
+"""
+Local fast path for common voice commands.
+
+Short commands like "undo", "generate concepts" or "select option two" don't
+need a round trip to the LLM. IntentRouter matches the whole utterance
+against a small grammar of regular expressions, one or more per tool in the
+InstructionManager's tool_map, and dispatches a match straight to
+InstructionManager.execute_instruction. Only utterances that match a rule
+from start to end count as high-confidence; anything else ("undo that and
+make it red") returns None and goes to the LLM as usual. The grammar is
+deliberately strict: selections must name an option or concept, and
+one-word commands that could mean something else ("split", "export", "go
+back") are left to the LLM. Rules that only make sense in one phase of the
+session (selecting a concept while the options are shown) are skipped
+outside it.
+"""
+
+import re
+from collections import namedtuple
+
+Intent = namedtuple("Intent", ["tool_name", "parameters", "reply"])
+
+NUMBERS = {"one": 1, "1": 1, "first": 1, "two": 2, "2": 2, "second": 2, "three": 3, "3": 3, "third": 3}
+# Transcription homophones of "two", only trusted right after "option" or "concept".
+NUMBERS_AFTER_OPTION = dict(NUMBERS, to=2, too=2)
+# The UI view a tool's rules require; outside it the utterance goes to the LLM.
+REQUIRED_VIEW = {"select_concept": "SHOWING_OPTIONS"}
+PRIMITIVES = {"sphere": "Sphere", "ball": "Sphere", "cube": "Cube", "box": "Cube", "cone": "Cone",
+              "cylinder": "Cylinder", "disk": "Disk", "disc": "Disk", "torus": "Torus", "donut": "Torus",
+              "doughnut": "Torus", "head": "Head", "body": "Body"}
+
+_NUMBER = r"(?P<n>" + "|".join(NUMBERS) + r")"
+_OPTION_NUMBER = r"(?:option|concept) (?P<n>" + "|".join(NUMBERS_AFTER_OPTION) + r")"
+_SELECT_VERB = r"(?:select|choose|pick|go with|i like)(?: the)? "
+_PRIMITIVE = r"(?P<p>" + "|".join(PRIMITIVES) + r")"
+
+# Politeness and wake words around a command, removed before matching.
+_LEADING_FILLER = re.compile(r"^(?:(?:hey|ok|okay|conjure|please|can you|could you|would you|let s|lets|"
+                             r"i want to|i d like to|i would like to|now)\s+)+")
+_TRAILING_FILLER = re.compile(r"(?:\s+(?:please|thanks|thank you|now|for me))+$")
+
+# (tool_name, pattern over the normalized utterance, parameter builder, spoken reply)
+RULES = [
+    ("undo_last_action", r"(?:undo|revert|take that back)(?: (?:that|this|it|the last (?:action|change|step)))?",
+     lambda m: {}, "Undoing that."),
+    ("generate_concepts", r"(?:generate|make|create|show me|give me)(?: (?:some|the|three|3|new))? (?:concepts?|options|ideas|designs)",
+     lambda m: {}, "Generating concepts now."),
+    ("select_concept", _SELECT_VERB + _OPTION_NUMBER,
+     lambda m: {"option_id": NUMBERS_AFTER_OPTION[m.group("n")]}, None),
+    ("select_concept", _SELECT_VERB + _NUMBER + r" (?:option|concept)",
+     lambda m: {"option_id": NUMBERS[m.group("n")]}, None),
+    ("select_concept", r"(?:the )?" + _OPTION_NUMBER,
+     lambda m: {"option_id": NUMBERS_AFTER_OPTION[m.group("n")]}, None),
+    ("spawn_primitive", r"(?:spawn|add|create|make|give me|start with)(?: (?:a|an|the))? " + _PRIMITIVE,
+     lambda m: {"primitive_type": PRIMITIVES[m.group("p")]}, None),
+    ("request_segmentation", r"(?:segment|split|separate)(?: (?:it|this|the model|the mesh)(?: into (?:parts|segments|pieces))?"
+                             r"| into (?:parts|segments|pieces))",
+     lambda m: {}, "Segmenting the model."),
+    ("isolate_segment", r"isolate(?: (?:it|this|that|the))?(?: (?:segment|part|piece))?",
+     lambda m: {}, "Isolating that segment."),
+    ("export_final_model", r"export (?:it|this|(?:the |my )?(?:final )?model)",
+     lambda m: {}, "Exporting the final model."),
+    ("import_last_model", r"(?:import|load|bring in)(?: the)? (?:last|latest|generated|new) model",
+     lambda m: {}, "Importing the latest model."),
+]
+
+
+def normalize(text):
+    """Lower-cases, drops punctuation and strips filler words around the command."""
+    text = re.sub(r"[^a-z0-9]+", " ", text.lower()).strip()
+    text = _TRAILING_FILLER.sub("", _LEADING_FILLER.sub("", text))
+    return text.strip()
+
+
+def _reply(tool_name, parameters):
+    if tool_name == "select_concept":
+        return f"Going with option {parameters['option_id']}."
+    if tool_name == "spawn_primitive":
+        return f"Here's a {parameters['primitive_type'].lower()}."
+    return None
+
+
+class IntentRouter:
+    """Resolves high-confidence commands locally and dispatches them."""
+    def __init__(self, instruction_manager):
+        self.instruction_manager = instruction_manager
+        # Only rules for tools the InstructionManager actually provides.
+        self.rules = [
+            (tool_name, re.compile(pattern), build, reply)
+            for tool_name, pattern, build, reply in RULES
+            if tool_name in instruction_manager.tool_map
+        ]
+
+    def stock_replies(self):
+        """Every phrase the router can answer with, e.g. to pre-synthesize their speech."""
+        replies = [reply for _, _, _, reply in self.rules if reply]
+        tools = {tool_name for tool_name, _, _, _ in self.rules}
+        if "select_concept" in tools:
+            replies += [_reply("select_concept", {"option_id": n}) for n in sorted(set(NUMBERS.values()))]
+        if "spawn_primitive" in tools:
+            replies += [_reply("spawn_primitive", {"primitive_type": p}) for p in dict.fromkeys(PRIMITIVES.values())]
+        return replies
+
+    def _current_view(self):
+        state = self.instruction_manager.state_manager.get_state()
+        return (state.get("ui") or {}).get("view")
+
+    def match(self, text):
+        """Returns the Intent the whole utterance asks for, or None."""
+        normalized = normalize(text or "")
+        if not normalized:
+            return None
+        view = None
+        for tool_name, pattern, build, reply in self.rules:
+            m = pattern.fullmatch(normalized)
+            if m and tool_name in REQUIRED_VIEW:
+                # E.g. no options on screen yet: let the LLM explain or ask.
+                view = view or self._current_view()
+                if view != REQUIRED_VIEW[tool_name]:
+                    continue
+            if m:
+                parameters = build(m)
+                return Intent(tool_name, parameters, reply or _reply(tool_name, parameters))
+        return None
+
+    def route(self, text):
+        """Dispatches the utterance if it is a known command. Returns the Intent, or None for the LLM."""
+        intent = self.match(text)
+        if intent is None:
+            return None
+        print(f"INTENT_ROUTER: '{text}' -> {intent.tool_name} {intent.parameters}")
+        self.instruction_manager.execute_instruction({"tool_name": intent.tool_name, "parameters": intent.parameters})
+        return intent
@@ -21,7 +21,7 @@ for p in sys.path:
 print("--------------------------\n")
 # -----------------------------------
 
-import time
+import asyncio
 import atexit
 import json
 import uuid
@@ -30,11 +30,16 @@ import shutil
 
 from subprocess_manager import SubprocessManager
 from state_manager import StateManager
-from comfyui.api_wrapper import load_workflow, run_workflow, modify_workflow_paths
+from comfyui.api_wrapper import run_workflow
+from comfyui.workflow_templates import load_workflow_templates, WorkflowBindingError
 import launcher.config as config
 from agent_api import ConversationalAgent
 from instruction_manager import InstructionManager
+from command_queue import CommandQueue
 from launcher.voice_input_manager import VoiceInputManager
+from agent_pipeline import AgentTurnPipeline
+from intent_router import IntentRouter
+from event_loop import run_in_daemon_thread, watch_files
 
 
 class ConjureApp:
@@ -42,9 +47,22 @@ class ConjureApp:
         print("Initializing CONJURE...")
         self.state_manager = StateManager()
         self.subprocess_manager = SubprocessManager()
-        self.instruction_manager = InstructionManager(self.state_manager)
+        # Instructions become ordered, acknowledged commands for Blender and this loop.
+        self.command_queue = CommandQueue()
+        self.instruction_manager = InstructionManager(self.state_manager, self.command_queue)
         self.project_root = Path(__file__).parent.parent.resolve()
+        self._stopped = False
+        self._running = False
+        self._jobs = set()  # Running generation job tasks.
         atexit.register(self.stop)
+
+        # Load and validate all ComfyUI workflows once, so binding errors
+        # surface now instead of in the middle of a generation.
+        try:
+            self.workflows = load_workflow_templates(self.project_root / "comfyui" / "workflows")
+        except WorkflowBindingError as e:
+            print(f"FATAL: {e}")
+            sys.exit(1)
         
         # Initialize UI state
         self.state_manager.update_state({
@@ -66,34 +84,50 @@ class ConjureApp:
             sys.exit(1) # Exit with a non-zero status code to indicate an error
         self.agent = ConversationalAgent(openai_api_key=api_key, instruction_manager=self.instruction_manager)
         
-        # Initialize Voice Input Manager for STT
-        self.voice_input_manager = VoiceInputManager(api_key=api_key)
+        # Initialize Voice Input Manager for STT. Segments are transcribed
+        # while the user is still speaking; partial transcripts go to the UI.
+        self.voice_input_manager = VoiceInputManager(api_key=api_key, on_partial=self.show_partial_transcript)
         self.is_recording = False
+
+        # Agent turns (STT -> LLM -> instruction -> TTS) run on their own
+        # threads so this loop keeps servicing requests during a turn.
+        # Common commands ("undo", "select option two") are resolved locally
+        # instead of going through the LLM.
+        intent_router = IntentRouter(self.instruction_manager) if config.INTENT_FAST_PATH else None
+        self.agent_pipeline = AgentTurnPipeline(
+            self.state_manager, self.voice_input_manager, self.agent, intent_router=intent_router
+        )
+        self.agent_pipeline.start()
+
+        # Synthesize the stock phrases in the background, so they play instantly.
+        stock_phrases = list(config.TTS_PRESYNTHESIZE_PHRASES)
+        if intent_router is not None:
+            stock_phrases += intent_router.stock_replies()
+        self.agent.presynthesize(stock_phrases)
         
         print("CONJURE Agent is initialized and listening...")
 
-    def start(self):
+    async def start(self):
         """Starts all the necessary components of the application."""
         print("CONJURE application starting...")
         self.state_manager.set_state("app_status", "running")
 
-        self.subprocess_manager.start_gui()
+        await self.subprocess_manager.start_gui()
         self.state_manager.set_state("gui_status", "running")
 
-        self.subprocess_manager.start_hand_tracker()
+        await self.subprocess_manager.start_hand_tracker()
         self.state_manager.set_state("hand_tracker_status", "running")
         
         print("Waiting for hand tracker to initialize...")
-        time.sleep(3)
+        await asyncio.sleep(3)
 
-        self.subprocess_manager.start_blender()
+        await self.subprocess_manager.start_blender()
         self.state_manager.set_state("blender_status", "running")
 
         print("\nCONJURE is now running. Close the Blender window or press Ctrl+C here to exit.")
 
-    def check_for_requests(self):
-        """Checks the state file for requests from Blender and triggers workflows."""
-        state_data = self.state_manager.get_state()
+    def check_for_requests(self, state_data):
+        """Checks the state for requests from Blender and schedules workflows."""
         if not state_data:
             return
 
@@ -101,7 +135,9 @@ class ConjureApp:
         # This block handles the push-to-talk state from the hand tracker.
         user_is_speaking = state_data.get("user_is_speaking")
 
-        if user_is_speaking is True and not self.is_recording:
+        # A new recording waits until the previous one has been transcribed,
+        # since both share the voice input's buffer.
+        if user_is_speaking is True and not self.is_recording and not self.agent_pipeline.transcribing:
             # Clear previous dialogue and set status to "Listening..."
             self.state_manager.set_ui_state({
                 "dialogue": {
@@ -119,29 +155,13 @@ class ConjureApp:
             self.state_manager.set_ui_state({
                 "dialogue": { "status": "Thinking..." }
             })
-            # This is a blocking call that will transcribe the audio.
-            transcribed_text = self.voice_input_manager.stop_recording_and_transcribe()
+            # The pipeline waits for the last speech segment and sends the
+            # transcript to the agent; this loop carries on meanwhile.
+            self.agent_pipeline.submit_recording()
             
             # Important: Reset the speaking state to avoid re-triggering.
             # We set it to None instead of False.
             self.state_manager.update_state({"user_is_speaking": None})
-
-            # If transcription was successful, send the text to the agent.
-            if transcribed_text:
-                print(f"\n>>> Sending to Agent: '{transcribed_text}'")
-                # First, update the UI with the user's transcript
-                self.state_manager.set_ui_state({
-                    "dialogue": {
-                        "user_transcript": transcribed_text,
-                        "agent_response": "..."
-                    }
-                })
-                # Now, set the command for the agent to process
-                self.state_manager.update_state({
-                    "command": "agent_user_message",
-                    "text": transcribed_text
-                })
-            # After handling, we can return to process this on the next cycle.
             return 
         
         # --- Handle Agent and Blender Commands ---
@@ -152,64 +172,87 @@ class ConjureApp:
             print(f"\nUser message received: {state_data.get('text')}")
             # First, clear the user message command so it doesn't get processed again.
             self.state_manager.clear_command()
-            # Now, get the agent's response. The agent may issue a new command
-            # to Blender by updating the state file itself.
-            agent_reply = self.agent.get_response(state_data.get('text'))
-            
-            # Check if the agent returned a valid spoken response.
-            if agent_reply:
-                # Update the UI with the agent's final response and reset status
-                self.state_manager.set_ui_state({
-                    "dialogue": { 
-                        "agent_response": agent_reply,
-                        "status": "Say something..."
-                    }
-                })
-            else:
-                # Inform the user that something went wrong.
-                error_message = "I had a problem processing that. Please try again."
-                self.state_manager.set_ui_state({
-                    "dialogue": { 
-                        "agent_response": error_message,
-                        "status": "Say something..."
-                    }
-                })
+            # Instructions in the agent's reply are queued on the command
+            # queue for Blender or this loop; the reply is shown by the pipeline.
+            self.agent_pipeline.submit_text(state_data.get('text'))
         elif state_data.get("generation_request") == "new":
-            self.handle_generation_request()
-            self.state_manager.clear_specific_requests(["generation_request"])
+            self.schedule_job(self.handle_generation_request, state_data)
+            # The depth flag describes this capture only; don't let a later request inherit it.
+            self.state_manager.clear_specific_requests(["generation_request", "precomputed_depth"])
         elif state_data.get("selection_request"):
-            self.handle_selection_request(state_data, generation_mode)
-            self.state_manager.clear_specific_requests(["selection_request", "selection_status"])
+            self.schedule_job(self.handle_selection_request, state_data, generation_mode)
+            self.state_manager.clear_specific_requests(["selection_request", "selection_status", "precomputed_depth"])
+
+        # --- Handle Queued Commands ---
+        # Requests from the agent arrive through the command queue instead of
+        # the state file; Blender's panel still uses the keys above.
+        self.command_queue.poll_acks()
+        # Blender rendered no depth passes for these, whatever the last capture did.
+        queued_request = dict(state_data, precomputed_depth=False)
+        for entry in self.command_queue.take():
+            if entry["command"] == "generate_concepts":
+                self.schedule_job(self.handle_generation_request, queued_request, command_id=entry["id"])
+            elif entry["command"] == "select_concept":
+                request = dict(queued_request, selection_request=entry["params"]["option_id"])
+                self.schedule_job(self.handle_selection_request, request, generation_mode, command_id=entry["id"])
+            else:
+                self.command_queue.ack(entry["id"], "unsupported")
+
+    def schedule_job(self, func, *args, command_id=None):
+        """
+        Runs a generation step (blocking ComfyUI calls) as a task, so the loop
+        keeps servicing requests meanwhile. Jobs run one at a time, in the
+        order they were scheduled. 'command_id' is acknowledged when it ends,
+        as failed if 'func' returns a false value or raises.
+        """
+        task = asyncio.create_task(self._run_job(func, args, command_id))
+        self._jobs.add(task)
+        task.add_done_callback(self._jobs.discard)
+
+    async def _run_job(self, func, args, command_id):
+        status = "failed"
+        try:
+            async with self._job_lock:
+                succeeded = await run_in_daemon_thread(func, *args)
+            status = "done" if succeeded else "failed"
+        except asyncio.CancelledError:
+            status = "cancelled"
+            raise
+        except Exception as e:
+            print(f"ERROR: {func.__name__} failed: {e}")
+        finally:
+            if command_id is not None:
+                self.command_queue.ack(command_id, status)
+
+    def show_partial_transcript(self, text):
+        """Called from the voice input's upload thread with the transcript so far."""
+        self.state_manager.set_ui_state({
+            "dialogue": { "user_transcript": text }
+        })
 
-    def handle_generation_request(self):
-        """Handles the request to generate initial concept options."""
+    def handle_generation_request(self, state_data):
+        """Handles the request to generate initial concept options. Returns True on success."""
         print("--- Detected Generation Request ---")
-        
-        source_render_path = self.project_root / "data" / "generated_images" / "gestureCamera" / "render.png"
-        comfyui_input_path = config.COMFYUI_ROOT_PATH / "input" / "render.png"
-        
+        # Blender's fast capture may have written a depth pass next to the render.
+        precomputed_depth = bool(state_data.get("precomputed_depth"))
+        render_files = ["render.png", "render_depth.png"] if precomputed_depth else ["render.png"]
+
         try:
-            print(f"Copying {source_render_path} to {comfyui_input_path}...")
-            shutil.copy(source_render_path, comfyui_input_path)
+            for render_file in render_files:
+                source_render_path = self.project_root / "data" / "generated_images" / "gestureCamera" / render_file
+                comfyui_input_path = config.COMFYUI_ROOT_PATH / "input" / render_file
+                print(f"Copying {source_render_path} to {comfyui_input_path}...")
+                shutil.copy(source_render_path, comfyui_input_path)
         except (IOError, FileNotFoundError) as e:
-            print(f"ERROR: Could not copy render.png to ComfyUI input: {e}")
-            return
-
-        workflow_path = self.project_root / "comfyui" / "workflows" / "promptMaker.json"
-        workflow = load_workflow(str(workflow_path))
-        if not workflow:
-            print("ERROR: Could not load promptMaker workflow.")
-            return
+            print(f"ERROR: Could not copy {render_file} to ComfyUI input: {e}")
+            return False
 
         output_dir_abs = self.project_root / "data" / "generated_images" / "imageOPTIONS"
         output_dir_abs.mkdir(parents=True, exist_ok=True)
-        
-        modifications = {
-            "139": {"output_path": str(output_dir_abs)},
-            "142": {"output_path": str(output_dir_abs)},
-            "143": {"output_path": str(output_dir_abs)},
-        }
-        workflow = modify_workflow_paths(workflow, modifications)
+
+        workflow = self.workflows["promptMaker"].build(
+            output_dir=str(output_dir_abs), precomputed_depth=precomputed_depth
+        )
 
         client_id = f"conjure_launcher_{uuid.uuid4()}"
         success = run_workflow(workflow, client_id)
@@ -221,9 +264,13 @@ class ConjureApp:
             print("--- ERROR: promptMaker.json workflow failed. ---")
 
         self.reset_state_file({"generation_request": "done"})
+        return success
 
     def handle_selection_request(self, state_data, mode):
-        """Handles the request to process a selected option and generate a 3D model."""
+        """
+        Handles the request to process a selected option and generate a 3D model.
+        Returns True if the model was generated.
+        """
         option_index = state_data["selection_request"]
         print(f"--- Detected Selection Request for Option {option_index} (Mode: {mode.upper()}) ---")
 
@@ -242,23 +289,19 @@ class ConjureApp:
         except (IOError, FileNotFoundError) as e:
             print(f"ERROR: Could not copy input files to ComfyUI: {e}")
             self.reset_state_file({"selection_status": "failed"})
-            return
+            return False
             
-        # --- 2. Load and Modify mv2mv Workflow ---
+        # --- 2. Select the mv2mv Workflow Template ---
         if mode == 'turbo':
-            workflow_name = f"mv2mv{option_index}turbo.json"
-            workflow_dir = self.project_root / "comfyui" / "workflows" / "turbo"
+            workflow_name = f"mv2mv{option_index}turbo"
         else: # standard
-            workflow_name = f"mv2mv{option_index}.json"
-            workflow_dir = self.project_root / "comfyui" / "workflows" / "standard"
+            workflow_name = f"mv2mv{option_index}"
 
-        workflow_path = workflow_dir / workflow_name
-        
-        workflow = load_workflow(str(workflow_path))
-        if not workflow:
-            print(f"ERROR: Could not load {workflow_path}.")
+        template = self.workflows.get(workflow_name)
+        if not template:
+            print(f"ERROR: No workflow template named '{workflow_name}'.")
             self.reset_state_file({"selection_status": "failed"})
-            return
+            return False
 
         # Hide the options selector while processing
         self.state_manager.set_ui_state({ "view": "DIALOG_ONLY" })
@@ -275,31 +318,23 @@ class ConjureApp:
             except OSError as e:
                 print(f"Error deleting file {f}: {e}")
 
-        if mode == 'turbo':
-            modifications = {
-                "120": {"file_path": str(prompt_path_abs)}, 
-                "165": {"output_path": str(output_dir_abs), "filename_prefix": "mv_1"},
-                "187": {"output_path": str(output_dir_abs), "filename_prefix": "mv_3"},
-                "164": {"output_path": str(output_dir_abs), "filename_prefix": "mv_4"},
-            }
-        else:
-            modifications = {
-                "120": {"file_path": str(prompt_path_abs)},
-                "124": {"output_path": str(output_dir_abs)},
-            }
-
-        workflow = modify_workflow_paths(workflow, modifications)
+        # The multi-view depth passes, if any, were copied with the views above.
+        workflow = template.build(
+            prompt_file=str(prompt_path_abs), output_dir=str(output_dir_abs),
+            precomputed_depth=bool(state_data.get("precomputed_depth"))
+        )
 
         client_id = f"conjure_launcher_{uuid.uuid4()}"
         success = run_workflow(workflow, client_id)
         if success:
             print(f"--- {workflow_name} workflow completed successfully. ---")
-            self.handle_3d_generation(mode)
-        else:
-            print(f"--- ERROR: {workflow_name} workflow failed. ---")
-            self.reset_state_file({"selection_status": "failed"})
+            return self.handle_3d_generation(mode)
+        print(f"--- ERROR: {workflow_name} workflow failed. ---")
+        self.reset_state_file({"selection_status": "failed"})
+        return False
 
     def handle_3d_generation(self, mode):
+        """Turns the multi-view results into a model for Blender to import. Returns True on success."""
         print(f"--- Detected 3D Generation Request (Mode: {mode.upper()}) ---")
 
         print("Copying latest mvResults to ComfyUI input...")
@@ -313,31 +348,10 @@ class ConjureApp:
         except (IOError, FileNotFoundError) as e:
             print(f"ERROR: Could not copy mvResult files to ComfyUI: {e}")
             self.reset_state_file({"3d_generation_request": "failed"})
-            return
+            return False
             
-        if mode == 'turbo':
-            workflow_name = "mv23Dturbo.json"
-            workflow_dir = self.project_root / "comfyui" / "workflows" / "turbo"
-        else:
-            workflow_name = "mv23D.json"
-            workflow_dir = self.project_root / "comfyui" / "workflows"
-
-        workflow_path = workflow_dir / workflow_name
-        if not workflow_path.exists():
-            print(f"--- ERROR: Workflow file not found at {workflow_path} ---")
-            self.reset_state_file({"3d_generation_request": "failed"})
-            return
-
-        workflow = load_workflow(str(workflow_path))
-        if not workflow:
-            print(f"--- ERROR: Could not load workflow from {workflow_path} ---")
-            self.reset_state_file({"3d_generation_request": "failed"})
-            return
-
-        modifications = {
-            "13": {"filename_prefix": "CONJURE/copyMesh"}
-        }
-        workflow = modify_workflow_paths(workflow, modifications)
+        workflow_name = "mv23Dturbo" if mode == 'turbo' else "mv23D"
+        workflow = self.workflows[workflow_name].build()
 
         client_id = f"conjure_launcher_{uuid.uuid4()}"
         success = run_workflow(workflow, client_id)
@@ -365,12 +379,13 @@ class ConjureApp:
             except Exception as e:
                 print(f"ERROR: Could not copy generated model: {e}")
                 self.reset_state_file({"3d_generation_request": "failed"})
-                return
+                return False
 
             self.reset_state_file({"import_request": "new"})
-        else:
-            print(f"--- ERROR: {workflow_name} workflow failed. ---")
-            self.reset_state_file({"3d_generation_request": "failed"})
+            return True
+        print(f"--- ERROR: {workflow_name} workflow failed. ---")
+        self.reset_state_file({"3d_generation_request": "failed"})
+        return False
 
     def reset_state_file(self, data_to_update: dict):
         """
@@ -379,27 +394,81 @@ class ConjureApp:
         self.state_manager.update_state(data_to_update)
         print("State file has been updated.")
 
-    def run(self):
-        """Main application loop. Monitors subprocesses and checks for requests."""
+    def notify(self):
+        """Wakes the main loop. Safe to call from any thread."""
         try:
-            while self.state_manager.get_state().get("app_status") == "running":
-                self.check_for_requests()
+            self.loop.call_soon_threadsafe(self._wake.set)
+        except RuntimeError:
+            pass # The loop has already been closed.
+
+    async def watch_process(self, name):
+        """Shuts the application down when Blender exits; reports other processes exiting."""
+        returncode = await self.subprocess_manager.wait_for_exit(name)
+        if not self._running:
+            return
+        if name == "blender":
+            print("Blender window was closed. Shutting down.")
+            self._running = False
+            self._wake.set()
+        else:
+            print(f"WARNING: The {name} process exited with code {returncode}.")
 
-                blender_process = self.subprocess_manager.processes.get('blender')
-                if blender_process and blender_process.poll() is not None:
-                    print("Blender window was closed. Shutting down.")
+    async def run(self):
+        """
+        Main application loop. Instead of polling, it sleeps until something
+        may have changed: a state write or queued command from this process,
+        a change another process made to the state or acknowledgement files,
+        or a subprocess exiting.
+        """
+        self.loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._job_lock = asyncio.Lock()
+        self.state_manager.add_listener(self.notify)
+        self.command_queue.add_listener(self.notify)
+        watchers = []
+        try:
+            await self.start()
+            self._running = True
+            watchers.append(asyncio.create_task(watch_files(
+                [self.state_manager.state_file_path, self.command_queue.ack_path],
+                self._wake.set, config.FILE_WATCH_INTERVAL_SECONDS
+            )))
+            for name in self.subprocess_manager.processes:
+                watchers.append(asyncio.create_task(self.watch_process(name)))
+
+            self._wake.set() # Pick up anything requested before we started.
+            while self._running:
+                await self._wake.wait()
+                self._wake.clear()
+                state_data = self.state_manager.get_state()
+                if not state_data:
+                    continue # Missing or caught mid-write; wait for the next change.
+                if state_data.get("app_status", "running") != "running":
                     break
-
-                time.sleep(1)
-        except KeyboardInterrupt:
+                self.check_for_requests(state_data)
+        except asyncio.CancelledError:
             print("\nKeyboard interrupt detected. Shutting down CONJURE.")
+            raise
         finally:
-            self.stop()
+            await self.shutdown(watchers)
+
+    async def shutdown(self, watchers):
+        """Cancels the watchers and running jobs, then stops the subprocesses and the agent."""
+        self._running = False
+        tasks = watchers + list(self._jobs)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self.subprocess_manager.stop_all()
+        self.stop()
 
     def stop(self):
-        """Stops all running subprocesses."""
+        """Stops the agent and clears the volatile state. Runs once, also at exit."""
+        if self._stopped:
+            return
+        self._stopped = True
         print("CONJURE application stopping...")
-        self.subprocess_manager.stop_all()
+        self.agent_pipeline.stop()
 
         # Clear the state file to prevent stale commands on restart
         print("Clearing application state...")
@@ -413,9 +482,15 @@ class ConjureApp:
             "import_request": None
         })
 
+        if self.command_queue.latencies:
+            print("Command latencies:")
+            self.command_queue.report()
+
         print("CONJURE has stopped.")
 
 if __name__ == "__main__":
     app = ConjureApp()
-    app.start()
-    app.run() 
\ No newline at end of file
+    try:
+        asyncio.run(app.run())
+    except KeyboardInterrupt:
+        pass # Already shut down by run().
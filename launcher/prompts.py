@@ -0,0 +1,44 @@
+"""
+Prompt files that are read lazily and reloaded when they change on disk.
+"""
+
+from pathlib import Path
+
+
+class PromptFile:
+    """
+    The text of a prompt file. It is read on first use, and again only when
+    the file's mtime changes, so edits apply on the next request without a
+    restart and without re-reading the file every turn.
+    """
+    def __init__(self, path, fallback=None):
+        self.path = Path(path)
+        self.fallback = fallback
+        self._mtime = None
+        self._text = None
+        self._missing = False
+        self.version = 0  # Bumped on every (re)load, so callers can tell the text changed.
+
+    @property
+    def text(self):
+        try:
+            mtime = self.path.stat().st_mtime
+        except FileNotFoundError:
+            if not self._missing:
+                if self.fallback is not None:
+                    print(f"WARNING: {self.path} not found. Using the built-in fallback prompt.")
+                self._missing = True
+                self._mtime = None
+                self._text = self.fallback
+                self.version += 1
+            return self._text
+
+        self._missing = False
+        if mtime != self._mtime:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self._text = f.read()
+            if self._mtime is not None:
+                print(f"Reloaded {self.path.name} after it changed on disk.")
+            self._mtime = mtime
+            self.version += 1
+        return self._text
@@ -4,73 +4,116 @@ Manages the event loop and state transitions.
 """
 
 import json
+import os
+import threading
+import time
 from pathlib import Path
 
+# Blender writes state.json in place, so a read can catch it half-written.
+READ_RETRIES = 3
+READ_RETRY_DELAY_SECONDS = 0.01
+
 class StateManager:
     """Handles reading, writing, and managing the application's state.json file."""
     def __init__(self, state_file='data/input/state.json'):
         self.state_file_path = Path(state_file)
+        # Serializes read-modify-write cycles between the launcher's threads
+        # (e.g. partial transcripts arriving from the voice input).
+        self._lock = threading.RLock()
+        # Called with no arguments after every write, from the writing thread.
+        self._listeners = []
         self.state_file_path.parent.mkdir(parents=True, exist_ok=True)
         if not self.state_file_path.exists():
             with open(self.state_file_path, 'w') as f:
                 json.dump({}, f)
 
+    def add_listener(self, callback):
+        """Registers a callback for changes this process makes to the state."""
+        self._listeners.append(callback)
+
+    def _save(self, state):
+        # Written to a temp file and swapped in, so readers never see a partial file.
+        temp_path = self.state_file_path.with_suffix(".tmp")
+        with open(temp_path, 'w') as f:
+            json.dump(state, f, indent=4)
+        for attempt in range(READ_RETRIES):
+            try:
+                os.replace(temp_path, self.state_file_path)
+                break
+            except PermissionError:
+                # On Windows the swap fails while another process has the file open.
+                if attempt == READ_RETRIES - 1:
+                    with open(self.state_file_path, 'w') as f:
+                        json.dump(state, f, indent=4)
+                    os.remove(temp_path)
+                else:
+                    time.sleep(READ_RETRY_DELAY_SECONDS)
+        for callback in self._listeners:
+            callback()
+
     def get_state(self):
-        """Loads the state from the JSON file, or creates it if it doesn't exist."""
-        try:
-            with open(self.state_file_path, 'r') as f:
-                return json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            return {}
+        """
+        Loads the state from the JSON file. Returns {} if it is missing or
+        still unreadable after a few retries (e.g. caught mid-write).
+        """
+        for attempt in range(READ_RETRIES):
+            try:
+                with open(self.state_file_path, 'r') as f:
+                    return json.load(f)
+            except FileNotFoundError:
+                return {}
+            except json.JSONDecodeError:
+                time.sleep(READ_RETRY_DELAY_SECONDS)
+        return {}
 
     def set_state(self, key, value):
         """Sets a value in the state and immediately saves it to disk."""
-        state = self.get_state()
-        state[key] = value
-        with open(self.state_file_path, 'w') as f:
-            json.dump(state, f, indent=4)
+        with self._lock:
+            state = self.get_state()
+            state[key] = value
+            self._save(state)
 
     def update_state(self, data_to_update: dict):
         """Merges the given dictionary into the current state and saves it."""
-        state = self.get_state()
-        state.update(data_to_update)
-        with open(self.state_file_path, 'w') as f:
-            json.dump(state, f, indent=4)
+        with self._lock:
+            state = self.get_state()
+            state.update(data_to_update)
+            self._save(state)
 
     def set_ui_state(self, ui_data_to_update: dict):
         """
         Safely updates nested keys within the 'ui' dictionary in the state.
         """
-        state = self.get_state()
-        # Ensure the 'ui' key exists and is a dictionary
-        if 'ui' not in state or not isinstance(state['ui'], dict):
-            state['ui'] = {}
-        
-        # Merge the new data into the ui sub-dictionary
-        for key, value in ui_data_to_update.items():
-            if key == "dialogue" and isinstance(value, dict):
-                if 'dialogue' not in state['ui'] or not isinstance(state['ui']['dialogue'], dict):
-                    state['ui']['dialogue'] = {}
-                state['ui']['dialogue'].update(value)
-            else:
-                state['ui'][key] = value
+        with self._lock:
+            state = self.get_state()
+            # Ensure the 'ui' key exists and is a dictionary
+            if 'ui' not in state or not isinstance(state['ui'], dict):
+                state['ui'] = {}
 
-        with open(self.state_file_path, 'w') as f:
-            json.dump(state, f, indent=4)
+            # Merge the new data into the ui sub-dictionary
+            for key, value in ui_data_to_update.items():
+                if key == "dialogue" and isinstance(value, dict):
+                    if 'dialogue' not in state['ui'] or not isinstance(state['ui']['dialogue'], dict):
+                        state['ui']['dialogue'] = {}
+                    state['ui']['dialogue'].update(value)
+                else:
+                    state['ui'][key] = value
+
+            self._save(state)
 
     def clear_command(self):
         """Sets the 'command' and 'text' keys to null in the state file."""
-        state = self.get_state()
-        state['command'] = None
-        state['text'] = None
-        with open(self.state_file_path, 'w') as f:
-            json.dump(state, f, indent=4) 
+        with self._lock:
+            state = self.get_state()
+            state['command'] = None
+            state['text'] = None
+            self._save(state)
 
     def clear_specific_requests(self, keys_to_clear: list):
         """Sets the specified keys to null in the state file."""
-        state = self.get_state()
-        for key in keys_to_clear:
-            if key in state:
-                state[key] = None
-        with open(self.state_file_path, 'w') as f:
-            json.dump(state, f, indent=4) 
\ No newline at end of file
+        with self._lock:
+            state = self.get_state()
+            for key in keys_to_clear:
+                if key in state:
+                    state[key] = None
+            self._save(state)
@@ -0,0 +1,226 @@
+"""
+Incremental handling of streamed agent replies.
+
+The agent answers with a JSON object whose "spoken" field is read aloud.
+When the completion is streamed, SpokenFieldParser pulls the characters of
+that field out of the partial JSON as the tokens arrive, and a
+StreamingSpeaker cuts them into sentences and speaks each one as soon as it
+is complete. Synthesis of the next sentence overlaps playback of the
+current one, so the first audio starts shortly after the first sentence of
+the reply has been generated instead of after the whole reply.
+"""
+
+import queue
+import re
+import threading
+import time
+
+import launcher.config as config
+
+_ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+
+# The end of a sentence: terminal punctuation, optional closing quotes or
+# brackets, then whitespace (so "3.5" or "e.g." mid-token doesn't split).
+_SENTENCE_END = re.compile(r'[.!?;:]+["\')\]]*\s+')
+
+
+class SpokenFieldParser:
+    """
+    Extracts one top-level string field from a JSON object that arrives in
+    pieces. feed() returns the newly decoded characters of the field, so the
+    text can be used before the object is complete.
+    """
+    def __init__(self, field="spoken"):
+        self.field = field
+        self.done = False
+        self._stack = []          # Open containers, '{' or '['.
+        self._expect_key = False
+        self._in_string = False
+        self._string_is_key = False
+        self._capturing = False
+        self._escape = None       # None, '' right after a backslash, or 'u' plus the hex digits so far.
+        self._key = []
+        self._last_key = None
+
+    def feed(self, chunk):
+        out = []
+        for c in chunk:
+            if self._in_string:
+                self._string_char(c, out)
+            elif c in '{[':
+                self._stack.append(c)
+                self._expect_key = c == '{'
+            elif c in '}]':
+                if self._stack:
+                    self._stack.pop()
+            elif c == ':':
+                self._expect_key = False
+            elif c == ',':
+                self._expect_key = bool(self._stack) and self._stack[-1] == '{'
+            elif c == '"':
+                self._in_string = True
+                self._string_is_key = self._expect_key and bool(self._stack) and self._stack[-1] == '{'
+                self._key = []
+                self._capturing = (not self._string_is_key and len(self._stack) == 1
+                                   and self._last_key == self.field and not self.done)
+        return "".join(out)
+
+    def _string_char(self, c, out):
+        target = self._key if self._string_is_key else (out if self._capturing else None)
+
+        if self._escape is not None:
+            if self._escape == '' and c == 'u':
+                self._escape = 'u'
+                return
+            if self._escape.startswith('u'):
+                self._escape += c
+                if len(self._escape) < 5:
+                    return
+                try:
+                    decoded = chr(int(self._escape[1:], 16))
+                except ValueError:
+                    decoded = ''
+            else:
+                decoded = _ESCAPES.get(c, c)
+            self._escape = None
+            if target is not None:
+                target.append(decoded)
+            return
+
+        if c == '\\':
+            self._escape = ''
+        elif c == '"':
+            self._in_string = False
+            if self._string_is_key:
+                self._last_key = "".join(self._key)
+            elif self._capturing:
+                self._capturing = False
+                self.done = True
+        elif target is not None:
+            target.append(c)
+
+
+class SentenceChunker:
+    """Buffers streamed text and releases it in sentence-sized chunks."""
+    def __init__(self, min_chars=None):
+        self.min_chars = config.TTS_MIN_CHUNK_CHARS if min_chars is None else min_chars
+        self._buffer = ""
+
+    def feed(self, text):
+        self._buffer += text
+        chunks = []
+        while True:
+            # Cut at the first sentence end that leaves a chunk long enough to be worth a request.
+            cut = next((m.end() for m in _SENTENCE_END.finditer(self._buffer) if m.end() >= self.min_chars), None)
+            if cut is None:
+                return chunks
+            chunk, self._buffer = self._buffer[:cut].strip(), self._buffer[cut:]
+            if chunk:
+                chunks.append(chunk)
+
+    def flush(self):
+        chunk, self._buffer = self._buffer.strip(), ""
+        return [chunk] if chunk else []
+
+
+class PcmPlayer:
+    """Plays raw 16-bit mono PCM chunks on the default output device as they arrive."""
+    def __init__(self, sample_rate):
+        self.sample_rate = sample_rate
+        self._stream = None
+        self._remainder = b""
+
+    def write(self, data):
+        import sounddevice as sd
+        if self._stream is None:
+            self._stream = sd.RawOutputStream(samplerate=self.sample_rate, channels=1, dtype='int16')
+            self._stream.start()
+        # Chunks can split a sample in two; carry the odd byte over.
+        data = self._remainder + data
+        usable = len(data) - len(data) % 2
+        self._remainder = data[usable:]
+        if usable:
+            self._stream.write(data[:usable])
+
+    def close(self):
+        if self._stream is not None:
+            # stop() waits for the buffered audio to finish playing.
+            self._stream.stop()
+            self._stream.close()
+            self._stream = None
+        self._remainder = b""
+
+
+class StreamingSpeaker:
+    """
+    Speaks text in order as it streams in. One thread synthesizes sentences
+    into a queue of audio chunks, another plays them, so the next sentence is
+    already being synthesized while the current one plays.
+
+    Args:
+        synthesize: Callable taking a sentence and returning an iterable of PCM byte chunks.
+        player: Object with write(bytes) and close(), e.g. a PcmPlayer.
+        on_sentence: Optional callable, called with each sentence when it is sent for synthesis.
+    """
+    def __init__(self, synthesize, player, on_sentence=None):
+        self.synthesize = synthesize
+        self.player = player
+        self.on_sentence = on_sentence
+        self.chunker = SentenceChunker()
+        self.first_audio_at = None
+        self._sentences = queue.Queue()
+        self._audio = queue.Queue()
+        self._threads = [
+            threading.Thread(target=self._synthesize_loop, daemon=True),
+            threading.Thread(target=self._play_loop, daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def feed(self, text):
+        """Adds streamed text; complete sentences are queued for speech."""
+        for sentence in self.chunker.feed(text):
+            self.say(sentence)
+
+    def say(self, sentence):
+        if self.on_sentence:
+            self.on_sentence(sentence)
+        self._sentences.put(sentence)
+
+    def close(self):
+        """Speaks whatever text is left and blocks until playback has finished."""
+        for sentence in self.chunker.flush():
+            self.say(sentence)
+        self._sentences.put(None)
+        for thread in self._threads:
+            thread.join()
+
+    def _synthesize_loop(self):
+        while True:
+            sentence = self._sentences.get()
+            if sentence is None:
+                break
+            try:
+                for chunk in self.synthesize(sentence):
+                    if chunk:
+                        self._audio.put(chunk)
+            except Exception as e:
+                print(f"AGENT_API: Error synthesizing speech: {e}")
+        self._audio.put(None)
+
+    def _play_loop(self):
+        try:
+            while True:
+                chunk = self._audio.get()
+                if chunk is None:
+                    break
+                if self.first_audio_at is None:
+                    self.first_audio_at = time.perf_counter()
+                self.player.write(chunk)
+        except Exception as e:
+            print(f"AGENT_API: Error playing audio: {e}")
+            # Keep draining so the synthesis thread is never left blocked.
+            while self._audio.get() is not None:
+                pass
+        finally:
+            self.player.close()
@@ -1,9 +1,12 @@
 """
 Subprocess manager for handling external processes.
 Manages Blender, CGAL, and ComfyUI processes.
+
+Processes are started with asyncio's subprocess API, so the launcher's
+event loop can await their exit instead of polling them.
 """
 
-import subprocess
+import asyncio
 import os
 import sys
 from pathlib import Path
@@ -17,25 +20,25 @@ class SubprocessManager:
         # Assuming the project root is two levels up from this script's directory
         self.project_root = Path(__file__).parent.parent
 
-    def start_hand_tracker(self):
+    async def start_hand_tracker(self):
         """Starts the hand_tracker.py script in a new process."""
         print("Starting hand tracker...")
         script_path = self.project_root / "launcher" / "hand_tracker.py"
         # Use sys.executable to ensure we run with the same Python interpreter
         # that is running the launcher itself.
-        process = subprocess.Popen([sys.executable, str(script_path)])
+        process = await asyncio.create_subprocess_exec(sys.executable, str(script_path))
         self.processes['hand_tracker'] = process
         print("Hand tracker process started.")
 
-    def start_gui(self):
+    async def start_gui(self):
         """Starts the gui.py script in a new process."""
         print("Starting GUI...")
         script_path = self.project_root / "launcher" / "gui.py"
-        process = subprocess.Popen([sys.executable, str(script_path)])
+        process = await asyncio.create_subprocess_exec(sys.executable, str(script_path))
         self.processes['gui'] = process
         print("GUI process started.")
 
-    def start_blender(self):
+    async def start_blender(self):
         """Starts Blender and enables the CONJURE addon."""
         print("Starting Blender...")
         blender_scene_dir = self.project_root / "blender"
@@ -50,23 +53,32 @@ class SubprocessManager:
         ]
         
         # We run Blender with its UI visible for interaction, not in the background.
-        process = subprocess.Popen(command)
+        process = await asyncio.create_subprocess_exec(*command)
         self.processes['blender'] = process
         print("Blender process started with CONJURE addon enabled.")
 
-    def stop_all(self):
-        """Terminates all managed subprocesses gracefully."""
+    async def wait_for_exit(self, name):
+        """Waits until the named process exits and returns its exit code."""
+        return await self.processes[name].wait()
+
+    async def stop_all(self):
+        """Terminates all managed subprocesses gracefully, in parallel."""
         print("Stopping all subprocesses...")
-        for name, process in self.processes.items():
-            try:
-                if process.poll() is None: # Check if the process is still running
-                    process.terminate()
-                    process.wait(timeout=5)
-                    print(f"Terminated '{name}'.")
-            except subprocess.TimeoutExpired:
-                process.kill()
-                print(f"Forcefully killed '{name}' as it did not terminate gracefully.")
-            except Exception as e:
-                print(f"Error while stopping '{name}': {e}")
+        await asyncio.gather(*(self._stop(name, process) for name, process in self.processes.items()))
         self.processes.clear()
-        print("All subprocesses stopped.") 
\ No newline at end of file
+        print("All subprocesses stopped.")
+
+    async def _stop(self, name, process):
+        try:
+            if process.returncode is None: # Check if the process is still running
+                process.terminate()
+                await asyncio.wait_for(process.wait(), timeout=5)
+                print(f"Terminated '{name}'.")
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            print(f"Forcefully killed '{name}' as it did not terminate gracefully.")
+        except ProcessLookupError:
+            pass # It exited between the check and terminate().
+        except Exception as e:
+            print(f"Error while stopping '{name}': {e}")
@@ -0,0 +1,94 @@
+"""
+Speech-to-text backends for the voice input.
+
+Every backend turns one mono float32 audio segment into text. The
+VoiceInputManager calls them from its upload thread, one segment at a time
+and in order, passing the text transcribed so far as 'context' so a backend
+can keep spelling and punctuation consistent across segments.
+"""
+
+import io
+
+import numpy as np
+import scipy.io.wavfile as wav
+
+
+def encode_wav(audio, sample_rate):
+    """Encodes float32 samples in [-1, 1] as an in-memory 16-bit PCM WAV file."""
+    buffer = io.BytesIO()
+    wav.write(buffer, sample_rate, (np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16))
+    buffer.seek(0)
+    return buffer
+
+
+class WhisperTranscriber:
+    """Transcribes segments with the OpenAI Whisper API."""
+    name = "whisper"
+
+    def __init__(self, api_key, model="whisper-1"):
+        from openai import OpenAI
+        self.client = OpenAI(api_key=api_key)
+        self.model = model
+
+    def transcribe(self, audio, sample_rate, context=""):
+        # The OpenAI API needs a file tuple: (filename, file-like-object)
+        file_tuple = ("user_speech.wav", encode_wav(audio, sample_rate))
+        kwargs = {"model": self.model, "file": file_tuple}
+        if context:
+            # Whisper continues the style of the prompt, which keeps the
+            # segments of one utterance reading as a single sentence.
+            kwargs["prompt"] = context[-200:]
+        response = self.client.audio.transcriptions.create(**kwargs)
+        return response.text.strip()
+
+
+class LocalWhisperTranscriber:
+    """Transcribes segments offline with faster-whisper (optional dependency)."""
+    name = "local"
+
+    def __init__(self, model_name="base.en"):
+        try:
+            from faster_whisper import WhisperModel
+        except ImportError:
+            raise RuntimeError("The 'local' STT backend needs the faster-whisper package (pip install faster-whisper).")
+        self.model = WhisperModel(model_name, device="auto", compute_type="int8")
+
+    def transcribe(self, audio, sample_rate, context=""):
+        if sample_rate != 16000:
+            # faster-whisper expects 16 kHz input; resample linearly.
+            positions = np.linspace(0, len(audio) - 1, int(len(audio) * 16000 / sample_rate))
+            audio = np.interp(positions, np.arange(len(audio)), audio)
+        segments, _ = self.model.transcribe(
+            audio.astype(np.float32), initial_prompt=context[-200:] or None, vad_filter=False
+        )
+        return " ".join(segment.text.strip() for segment in segments).strip()
+
+
+class StubTranscriber:
+    """
+    Returns canned text instead of transcribing. With no responses it
+    describes each segment, so the streaming path can be exercised without
+    an API key or a model.
+    """
+    name = "stub"
+
+    def __init__(self, responses=None):
+        self.responses = list(responses or [])
+        self.calls = []
+
+    def transcribe(self, audio, sample_rate, context=""):
+        self.calls.append((len(audio), sample_rate, context))
+        if self.responses:
+            return self.responses.pop(0)
+        return f"[segment {len(self.calls)}: {len(audio) / sample_rate:.2f}s]"
+
+
+def create_transcriber(backend, api_key=None, local_model="base.en"):
+    """Builds the transcriber for the given STT_BACKEND name."""
+    if backend == "whisper":
+        return WhisperTranscriber(api_key)
+    if backend == "local":
+        return LocalWhisperTranscriber(local_model)
+    if backend == "stub":
+        return StubTranscriber()
+    raise ValueError(f"Unknown STT backend '{backend}'. Expected 'whisper', 'local' or 'stub'.")
@@ -0,0 +1,121 @@
+"""
+On-disk cache of synthesized speech.
+
+Audio is stored content-addressed: the file name is a hash of the text, the
+voice, the model and the output format, so a phrase that was spoken before
+plays straight from disk. The cache is bounded by size; when it grows past
+its limit, the least recently played entries are deleted first. Playing an
+entry touches its mtime, so the LRU order survives restarts.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from pathlib import Path
+
+READ_CHUNK_BYTES = 8192
+
+
+def cache_key(text, voice_id, model_id, output_format):
+    payload = "\x1f".join((text.strip(), voice_id, model_id, output_format))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class TTSCache:
+    """Size-bounded LRU cache of synthesized audio files."""
+    def __init__(self, directory, max_bytes):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # key -> [size, last_used]
+        self._entries = {}
+        for path in self.directory.glob("*.audio"):
+            stat = path.stat()
+            self._entries[path.stem] = [stat.st_size, stat.st_mtime]
+        self._total = sum(size for size, _ in self._entries.values())
+
+    def _path(self, key):
+        return self.directory / f"{key}.audio"
+
+    def contains(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def stream(self, key, synthesize):
+        """
+        Yields the audio for 'key' in chunks: from disk on a hit, otherwise
+        from synthesize() as it arrives, storing it once complete.
+        """
+        path = self._path(key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry[1] = time.time()
+        if entry is not None:
+            try:
+                os.utime(path)
+                with open(path, 'rb') as f:
+                    data = f.read()
+                self.hits += 1
+                for start in range(0, len(data), READ_CHUNK_BYTES):
+                    yield data[start:start + READ_CHUNK_BYTES]
+                return
+            except OSError:
+                # Deleted behind our back; fall through and synthesize again.
+                self._forget(key)
+
+        self.misses += 1
+        chunks = []
+        for chunk in synthesize():
+            chunks.append(chunk)
+            yield chunk
+        # Only reached if the stream completed, so partial audio is never stored.
+        self.store(key, b"".join(chunks))
+
+    def store(self, key, data):
+        if not data or len(data) > self.max_bytes:
+            return
+        path = self._path(key)
+        temp_path = path.with_suffix(".tmp")
+        try:
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except OSError as e:
+            print(f"TTS_CACHE: Could not store audio: {e}")
+            return
+        with self._lock:
+            previous = self._entries.get(key)
+            if previous:
+                self._total -= previous[0]
+            self._entries[key] = [len(data), time.time()]
+            self._total += len(data)
+        self._evict()
+
+    def _forget(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry:
+                self._total -= entry[0]
+
+    def _evict(self):
+        with self._lock:
+            if self._total <= self.max_bytes:
+                return
+            victims = []
+            for key, (size, _) in sorted(self._entries.items(), key=lambda item: item[1][1]):
+                if self._total <= self.max_bytes:
+                    break
+                victims.append(key)
+                self._total -= size
+                del self._entries[key]
+        for key in victims:
+            try:
+                self._path(key).unlink()
+            except OSError:
+                pass
+        print(f"TTS_CACHE: Evicted {len(victims)} entries ({self._total / 1e6:.1f} MB cached).")
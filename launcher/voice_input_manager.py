@@ -1,121 +1,239 @@
 """
-Manages voice input, recording, and transcription using Whisper.
+Manages voice input, recording, and streaming transcription.
+
+While push-to-talk is held, incoming audio is split into speech segments by
+a simple energy-based voice activity detector (VAD). Each segment is closed
+at the first pause and handed to an upload thread, which transcribes it with
+the configured backend (see transcribers.py) while the user keeps talking.
+Partial transcripts are reported through 'on_partial' as they arrive, so
+when the key is released only the last segment is still in flight.
+
+Audio is written into a preallocated ring buffer (AudioRingBuffer) together
+with a per-block RMS and peak envelope. The VAD reads the RMS envelope, and
+the silence at the edges of a segment is trimmed from the peak envelope, so
+nothing is rescanned or reallocated when a segment closes.
 """
 
 import sounddevice as sd
 import numpy as np
-import scipy.io.wavfile as wav
-from openai import OpenAI
 import threading
-import io
+import queue
 import time
 
+import launcher.config as config
+from launcher.transcribers import create_transcriber
+
+class AudioRingBuffer:
+    """
+    Fixed-size circular store of equally sized audio blocks.
+
+    Blocks are addressed by their absolute number (0 for the first block of
+    a recording); a block stays readable until 'capacity' newer blocks have
+    been written after it.
+    """
+    def __init__(self, capacity, block_size):
+        self.capacity = capacity
+        self.block_size = block_size
+        self.samples = np.zeros((capacity, block_size), dtype=np.float32)
+        self.rms = np.zeros(capacity, dtype=np.float32)
+        self.peak = np.zeros(capacity, dtype=np.float32)
+        self.written = 0
+
+    def clear(self):
+        self.written = 0
+
+    @property
+    def oldest(self):
+        """Number of the oldest block that has not been overwritten yet."""
+        return max(0, self.written - self.capacity)
+
+    def write(self, block):
+        """Stores one block and its envelope. Returns the block's number."""
+        number = self.written
+        row = number % self.capacity
+        n = min(len(block), self.block_size)
+        self.samples[row, :n] = block[:n]
+        self.samples[row, n:] = 0.0
+        data = self.samples[row]
+        self.rms[row] = np.sqrt(np.dot(data, data) / self.block_size)
+        self.peak[row] = np.max(np.abs(data))
+        self.written = number + 1
+        return number
+
+    def _rows(self, start, end):
+        return np.arange(start, end) % self.capacity
+
+    def is_voiced(self, number, threshold):
+        return self.rms[number % self.capacity] > threshold
+
+    def trim(self, start, end, threshold):
+        """
+        Narrows the block range [start, end) to the blocks between the first
+        and last one whose peak exceeds 'threshold'. Returns None if all are silent.
+        """
+        loud = np.flatnonzero(self.peak[self._rows(start, end)] > threshold)
+        if loud.size == 0:
+            return None
+        return start + int(loud[0]), start + int(loud[-1]) + 1
+
+    def read(self, start, end):
+        """Returns a contiguous copy of the samples of blocks [start, end)."""
+        return self.samples[self._rows(start, end)].ravel()
+
+
 class VoiceInputManager:
-    """Handles recording audio and transcribing it using Whisper."""
-    def __init__(self, api_key, sample_rate=16000):
-        self.client = OpenAI(api_key=api_key)
+    """Handles recording audio and transcribing it segment by segment."""
+    def __init__(self, api_key=None, sample_rate=16000, transcriber=None, on_partial=None):
+        self.transcriber = transcriber or create_transcriber(
+            config.STT_BACKEND, api_key=api_key, local_model=config.STT_LOCAL_MODEL
+        )
         self.sample_rate = sample_rate
+        self.on_partial = on_partial
         self.is_recording = False
         self.recording_thread = None
-        self.frames = []
+        self.upload_thread = None
 
-    def _trim_silence(self, audio, threshold_level=0.01, chunk_size=1024):
-        """
-        Trims silence from the beginning and end of a NumPy audio array.
-        """
-        if audio.size == 0:
-            return audio
-            
-        # Find the first chunk above the threshold
-        first_chunk = -1
-        for i in range(0, len(audio), chunk_size):
-            if np.max(np.abs(audio[i:i+chunk_size])) > threshold_level:
-                first_chunk = i
-                break
-        
-        # If all chunks are silent, return an empty array
-        if first_chunk == -1:
-            return np.array([])
-            
-        # Find the last chunk above the threshold
-        last_chunk = -1
-        for i in range(len(audio) - chunk_size, -1, -chunk_size):
-            if np.max(np.abs(audio[i:i+chunk_size])) > threshold_level:
-                last_chunk = i + chunk_size
-                break
-        
-        # Return the trimmed audio
-        start_index = max(0, first_chunk)
-        end_index = min(len(audio), last_chunk)
-        return audio[start_index:end_index]
+        # VAD timings, converted from milliseconds to blocks.
+        self.block_size = int(sample_rate * config.VAD_BLOCK_MS / 1000)
+        self.silence_blocks = max(1, config.VAD_SILENCE_MS // config.VAD_BLOCK_MS)
+        self.min_speech_blocks = max(1, config.VAD_MIN_SPEECH_MS // config.VAD_BLOCK_MS)
+        self.max_segment_blocks = int(config.VAD_MAX_SEGMENT_S * 1000 / config.VAD_BLOCK_MS)
+        self.preroll_blocks = config.VAD_PREROLL_MS // config.VAD_BLOCK_MS
+
+        # Allocated once; every recording reuses the same buffer.
+        ring_blocks = int(config.AUDIO_RING_SECONDS * 1000 / config.VAD_BLOCK_MS)
+        self._ring = AudioRingBuffer(max(ring_blocks, 2 * self.max_segment_blocks), self.block_size)
+        self._reset()
+
+    def _reset(self):
+        self._ring.clear()
+        self._blocks = queue.Queue()    # Numbers of the blocks written by the audio callback.
+        self._segments = queue.Queue()  # Finished segments waiting for upload; None ends the stream.
+        self._segment_start = None      # First block of the open segment, including pre-roll.
+        self._segment_floor = 0         # End of the last closed segment; pre-roll never reaches back past it.
+        self._speech_blocks = 0
+        self._silent_blocks = 0
+        self._transcripts = []
+
+    @property
+    def transcript(self):
+        """The text transcribed so far in the current recording."""
+        return " ".join(self._transcripts)
 
+    # --- Voice activity detection ---
+
+    def _process_block(self, number):
+        """Feeds one block to the VAD, closing the current segment at a pause."""
+        voiced = self._ring.is_voiced(number, config.VAD_THRESHOLD)
+
+        if self._segment_start is None:
+            if voiced:
+                # Keep a little audio from before the onset so the first syllable isn't clipped.
+                self._segment_start = max(number - self.preroll_blocks, self._segment_floor, self._ring.oldest)
+                self._speech_blocks = 1
+                self._silent_blocks = 0
+            return
+
+        if voiced:
+            self._speech_blocks += 1
+            self._silent_blocks = 0
+        else:
+            self._silent_blocks += 1
+
+        end = number + 1
+        if self._silent_blocks >= self.silence_blocks or end - self._segment_start >= self.max_segment_blocks:
+            self._close_segment(end)
+
+    def _close_segment(self, end):
+        """Queues blocks [segment start, end) for upload, unless too short to be speech."""
+        start = self._segment_start
+        if start is not None and self._speech_blocks >= self.min_speech_blocks:
+            # The envelopes already know where the sound is: trim without touching the samples.
+            trimmed = self._ring.trim(start, end, config.TRIM_PEAK_THRESHOLD)
+            if trimmed:
+                segment = self._ring.read(*trimmed)
+                print(f">>> REC: Segment of {(end - start) * self.block_size / self.sample_rate:.2f}s "
+                      f"({len(segment)/self.sample_rate:.2f}s trimmed) queued for transcription.")
+                self._segments.put(segment)
+        self._segment_start = None
+        self._segment_floor = end
+        self._speech_blocks = 0
+        self._silent_blocks = 0
+
+    # --- Threads ---
 
     def _record_audio(self):
-        """Callback-based audio recording to avoid blocking."""
-        self.frames = []
-        
+        """Callback-based audio recording; segments the audio as it arrives."""
         def callback(indata, frames, time, status):
             if status:
                 print(f"Sounddevice status: {status}")
-            self.frames.append(indata.copy())
+            self._blocks.put(self._ring.write(indata[:, 0]))
 
         # The 'with' statement ensures the stream is properly closed.
-        with sd.InputStream(callback=callback, samplerate=self.sample_rate, channels=1, dtype='float32'):
+        with sd.InputStream(callback=callback, samplerate=self.sample_rate, channels=1,
+                            dtype='float32', blocksize=self.block_size):
             while self.is_recording:
-                sd.sleep(100) # Check the is_recording flag every 100ms
+                try:
+                    self._process_block(self._blocks.get(timeout=0.1))
+                except queue.Empty:
+                    pass
+
+        # The stream is closed, so no more blocks arrive: flush what is left.
+        while not self._blocks.empty():
+            self._process_block(self._blocks.get_nowait())
+        self._close_segment(self._ring.written)
+        self._segments.put(None)
+
+    def _upload_segments(self):
+        """Transcribes queued segments in order until the recording ends."""
+        while True:
+            segment = self._segments.get()
+            if segment is None:
+                break
+
+            start = time.perf_counter()
+            try:
+                text = self.transcriber.transcribe(segment, self.sample_rate, context=self.transcript)
+            except Exception as e:
+                print(f"--- ERROR: {self.transcriber.name} transcription failed: {e} ---")
+                continue
+            print(f">>> STT: Segment transcribed in {(time.perf_counter() - start)*1000:.0f} ms: '{text}'")
+
+            if text:
+                self._transcripts.append(text)
+                if self.on_partial:
+                    self.on_partial(self.transcript)
 
     def start_recording(self):
-        """Starts the audio recording in a background thread."""
+        """Starts recording and the upload thread that transcribes finished segments."""
         if not self.is_recording:
             print(">>> REC: Starting voice recording...")
+            self._reset()
             self.is_recording = True
+            self.upload_thread = threading.Thread(target=self._upload_segments, daemon=True)
+            self.upload_thread.start()
             self.recording_thread = threading.Thread(target=self._record_audio)
             self.recording_thread.start()
 
     def stop_recording_and_transcribe(self):
-        """Stops recording, saves the audio, and sends it to Whisper for transcription."""
+        """
+        Stops recording and waits for the segments still in flight.
+        Returns the full transcript, or "" if nothing was understood.
+        """
         if self.is_recording:
             # Give the recording a brief moment to capture the last sounds
-            time.sleep(0.25)
+            time.sleep(config.STT_TAIL_MS / 1000)
             self.is_recording = False
+            stopped_at = time.perf_counter()
             if self.recording_thread:
                 self.recording_thread.join()
-            print(">>> REC: Recording stopped. Transcribing...")
-
-            if not self.frames:
-                print(">>> Whisper: No audio recorded.")
-                return ""
-
-            # 1. Concatenate all recorded frames
-            recording = np.concatenate(self.frames, axis=0)
-            
-            # 2. Trim silence from the start and end of the recording
-            trimmed_recording = self._trim_silence(recording)
-            
-            if trimmed_recording.size == 0:
-                print(">>> Whisper: Audio was all silence. Nothing to transcribe.")
-                return ""
-            
-            print(f">>> REC: Original duration: {len(recording)/self.sample_rate:.2f}s, Trimmed duration: {len(trimmed_recording)/self.sample_rate:.2f}s")
-
-            # 3. Prepare the audio data in an in-memory WAV buffer
-            buffer = io.BytesIO()
-            # Whisper prefers 16-bit PCM WAV
-            wav.write(buffer, self.sample_rate, (trimmed_recording * 32767).astype(np.int16))
-            buffer.seek(0)
-            
-            # The OpenAI API needs a file tuple: (filename, file-like-object)
-            file_tuple = ("user_speech.wav", buffer)
+            if self.upload_thread:
+                self.upload_thread.join()
 
-            try:
-                response = self.client.audio.transcriptions.create(
-                    model="whisper-1", 
-                    file=file_tuple
-                )
-                text = response.text
-                print(f">>> Whisper: Transcription successful: '{text}'")
-                return text
-            except Exception as e:
-                print(f"--- ERROR: Whisper transcription failed: {e} ---")
+            text = self.transcript
+            if not text:
+                print(">>> STT: No speech recognised. Nothing to transcribe.")
                 return ""
-        return "" 
\ No newline at end of file
+            print(f">>> STT: Transcript ready {(time.perf_counter() - stopped_at)*1000:.0f} ms after release: '{text}'")
+            return text
+        return ""
@@ -0,0 +1,152 @@
+"""
+Transfer of cage deformations to the full-resolution model.
+
+After an import, the deformable 'Mesh' is a reduced copy of the model (the
+cage) and the untouched import is kept as 'MeshHighRes'. All brush physics
+run on the cage. A CageBinding maps every high-res vertex to its
+CAGE_TRANSFER_NEIGHBORS nearest cage vertices with normalized
+inverse-distance weights, computed once at bind time. The weights are a
+sparse (high-res x cage) matrix with a fixed number of entries per row, so
+they are stored as two dense (N, k) arrays and applied with one gather and
+one weighted sum - no per-vertex Python.
+
+The transfer runs lazily, just before anything is rendered from the
+high-res model (see highres_for_render), or every frame when
+CAGE_TRANSFER_EVERY_FRAME is set.
+"""
+
+from contextlib import contextmanager
+
+import mathutils
+import numpy as np
+
+from . import config
+from . import mesh_cache
+
+_bindings = {}
+
+
+def _to_local(matrix_from, matrix_to, coords):
+    """Maps (N, 3) coordinates from one object's local space into another's."""
+    transform = np.array(matrix_to.inverted() @ matrix_from, dtype=np.float32)
+    return coords @ transform[:3, :3].T + transform[:3, 3]
+
+
+class CageBinding:
+    """Precomputed weights from one cage mesh to one high-res mesh."""
+
+    def __init__(self, cage_obj, highres_obj):
+        self.cage_name = cage_obj.name
+        self.highres_name = highres_obj.name
+        self.cage_rest = mesh_cache.read_coords(cage_obj.data).copy()
+        self.highres_rest = mesh_cache.read_coords(highres_obj.data).copy()
+        self.cage_pointer = cage_obj.data.as_pointer()
+
+        kd = mathutils.kdtree.KDTree(len(self.cage_rest))
+        for i, co in enumerate(self.cage_rest.tolist()):
+            kd.insert(co, i)
+        kd.balance()
+
+        # Weights are computed with the high-res vertices in the cage's space.
+        points = _to_local(highres_obj.matrix_world, cage_obj.matrix_world, self.highres_rest)
+        k = min(config.CAGE_TRANSFER_NEIGHBORS, len(self.cage_rest))
+        self.indices = np.empty((len(points), k), dtype=np.int32)
+        distances = np.empty((len(points), k), dtype=np.float32)
+        for row, co in enumerate(points.tolist()):
+            for col, (_, index, distance) in enumerate(kd.find_n(co, k)):
+                self.indices[row, col] = index
+                distances[row, col] = distance
+
+        weights = 1.0 / np.maximum(distances, 1e-6) ** 2
+        self.weights = weights / weights.sum(axis=1, keepdims=True)
+        self._cage_version = None
+
+    def matches(self, cage_obj, highres_obj):
+        """True if both meshes still have the topology the weights were computed for."""
+        return (cage_obj.data.as_pointer() == self.cage_pointer
+                and len(cage_obj.data.vertices) == len(self.cage_rest)
+                and len(highres_obj.data.vertices) == len(self.highres_rest))
+
+    def transfer(self, cage_obj, highres_obj):
+        """
+        Moves the high-res vertices by the interpolated cage displacements.
+        Skipped if the cage has not changed since the last transfer.
+        Returns True if the high-res mesh was updated.
+        """
+        cage_coords = mesh_cache.read_coords(cage_obj.data)
+        version = hash(cage_coords.tobytes())
+        if version == self._cage_version:
+            return False
+        self._cage_version = version
+
+        displacement = cage_coords - self.cage_rest
+        moved = (displacement[self.indices] * self.weights[..., None]).sum(axis=1)
+        # Displacements are directions, so only the linear part of the transform applies.
+        linear = np.array(highres_obj.matrix_world.inverted() @ cage_obj.matrix_world, dtype=np.float32)[:3, :3]
+        coords = self.highres_rest + moved @ linear.T
+
+        mesh = highres_obj.data
+        mesh.vertices.foreach_set("co", coords.astype(np.float32).ravel())
+        mesh.update()
+        return True
+
+
+def bind(cage_obj, highres_obj):
+    """(Re)computes the transfer weights between a cage and its high-res model."""
+    binding = CageBinding(cage_obj, highres_obj)
+    _bindings[highres_obj.name] = binding
+    print(f"Bound '{highres_obj.name}' ({len(binding.highres_rest)} verts) to cage '{cage_obj.name}' ({len(binding.cage_rest)} verts).")
+    return binding
+
+
+def unbind(highres_obj=None):
+    """Drops the binding for one high-res object, or all bindings if none is given."""
+    if highres_obj is None:
+        _bindings.clear()
+    else:
+        _bindings.pop(highres_obj.name, None)
+
+
+def sync(scene):
+    """
+    Transfers the current cage deformation to the high-res model, if the scene
+    has one. Returns the high-res object, or None if there is nothing to sync.
+    """
+    cage_obj = scene.objects.get(config.DEFORM_OBJ_NAME)
+    highres_obj = scene.objects.get(config.HIGHRES_OBJ_NAME)
+    if not cage_obj or not highres_obj:
+        return None
+
+    binding = _bindings.get(highres_obj.name)
+    if binding is None or not binding.matches(cage_obj, highres_obj):
+        # E.g. after reopening the file: the high-res mesh holds the last
+        # transferred state, so binding to the current cage stays consistent.
+        binding = bind(cage_obj, highres_obj)
+    binding.transfer(cage_obj, highres_obj)
+    return highres_obj
+
+
+@contextmanager
+def highres_for_render(scene):
+    """
+    Syncs the high-res model and shows it in place of the cage for the
+    duration of the block, so renders and snapshots use the full-resolution
+    surface. Does nothing if the scene has no high-res model.
+    """
+    highres_obj = sync(scene)
+    cage_obj = scene.objects.get(config.DEFORM_OBJ_NAME)
+    if not highres_obj:
+        yield
+        return
+
+    saved = [(obj, obj.hide_get(), obj.hide_render) for obj in (cage_obj, highres_obj)]
+    cage_obj.hide_set(True)
+    cage_obj.hide_render = True
+    highres_obj.hide_set(False)
+    highres_obj.hide_render = False
+    try:
+        yield
+    finally:
+        for obj, hidden, hidden_render in saved:
+            obj.hide_set(hidden)
+            obj.hide_render = hidden_render
@@ -0,0 +1,125 @@
+"""
+Still-image capture for the AI pipeline.
+
+Two capture modes are supported:
+- FULL: the regular 'bpy.ops.render.render' pipeline with the scene's engine.
+- FAST: an OpenGL capture ('bpy.ops.render.opengl') from the scene camera,
+  scaled down to the resolution the ComfyUI preprocessors actually use.
+
+In FAST mode, depth and normal passes can be written next to the image as
+'<name>_depth.png' and '<name>_normal.png', so ComfyUI can load the depth
+map directly instead of running a depth estimator on the render.
+
+This module only depends on bpy, so it can also be imported by the
+standalone background render worker.
+"""
+
+import os
+from contextlib import ExitStack, contextmanager
+
+import bpy
+
+CAPTURE_MODES = ('FULL', 'FAST')
+# Built-in matcap that shades surfaces by their normal direction.
+NORMAL_MATCAP = "check_normal+y.exr"
+
+
+@contextmanager
+def _overridden(target, **values):
+    """Temporarily sets attributes on a Blender struct, restoring them in reverse order."""
+    original = [(name, getattr(target, name)) for name in values]
+    try:
+        for name, value in values.items():
+            setattr(target, name, value)
+        yield target
+    finally:
+        for name, value in reversed(original):
+            setattr(target, name, value)
+
+
+def _scaled_resolution(render, long_side):
+    """Returns resolution overrides that keep the aspect ratio with the given long side."""
+    if not long_side:
+        return {}
+    width, height = render.resolution_x, render.resolution_y
+    scale = long_side / max(width, height)
+    return {
+        "resolution_x": max(1, round(width * scale)),
+        "resolution_y": max(1, round(height * scale)),
+        "resolution_percentage": 100,
+    }
+
+
+def _capture_normal_pass(scene, filepath):
+    """Writes a normal map by capturing with the normal matcap."""
+    shading = scene.display.shading
+    with _overridden(scene.render, filepath=filepath), \
+         _overridden(shading, light='MATCAP', studio_light=NORMAL_MATCAP):
+        bpy.ops.render.opengl(write_still=True, view_context=False)
+
+
+def _capture_depth_pass(scene, filepath):
+    """
+    Writes a depth map (near is bright, background is black) using the
+    Workbench engine's Z pass and a temporary compositor graph.
+    """
+    view_layer = bpy.context.view_layer
+    with ExitStack() as stack:
+        stack.enter_context(_overridden(scene.render, filepath=filepath, engine='BLENDER_WORKBENCH', use_compositing=True))
+        stack.enter_context(_overridden(view_layer, use_pass_z=True))
+        stack.enter_context(_overridden(scene, use_nodes=True))
+
+        tree = scene.node_tree
+        for node in tree.nodes:
+            if node.type == 'COMPOSITE':
+                stack.enter_context(_overridden(node, mute=True))
+
+        layers = tree.nodes.new('CompositorNodeRLayers')
+        normalize = tree.nodes.new('CompositorNodeNormalize')
+        invert = tree.nodes.new('CompositorNodeInvert')
+        composite = tree.nodes.new('CompositorNodeComposite')
+        added_nodes = [layers, normalize, invert, composite]
+        try:
+            layers.scene = scene
+            layers.layer = view_layer.name
+            tree.links.new(layers.outputs['Depth'], normalize.inputs[0])
+            tree.links.new(normalize.outputs[0], invert.inputs['Color'])
+            tree.links.new(invert.outputs[0], composite.inputs['Image'])
+            bpy.ops.render.render(write_still=True)
+        finally:
+            for node in added_nodes:
+                tree.nodes.remove(node)
+
+
+def capture_still(scene, filepath, mode='FULL', resolution=None, passes=False):
+    """
+    Renders the scene camera to a PNG at 'filepath'.
+
+    Args:
+        scene: The scene to capture. Its active camera is used.
+        filepath: Output path of the image.
+        mode: 'FULL' for a regular render, 'FAST' for an OpenGL capture.
+        resolution: Long-side resolution for FAST captures. None keeps the scene's.
+        passes: In FAST mode, also write '<name>_depth.png' and '<name>_normal.png'.
+
+    Returns:
+        True if depth/normal passes were written alongside the image.
+    """
+    if mode not in CAPTURE_MODES:
+        raise ValueError(f"Unknown capture mode '{mode}'. Expected one of {CAPTURE_MODES}.")
+
+    filepath = str(filepath)
+    render = scene.render
+    with _overridden(render, filepath=filepath), \
+         _overridden(render.image_settings, file_format='PNG'):
+        if mode == 'FULL':
+            bpy.ops.render.render(write_still=True)
+            return False
+
+        with _overridden(render, **_scaled_resolution(render, resolution)):
+            bpy.ops.render.opengl(write_still=True, view_context=False)
+            if passes:
+                stem = os.path.splitext(filepath)[0]
+                _capture_normal_pass(scene, f"{stem}_normal.png")
+                _capture_depth_pass(scene, f"{stem}_depth.png")
+    return passes
@@ -0,0 +1,91 @@
+"""
+Blender's end of the launcher's command queue.
+
+The launcher writes the commands for Blender, each with an increasing id,
+to COMMAND_QUEUE_PATH. The inbox hands out the commands newer than the last
+one acknowledged, in id order, and records an acknowledgement for each in
+COMMAND_ACKS_PATH: the id everything up to has been handled, plus the
+status and timings of recent commands, which the launcher turns into
+latency metrics. The queue file is only re-read when it changes on disk.
+"""
+
+import json
+import os
+import time
+
+from . import config
+
+
+def _read_json(path):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+class CommandInbox:
+    def __init__(self, queue_path=None, ack_path=None):
+        self.queue_path = queue_path or config.COMMAND_QUEUE_PATH
+        self.ack_path = ack_path or config.COMMAND_ACKS_PATH
+        self._signature = None
+        self._dirty = False
+        # Continue after the last acknowledged id, so a restarted Blender doesn't replay commands.
+        self._acks = _read_json(self.ack_path) or {}
+        self._acks.setdefault("acked_through", 0)
+        self._acks.setdefault("acks", {})
+        self.last_id = self._acks["acked_through"]
+
+    def pending(self):
+        """Returns the commands not handled yet, oldest first, or [] if the queue is unchanged."""
+        try:
+            stat = os.stat(self.queue_path)
+        except FileNotFoundError:
+            return []
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if signature == self._signature:
+            return []
+
+        queue = _read_json(self.queue_path)
+        if queue is None:
+            return []  # Caught mid-write; try again next tick.
+        self._signature = signature
+
+        if queue.get("next_id", 1) <= self.last_id:
+            # The launcher's ids went backwards (its files were deleted); follow them.
+            self.last_id = queue.get("next_id", 1) - 1
+        received_at = time.time()
+        commands = sorted((c for c in queue.get("commands", []) if c.get("id", 0) > self.last_id),
+                          key=lambda c: c["id"])
+        for command in commands:
+            command["received_at"] = received_at
+        return commands
+
+    def ack(self, command, status="done"):
+        """Marks a command from pending() as handled."""
+        self.last_id = max(self.last_id, command["id"])
+        acks = self._acks["acks"]
+        acks[str(command["id"])] = {
+            "command": command.get("command"),
+            "status": status,
+            "received_at": command.get("received_at"),
+            "done_at": time.time(),
+        }
+        for key in sorted(acks, key=int)[:-config.COMMAND_ACKS_KEPT]:
+            del acks[key]
+        self._acks["acked_through"] = self.last_id
+        self._dirty = True
+
+    def flush(self):
+        """Writes the acknowledgements recorded since the last flush."""
+        if not self._dirty:
+            return
+        temp_path = self.ack_path.with_suffix(".tmp")
+        try:
+            with open(temp_path, 'w') as f:
+                json.dump(self._acks, f, indent=4)
+            os.replace(temp_path, self.ack_path)
+            self._dirty = False
+        except OSError as e:
+            # The launcher may be reading it; retried on the next tick.
+            print(f"WARNING: Could not write command acknowledgements: {e}")
@@ -19,6 +19,9 @@ except NameError:
 DATA_DIR = PROJECT_ROOT / "data"
 FINGERTIPS_JSON_PATH = DATA_DIR / "input" / "fingertips.json"
 STATE_JSON_PATH = DATA_DIR / "input" / "state.json"
+COMMAND_QUEUE_PATH = DATA_DIR / "input" / "command_queue.json" # Commands from the launcher, written by it only.
+COMMAND_ACKS_PATH = DATA_DIR / "input" / "command_acks.json" # Our acknowledgements, written by Blender only.
+COMMAND_ACKS_KEPT = 32 # Per-command ack details kept in the ack file.
 GESTURE_RENDER_PATH = DATA_DIR / "generated_images" / "gestureCamera" / "render.png"
 DEFORM_OBJ_NAME = "Mesh"  # The name of the mesh we will manipulate
 GESTURE_CAMERA_NAME = "GestureCamera" # The camera used for perspective-based mapping
@@ -37,6 +40,19 @@ HAND_SCALE_Y = 5.0
 HAND_SCALE_Z = 5.0
 MARKER_OUT_OF_VIEW_LOCATION = (1000, 1000, 1000)
 MARKER_SURFACE_OFFSET = 0.15
+MARKER_TEMPLATE_NAME = "FingertipTemplate" # The sphere instanced on every fingertip.
+MARKER_CLOUD_NAME = "Fingertips"           # One point per fingertip; instances the template.
+MARKER_MOVE_THRESHOLD = 0.002              # Markers moving less than this are not re-uploaded.
+
+# Draw the cursors, brush radius and flatten plane as a viewport overlay
+# instead of moving the marker objects.
+OVERLAY_ENABLED = True
+OVERLAY_CURSOR_SIZE = 0.05
+OVERLAY_CIRCLE_SEGMENTS = 48
+OVERLAY_LINE_WIDTH = 2.0
+OVERLAY_CURSOR_COLOR = (1.0, 1.0, 1.0, 1.0)
+OVERLAY_BRUSH_COLOR = (0.2, 0.8, 1.0, 0.8)
+OVERLAY_PLANE_COLOR = (1.0, 0.6, 0.1, 0.8)
 SMOOTHING_FACTOR = 0.35
 
 
@@ -52,6 +68,8 @@ RADIUS_LEVELS = [
     {'name': 'large',  'finger': 6.0, 'grab': 3.0, 'flatten': 3.0,   'inflate': 6.0}
 ]
 MAX_DISPLACEMENT_PER_FRAME = 0.25
+STROKE_SPACING = 0.1            # Max world distance between two brush dabs along a finger's path.
+STROKE_MAX_SUBSTEPS = 8         # Upper bound on dabs per tick, however fast the hand moves.
 DEFORM_TIMESTEP = 0.05
 FINGER_FORCE_STRENGTH = 0.13
 GRAB_FORCE_STRENGTH = 20
@@ -66,11 +84,52 @@ VELOCITY_DAMPING_FACTOR = 0.80
 MASS_COHESION_FACTOR = 0.62
 VOLUME_LOWER_LIMIT = 0.8
 VOLUME_UPPER_LIMIT = 1.2
+KD_REBUILD_DRIFT = 0.05         # Rebuild the cached KD-tree once vertices have drifted this far since it was built.
+BVH_REBUILD_FRACTION = 0.1      # Rebuild the cached surface BVH once this fraction of its triangles has moved.
+BVH_MAX_STALE_HITS = 8          # How many moved (stale) triangles a cursor ray may pass through in the cached BVH.
+MIRROR_TOLERANCE = 1e-3         # Max distance between a reflected vertex and its mirror counterpart.
 
 
 # --- Multi-View Rendering & Model Generation ---
 MV_CAMERA_NAME = "mvCamera"
 MV_RENDER_DIR = DATA_DIR / "generated_images" / "multiviewRender"
+# The 6 views: frame number on the mvCamera animation and the output file name.
+# Frame 0 is skipped as per the new layout.
+MV_RENDER_VIEWS = {
+    1: "FRONT.png",
+    2: "FRONT_RIGHT.png",
+    3: "RIGHT.png",
+    4: "BACK.png",
+    5: "LEFT.png",
+    6: "FRONT_LEFT.png"
+}
+MV_RENDER_IN_BACKGROUND = True  # Render the views in headless Blender processes instead of blocking the UI.
+MV_RENDER_WORKERS = 3           # Number of background Blender processes; the views are split evenly between them.
+MV_RENDER_TIMEOUT_SECONDS = 300 # Background workers still running after this are killed and the job fails.
+MV_RENDER_POLL_SECONDS = 0.25   # How often the job checks on its worker processes.
+
+# --- AI Input Capture ---
+# 'FAST' captures use OpenGL drawing instead of a full render. The AI stages only use these
+# images as ControlNet lineart/depth conditioning, so they are captured at the resolution
+# the workflows' preprocessors run at (long side, in pixels).
+CAPTURE_MODE_BY_GENERATION_MODE = {'standard': 'FULL', 'turbo': 'FAST'} # Used when the panel is set to 'Auto'.
+FAST_CAPTURE_RESOLUTION = {'concept': 512, 'multiview': 768}
+RENDER_CACHE_PATH = DATA_DIR / "generated_images" / "render_cache.json" # Fingerprints of the last completed renders.
 GENERATED_MODEL_DIR = DATA_DIR / "generated_models"
 FINAL_MODEL_NAME = "genMesh.glb"
-FINAL_MODEL_PATH = GENERATED_MODEL_DIR / FINAL_MODEL_NAME 
\ No newline at end of file
+FINAL_MODEL_PATH = GENERATED_MODEL_DIR / FINAL_MODEL_NAME
+
+
+# --- Model Import ---
+# Generated models can have hundreds of thousands of faces. The sculptable 'Mesh' is reduced
+# to this budget on import; the full-resolution model is kept, hidden, for renders and export.
+SCULPT_FACE_BUDGET = 50000
+SCULPT_REDUCTION_METHOD = 'DECIMATE' # 'DECIMATE' (collapse, keeps the shape closely) or 'REMESH' (voxel, even topology)
+HIGHRES_OBJ_NAME = "MeshHighRes" 
+CAGE_TRANSFER_NEIGHBORS = 4 # Nearest cage vertices each high-res vertex follows, by inverse-distance weight.
+CAGE_TRANSFER_EVERY_FRAME = False # Also push cage edits to the high-res model every tick (else only before renders).
+
+
+# --- PROFILING ---
+PROFILE_RING_SIZE = 300 # Frames of per-stage timings kept for the rolling stats (10s at 30 fps).
+PROFILE_EXPORT_DIR = DATA_DIR / "profiling"
@@ -0,0 +1,98 @@
+"""
+Fingertip markers drawn as one instanced point cloud.
+
+Instead of ten separate 'Fingertip.NN' objects that are looked up by name
+and moved one at a time, the markers are the vertices of a single mesh
+object that instances the 'FingertipTemplate' sphere on each vertex. All ten
+positions are written with one foreach_set, the object reference is cached
+across ticks, and the depsgraph is only tagged when at least one marker has
+moved further than MARKER_MOVE_THRESHOLD.
+"""
+
+import bpy
+import numpy as np
+
+from . import config
+
+MARKER_COUNT = 10 # Five fingertips for each of the two hands.
+
+
+def ensure_marker_cloud():
+    """
+    Creates the marker point cloud and sets the template up as its instanced
+    child. Legacy per-finger marker objects are removed.
+    """
+    template = bpy.data.objects.get(config.MARKER_TEMPLATE_NAME)
+    cloud = bpy.data.objects.get(config.MARKER_CLOUD_NAME)
+    if cloud is None:
+        mesh = bpy.data.meshes.new(config.MARKER_CLOUD_NAME)
+        mesh.vertices.add(MARKER_COUNT)
+        mesh.vertices.foreach_set("co", np.tile(np.array(config.MARKER_OUT_OF_VIEW_LOCATION, dtype=np.float32), MARKER_COUNT))
+        mesh.update()
+        cloud = bpy.data.objects.new(config.MARKER_CLOUD_NAME, mesh)
+        bpy.context.scene.collection.objects.link(cloud)
+        print(f"Created '{config.MARKER_CLOUD_NAME}'.")
+
+    cloud.instance_type = 'VERTS'
+    cloud.show_instancer_for_viewport = False
+    cloud.show_instancer_for_render = False
+    if template and template.parent != cloud:
+        template.parent = cloud
+        template.matrix_parent_inverse.identity()
+        template.location = (0, 0, 0)
+        template.hide_viewport = False # Hidden templates would hide every instance too.
+
+    for i in range(MARKER_COUNT):
+        legacy = bpy.data.objects.get(f"Fingertip.{i:02d}")
+        if legacy:
+            bpy.data.objects.remove(legacy, do_unlink=True)
+    return cloud
+
+
+class FingertipMarkers:
+    """Writes the ten marker positions to the point cloud in a single batch."""
+
+    def __init__(self):
+        self._cloud = None
+        self._positions = np.tile(np.array(config.MARKER_OUT_OF_VIEW_LOCATION, dtype=np.float32), (MARKER_COUNT, 1))
+
+    def _resolve(self):
+        """Returns the cached cloud object, looking it up again only if it became invalid."""
+        if self._cloud is not None:
+            try:
+                self._cloud.name # Raises ReferenceError if the object was removed (e.g. by undo).
+                return self._cloud
+            except ReferenceError:
+                self._cloud = None
+        self._cloud = bpy.data.objects.get(config.MARKER_CLOUD_NAME)
+        if self._cloud is not None:
+            self._cloud.data.vertices.foreach_get("co", self._positions.ravel())
+        return self._cloud
+
+    def positions(self):
+        """Returns a copy of the last written (MARKER_COUNT, 3) marker positions."""
+        self._resolve()
+        return self._positions.copy()
+
+    def update(self, positions):
+        """
+        Writes new marker positions (an (MARKER_COUNT, 3) world-space array).
+        Markers that moved less than MARKER_MOVE_THRESHOLD keep their old
+        position; if none moved, the mesh is not touched at all.
+        Returns True if the mesh was updated.
+        """
+        cloud = self._resolve()
+        if cloud is None:
+            return False
+
+        positions = np.asarray(positions, dtype=np.float32)
+        moved = np.linalg.norm(positions - self._positions, axis=1) > config.MARKER_MOVE_THRESHOLD
+        if not moved.any():
+            return False
+
+        self._positions[moved] = positions[moved]
+        # The cloud sits at the world origin, so world positions are its local coordinates.
+        mesh = cloud.data
+        mesh.vertices.foreach_set("co", self._positions.ravel())
+        mesh.update()
+        return True
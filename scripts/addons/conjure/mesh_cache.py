@@ -0,0 +1,336 @@
+"""
+Per-mesh topology and spatial caches for the deformation brushes.
+
+Building a KD-tree over every vertex each frame dominates the cost of a
+sculpt tick on large meshes. A MeshCache is built once per mesh (e.g. right
+after a model import) and holds:
+- The vertex adjacency in CSR form (offsets + flat neighbour indices), which
+  only changes when the topology does.
+- A KD-tree over the vertex positions. Sculpting moves vertices, so the tree
+  goes stale; instead of rebuilding it every frame, the cache tracks how far
+  any vertex has drifted since the last build. Range queries are widened by
+  that drift and filtered against the live coordinates, so results stay
+  exact, and the tree is only rebuilt once the drift exceeds KD_REBUILD_DRIFT.
+- A BVH over the triangles, used to snap the fingertip cursors onto the
+  surface. mathutils' BVHTree cannot be refit in place, so triangles touched
+  by a deformation are marked dirty instead: rays skip dirty triangles in
+  the (stale) tree and are tested against their live positions with a
+  vectorized ray/triangle intersection. The tree is only rebuilt once more
+  than BVH_REBUILD_FRACTION of the triangles are dirty.
+- Vertex normals for the normal-dependent brushes (INFLATE, FLATTEN). Face
+  and vertex normals are computed once; afterwards only the triangles
+  incident to moved vertices, and the vertices of those triangles (the
+  affected ring), are recomputed, so the cost scales with the brush size
+  rather than the mesh size. Vertex normals are area-weighted sums of the
+  incident triangle normals.
+- Per-vertex velocities for the viscosity brushes, which are only valid for
+  as long as the topology is.
+- Mirror maps for the symmetry brushes: for each vertex, the index of its
+  counterpart across the local X or Y plane (or -1). They are built once from
+  the KD-tree and kept for as long as the topology is unchanged.
+"""
+
+import mathutils
+from mathutils.bvhtree import BVHTree
+import numpy as np
+
+from . import config
+
+_caches = {}
+
+
+class MeshCache:
+    """Adjacency and spatial index for one mesh datablock."""
+
+    def __init__(self, mesh):
+        self.pointer = mesh.as_pointer()
+        self.vert_count = len(mesh.vertices)
+        self.edge_count = len(mesh.edges)
+
+        # --- Adjacency (CSR) ---
+        edges = np.empty(self.edge_count * 2, dtype=np.int32)
+        mesh.edges.foreach_get("vertices", edges)
+        edges = edges.reshape(-1, 2)
+        # Each edge contributes a neighbour to both of its vertices.
+        sources = np.concatenate((edges[:, 0], edges[:, 1]))
+        targets = np.concatenate((edges[:, 1], edges[:, 0]))
+        order = np.argsort(sources, kind='stable')
+        self.neighbor_indices = targets[order]
+        counts = np.bincount(sources, minlength=self.vert_count)
+        self.neighbor_offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int32)
+
+        # --- Triangles (for ray casts) ---
+        mesh.calc_loop_triangles()
+        triangles = np.empty(len(mesh.loop_triangles) * 3, dtype=np.int32)
+        mesh.loop_triangles.foreach_get("vertices", triangles)
+        self.triangles = triangles.reshape(-1, 3)
+
+        # Vertex -> incident triangles (CSR), for the local normal updates.
+        corners = self.triangles.ravel()
+        order = np.argsort(corners, kind='stable')
+        self.vertex_triangles = (np.arange(len(corners)) // 3)[order].astype(np.int32)
+        counts = np.bincount(corners, minlength=self.vert_count)
+        self.vertex_triangle_offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int32)
+
+        self._kd = None
+        self._drift = 0.0
+        self._bvh = None
+        self._dirty_triangles = np.zeros(len(self.triangles), dtype=bool)
+        self._mirror_maps = {}
+        self.velocities = np.zeros((self.vert_count, 3), dtype=np.float32)
+        self._face_normals = None
+        self.normals = None
+        self._normals_dirty = np.zeros(self.vert_count, dtype=bool)
+
+    def matches(self, mesh):
+        """True if the cache still describes this mesh's topology."""
+        return (self.pointer == mesh.as_pointer()
+                and self.vert_count == len(mesh.vertices)
+                and self.edge_count == len(mesh.edges))
+
+    def neighbors(self, index):
+        """Returns the indices of the vertices sharing an edge with 'index'."""
+        return self.neighbor_indices[self.neighbor_offsets[index]:self.neighbor_offsets[index + 1]]
+
+    def neighbor_mean(self, indices, coords):
+        """
+        Returns the average neighbour position of each vertex in 'indices' as an
+        (M, 3) array, and a mask of the vertices that have any neighbours.
+        """
+        neighbors, rows, counts = _csr_gather(self.neighbor_offsets, self.neighbor_indices, indices)
+        sums = np.zeros((len(indices), 3), dtype=coords.dtype)
+        np.add.at(sums, rows, coords[neighbors])
+        return sums / np.maximum(counts, 1)[:, None], counts > 0
+
+    def vertex_normals(self, indices, coords):
+        """
+        Returns the (M, 3) unit normals of the vertices in 'indices'. Normals
+        invalidated by record_moved are brought up to date first, for the
+        affected ring only.
+        """
+        if self._face_normals is None:
+            self._face_normals = _triangle_normals(self.triangles, coords)
+            self.normals = self._accumulate_normals(np.arange(self.vert_count))
+            self._normals_dirty[:] = False
+        elif self._normals_dirty.any():
+            moved = np.flatnonzero(self._normals_dirty)
+            triangles = np.unique(_csr_gather(self.vertex_triangle_offsets, self.vertex_triangles, moved)[0])
+            self._face_normals[triangles] = _triangle_normals(self.triangles[triangles], coords)
+            ring = np.unique(self.triangles[triangles])
+            self.normals[ring] = self._accumulate_normals(ring)
+            self._normals_dirty[:] = False
+        return self.normals[indices]
+
+    def _accumulate_normals(self, vertices):
+        """Sums and normalizes the incident face normals of the given vertices."""
+        triangles, rows, _ = _csr_gather(self.vertex_triangle_offsets, self.vertex_triangles, vertices)
+        sums = np.zeros((len(vertices), 3), dtype=np.float32)
+        np.add.at(sums, rows, self._face_normals[triangles])
+        lengths = np.linalg.norm(sums, axis=1, keepdims=True)
+        return sums / np.where(lengths > 0.0, lengths, 1.0)
+
+    def volume(self, coords):
+        """Signed volume enclosed by the triangles at the given positions."""
+        v0, v1, v2 = coords[self.triangles[:, 0]], coords[self.triangles[:, 1]], coords[self.triangles[:, 2]]
+        return float(np.einsum('ij,ij->', v0.astype(np.float64), np.cross(v1, v2).astype(np.float64)) / 6.0)
+
+    def build_spatial_index(self, coords):
+        """(Re)builds the KD-tree from an (N, 3) array of local vertex positions."""
+        kd = mathutils.kdtree.KDTree(len(coords))
+        for i, co in enumerate(coords.tolist()):
+            kd.insert(co, i)
+        kd.balance()
+        self._kd = kd
+        self._drift = 0.0
+
+    def record_moved(self, indices, max_distance):
+        """Records that the given vertices moved, none of them further than 'max_distance'."""
+        self._drift += max_distance
+        moved = np.zeros(self.vert_count, dtype=bool)
+        moved[indices] = True
+        self._dirty_triangles |= moved[self.triangles].any(axis=1)
+        self._normals_dirty |= moved
+
+    def mark_dirty(self):
+        """Forces a rebuild of both trees on the next query (e.g. after a global rescale)."""
+        self._kd = None
+        self._bvh = None
+
+    def find_range(self, center, radius, coords):
+        """
+        Returns (indices, distances) of the vertices within 'radius' of 'center',
+        measured against the live positions in 'coords'.
+        """
+        if self._kd is None or self._drift > config.KD_REBUILD_DRIFT:
+            self.build_spatial_index(coords)
+
+        candidates = [index for _, index, _ in self._kd.find_range(center, radius + self._drift)]
+        if not candidates:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        candidates = np.array(candidates, dtype=np.int64)
+        distances = np.linalg.norm(coords[candidates] - np.array(center), axis=1)
+        inside = distances < radius
+        return candidates[inside], distances[inside]
+
+    def mirror_map(self, axis, coords):
+        """
+        Returns an (N,) array mapping each vertex to its mirror image across the
+        local plane perpendicular to 'axis' (0 = X, 1 = Y), or -1 where no vertex
+        lies within MIRROR_TOLERANCE of the reflected position.
+        """
+        mirror = self._mirror_maps.get(axis)
+        if mirror is None:
+            if self._kd is None or self._drift > 0.0:
+                self.build_spatial_index(coords)
+            reflected = coords.copy()
+            reflected[:, axis] *= -1.0
+            mirror = np.full(self.vert_count, -1, dtype=np.int64)
+            for i, co in enumerate(reflected.tolist()):
+                _, index, distance = self._kd.find(co)
+                if distance <= config.MIRROR_TOLERANCE:
+                    mirror[i] = index
+            self._mirror_maps[axis] = mirror
+            print(f"Built {'XY'[axis]} mirror map: {np.count_nonzero(mirror >= 0)}/{self.vert_count} vertices matched.")
+        return mirror
+
+    def build_bvh(self, coords):
+        """(Re)builds the triangle BVH from an (N, 3) array of local vertex positions."""
+        self._bvh = BVHTree.FromPolygons(coords.tolist(), self.triangles.tolist(), all_triangles=True)
+        self._dirty_triangles[:] = False
+
+    def ray_cast_batch(self, origins, directions, coords):
+        """
+        Casts a batch of rays against the mesh surface in local space.
+
+        Args:
+            origins: (R, 3) ray origins.
+            directions: (R, 3) normalized ray directions.
+            coords: (N, 3) live local vertex positions.
+
+        Returns:
+            (distances, normals): (R,) hit distances (inf for a miss) and (R, 3)
+            face normals at the hits.
+        """
+        if self._bvh is None or self._dirty_triangles.mean() > config.BVH_REBUILD_FRACTION:
+            self.build_bvh(coords)
+
+        ray_count = len(origins)
+        distances = np.full(ray_count, np.inf)
+        normals = np.zeros((ray_count, 3))
+
+        # 1. Clean triangles, through the cached tree. A hit on a dirty triangle
+        #    is stale, so the ray continues from just past it.
+        for r in range(ray_count):
+            origin = mathutils.Vector(origins[r])
+            direction = mathutils.Vector(directions[r])
+            travelled = 0.0
+            for _ in range(config.BVH_MAX_STALE_HITS):
+                location, normal, index, distance = self._bvh.ray_cast(origin, direction)
+                if location is None:
+                    break
+                travelled += distance
+                if not self._dirty_triangles[index]:
+                    distances[r] = travelled
+                    normals[r] = normal
+                    break
+                origin = location + direction * 1e-5
+                travelled += 1e-5
+
+        # 2. Dirty triangles, against their live positions, all rays at once.
+        dirty = np.flatnonzero(self._dirty_triangles)
+        if len(dirty):
+            tris = self.triangles[dirty]
+            t, face_normals = _intersect_triangles(origins, directions, coords[tris[:, 0]], coords[tris[:, 1]], coords[tris[:, 2]])
+            nearest = np.argmin(t, axis=1)
+            nearest_t = t[np.arange(ray_count), nearest]
+            closer = nearest_t < distances
+            distances[closer] = nearest_t[closer]
+            normals[closer] = face_normals[nearest[closer]]
+
+        return distances, normals
+
+
+def _csr_gather(offsets, values, rows):
+    """
+    Concatenates the CSR ranges of the given rows in one gather. Returns the
+    flat values, the position in 'rows' each value belongs to, and the
+    number of values per row.
+    """
+    starts = offsets[rows]
+    counts = offsets[rows + 1] - starts
+    row_starts = np.cumsum(counts) - counts
+    flat = np.repeat(starts - row_starts, counts) + np.arange(counts.sum())
+    return values[flat], np.repeat(np.arange(len(rows)), counts), counts
+
+
+def _triangle_normals(triangles, coords):
+    """Area-weighted (unnormalized) normals of the given (T, 3) triangles."""
+    v0, v1, v2 = coords[triangles[:, 0]], coords[triangles[:, 1]], coords[triangles[:, 2]]
+    return np.cross(v1 - v0, v2 - v0).astype(np.float32)
+
+
+def _intersect_triangles(origins, directions, v0, v1, v2):
+    """
+    Vectorized Moller-Trumbore intersection of R rays against D triangles.
+    Returns an (R, D) array of hit distances (inf for a miss) and the (D, 3)
+    unit face normals.
+    """
+    e1 = v1 - v0
+    e2 = v2 - v0
+    p = np.cross(directions[:, None, :], e2[None, :, :])
+    det = np.einsum('rdk,dk->rd', p, e1)
+    valid = np.abs(det) > 1e-12
+    inv_det = np.where(valid, 1.0 / np.where(valid, det, 1.0), 0.0)
+    s = origins[:, None, :] - v0[None, :, :]
+    u = np.einsum('rdk,rdk->rd', s, p) * inv_det
+    q = np.cross(s, e1[None, :, :])
+    v = np.einsum('rdk,rk->rd', q, directions) * inv_det
+    t = np.einsum('rdk,dk->rd', q, e2) * inv_det
+    hit = valid & (u >= 0.0) & (v >= 0.0) & (u + v <= 1.0) & (t > 1e-6)
+
+    face_normals = np.cross(e1, e2)
+    lengths = np.linalg.norm(face_normals, axis=1, keepdims=True)
+    face_normals = face_normals / np.where(lengths > 0.0, lengths, 1.0)
+    return np.where(hit, t, np.inf), face_normals
+
+
+def read_coords(mesh):
+    """Returns the local vertex positions of a mesh as an (N, 3) float array."""
+    coords = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", coords)
+    return coords.reshape(-1, 3)
+
+
+def write_coords(mesh, coords):
+    """
+    Writes (N, 3) local vertex positions back to a mesh. update() without
+    calc_edges only tags the normals and the depsgraph; nothing else about
+    the mesh is rebuilt.
+    """
+    mesh.vertices.foreach_set("co", np.ascontiguousarray(coords, dtype=np.float32).ravel())
+    mesh.update()
+
+
+def get_mesh_cache(mesh_obj):
+    """Returns the cache for an object's mesh, building it if needed."""
+    mesh = mesh_obj.data
+    cache = _caches.get(mesh.name)
+    if cache is None or not cache.matches(mesh):
+        cache = MeshCache(mesh)
+        _caches[mesh.name] = cache
+    return cache
+
+
+def warm(mesh_obj):
+    """Builds the adjacency and spatial caches for a mesh ahead of the first sculpt frame."""
+    cache = get_mesh_cache(mesh_obj)
+    cache.build_spatial_index(read_coords(mesh_obj.data))
+    return cache
+
+
+def invalidate(mesh_obj=None):
+    """Drops the cache for one object's mesh, or all caches if no object is given."""
+    if mesh_obj is None:
+        _caches.clear()
+    else:
+        _caches.pop(mesh_obj.data.name, None)
@@ -0,0 +1,66 @@
+"""
+Background multi-view render worker.
+
+This script is not part of the addon's registered classes. It is executed by
+a separate, headless Blender process started from ops_io.MultiviewRenderJob:
+
+    blender -b snapshot.blend --python mv_render_worker.py -- \
+        --camera mvCamera --outdir <dir> --mode FAST --resolution 768 --passes \
+        --views 1:FRONT.png 4:BACK.png
+
+Each worker opens the scene snapshot, renders the requested frames from the
+multi-view camera and writes one PNG per view. The exit code tells the
+parent process whether every view was written.
+"""
+
+import argparse
+import os
+import sys
+
+import bpy
+
+# The worker runs as a plain script, so the capture helpers are imported
+# from this directory rather than through the addon package.
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import capture
+
+
+def parse_args():
+    # Blender passes everything after '--' through to the script untouched.
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    parser = argparse.ArgumentParser(description="Render CONJURE multi-view images.")
+    parser.add_argument("--camera", required=True, help="Name of the multi-view camera object.")
+    parser.add_argument("--outdir", required=True, help="Directory the PNGs are written to.")
+    parser.add_argument("--views", nargs="+", required=True, help="FRAME:FILENAME pairs to render.")
+    parser.add_argument("--mode", choices=capture.CAPTURE_MODES, default='FULL', help="Capture mode.")
+    parser.add_argument("--resolution", type=int, default=None, help="Long-side resolution for FAST captures.")
+    parser.add_argument("--passes", action="store_true", help="Also write depth/normal passes (FAST only).")
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    scene = bpy.context.scene
+
+    camera = scene.objects.get(args.camera)
+    if not camera:
+        print(f"MV WORKER ERROR: Camera '{args.camera}' not found in snapshot.")
+        return 1
+
+    scene.camera = camera
+    os.makedirs(args.outdir, exist_ok=True)
+
+    for view in args.views:
+        frame, filename = view.split(":", 1)
+        scene.frame_set(int(frame))
+        capture.capture_still(
+            scene, os.path.join(args.outdir, filename), args.mode,
+            resolution=args.resolution, passes=args.passes
+        )
+        print(f"MV WORKER: rendered {filename}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -16,10 +16,18 @@ from pathlib import Path
 import math
 from collections import deque
 import blf # For drawing text on the screen
+import numpy as np
 from bpy_extras.view3d_utils import location_3d_to_region_2d, region_2d_to_vector_3d, region_2d_to_origin_3d
 
 # Import all constants and settings from our new config file
 from . import config
+from . import mesh_cache
+from . import markers
+from . import overlay
+from . import cage
+from . import stroke
+from . import command_inbox
+from .profiling import profiler
 
 
 # --- FLICKER FIX ---
@@ -149,20 +157,13 @@ def setup_scene():
         print(f"Created '{config.GESTURE_CAMERA_NAME}'.")
 
     # Ensure a template object for fingertip markers exists.
-    if "FingertipTemplate" not in bpy.data.objects:
-        bpy.ops.mesh.primitive_ico_sphere_add(radius=0.05, location=(0, 0, -10))
-        bpy.context.active_object.name = "FingertipTemplate"
-        bpy.context.active_object.hide_viewport = True
-        print("Created 'FingertipTemplate'.")
-
-    for i in range(10): # For two hands
-        marker_name = f"Fingertip.{i:02d}"
-        if marker_name not in bpy.data.objects:
-            template = bpy.data.objects.get("FingertipTemplate")
-            if template:
-                marker = template.copy()
-                marker.name = marker_name
-                bpy.context.collection.objects.link(marker)
+    if config.MARKER_TEMPLATE_NAME not in bpy.data.objects:
+        bpy.ops.mesh.primitive_ico_sphere_add(radius=0.05, location=(0, 0, 0))
+        bpy.context.active_object.name = config.MARKER_TEMPLATE_NAME
+        print(f"Created '{config.MARKER_TEMPLATE_NAME}'.")
+
+    # All ten markers are instances of the template on one point cloud.
+    markers.ensure_marker_cloud()
 
 
 # === 2. COORDINATE MAPPING ===
@@ -317,158 +318,188 @@ def deform_mesh(mesh_obj, finger_positions_3d, initial_volume):
 
 
 # === 5. MESH DEFORMATION (with Viscosity) ===
-def deform_mesh_with_viscosity(mesh_obj, finger_positions_3d, initial_volume, vertex_velocities, history_buffer, operator_instance, brush_type='PINCH', hand_move_vector=None):
+def get_effective_radius(brush_type, radius_index):
+    """Returns the influence radius of a brush at the given RADIUS_LEVELS index."""
+    radius_level = config.RADIUS_LEVELS[radius_index]
+    if brush_type == 'GRAB':
+        return radius_level['grab']
+    elif brush_type == 'INFLATE':
+        return radius_level['inflate']
+    elif brush_type == 'FLATTEN':
+        return radius_level['flatten']
+    else: # PINCH, SMOOTH use the default
+        return radius_level['finger']
+
+
+def deform_mesh_with_viscosity(mesh_obj, finger_positions_3d, initial_volume, history_buffer, operator_instance, brush_type='PINCH', hand_move_vector=None, mirror_axis='NONE', finger_paths=None):
     """
     Deforms the mesh by applying forces and simulating viscosity.
     This version updates vertex velocities for a more dynamic and weighty feel.
+
+    The mesh is never copied into a bmesh: vertex positions are read and
+    written as one array with foreach_get/foreach_set, and every brush is
+    evaluated for all vertices in range at once. Velocities live in the
+    mesh's cache (see mesh_cache.py), so they reset when the topology changes.
+
+    finger_paths is an optional (S, K, 3) array of world-space finger
+    positions interpolated along the stroke since the last tick, the last row
+    being finger_positions_3d. Without it the brush is applied once.
     """
     if not mesh_obj:
         return
 
+    mesh = mesh_obj.data
+
+    # Spatial and adjacency lookups go through the per-mesh cache, which keeps
+    # its KD-tree across frames instead of rebuilding it every tick.
+    with profiler.stage("load"):
+        cache = mesh_cache.get_mesh_cache(mesh_obj)
+        coords = mesh_cache.read_coords(mesh)
+
     # --- Save current state to history before deforming ---
     # We only save if there are active forces being applied (for PINCH/GRAB).
-    if finger_positions_3d:
-        current_verts = [v.co.copy() for v in mesh_obj.data.vertices]
-        history_buffer.append(current_verts)
-
-    bm = bmesh.new()
-    bm.from_mesh(mesh_obj.data)
+    with profiler.stage("history"):
+        if finger_positions_3d:
+            history_buffer.append(coords.copy())
 
     world_matrix = mesh_obj.matrix_world
     world_matrix_inv = world_matrix.inverted()
+    world_np = np.array(world_matrix, dtype=np.float32)
+    world_inv_np = np.array(world_matrix_inv, dtype=np.float32)
+
+    # The brush is applied as a batch of dabs: one per interpolated finger set
+    # along this tick's stroke (see stroke.py), or a single dab at the current
+    # fingers. Each dab carries 1/S of the tick's force, so a fast stroke is
+    # spread along its path instead of landing as one spike at the end.
+    if finger_paths is not None:
+        dabs = np.asarray(finger_paths, dtype=np.float32)
+    else:
+        dabs = np.array([[tuple(p) for p in finger_positions_3d]], dtype=np.float32).reshape(1, -1, 3)
+    dab_count = len(dabs)
 
-    # --- 1. Calculate Forces and Update Velocities based on Brush Type ---
-    new_displacements = {}
-    
-    # Create a KDTree for faster spatial lookups, used by all brushes
-    size = len(bm.verts)
-    kd = mathutils.kdtree.KDTree(size)
-    for i, v in enumerate(bm.verts):
-        kd.insert(v.co, i)
-    kd.balance()
-
-    # Ensure the lookup table is fresh before any indexed access.
-    bm.verts.ensure_lookup_table()
-
-    # Determine the center of influence (average of finger positions)
-    influence_center = mathutils.Vector()
-    if finger_positions_3d:
-        for pos in finger_positions_3d:
-            influence_center += world_matrix_inv @ pos # Convert to local space
-        influence_center /= len(finger_positions_3d)
+    # Determine the center of influence of each dab (average of its finger positions), in local space
+    if dabs.shape[1]:
+        centers = dabs.mean(axis=1) @ world_inv_np[:3, :3].T + world_inv_np[:3, 3]
+    else:
+        centers = np.zeros((1, 3), dtype=np.float32)
 
     # Determine the effective radius based on the brush type and current radius level
-    radius_level = config.RADIUS_LEVELS[operator_instance._current_radius_index]
-    if brush_type == 'GRAB':
-        effective_radius = radius_level['grab']
-    elif brush_type == 'INFLATE':
-        effective_radius = radius_level['inflate']
-    elif brush_type == 'FLATTEN':
-        effective_radius = radius_level['flatten']
-    else: # PINCH, SMOOTH use the default
-        effective_radius = radius_level['finger']
-
-    # --- Special pre-calculation for FLATTEN brush ---
-    flatten_plane_center = None
-    flatten_plane_normal = None
-    if brush_type == 'FLATTEN' and finger_positions_3d:
-        verts_in_range_indices = [v_idx for co, v_idx, dist in kd.find_range(influence_center, effective_radius)]
-        if verts_in_range_indices:
-            flatten_plane_center = mathutils.Vector()
-            for v_idx in verts_in_range_indices:
-                flatten_plane_center += bm.verts[v_idx].co
-            flatten_plane_center /= len(verts_in_range_indices)
-
-            flatten_plane_normal = mathutils.Vector()
-            for v_idx in verts_in_range_indices:
-                flatten_plane_normal += bm.verts[v_idx].normal
-            
-            if flatten_plane_normal.length > 0:
-                flatten_plane_normal.normalize()
-
-    # Iterate through vertices within the brush influence
-    for (co, v_idx, dist_from_center) in kd.find_range(influence_center, effective_radius):
-        v = bm.verts[v_idx]
-        current_velocity = vertex_velocities.get(v.index, mathutils.Vector((0,0,0)))
-        force = mathutils.Vector((0, 0, 0))
+    effective_radius = get_effective_radius(brush_type, operator_instance._current_radius_index)
+
+    # All brushes act on the vertices within reach of any dab: one query around
+    # the stroke segment, then each dab's distances are measured directly.
+    with profiler.stage("spatial_query"):
+        stroke_mid = (centers[0] + centers[-1]) * 0.5
+        stroke_reach = float(np.linalg.norm(centers - stroke_mid, axis=1).max())
+        indices, _ = cache.find_range(tuple(stroke_mid), effective_radius + stroke_reach, coords)
+        dab_distances = np.linalg.norm(coords[indices][:, None, :] - centers[None, :, :], axis=2)
+        in_reach = (dab_distances < effective_radius).any(axis=1)
+        indices, dab_distances = indices[in_reach], dab_distances[in_reach]
+
+    operator_instance._flatten_plane = None
+    if not len(indices):
+        return
 
+    # --- 1. Calculate Forces and Update Velocities based on Brush Type ---
+    with profiler.stage("forces"):
+        co = coords[indices]
         # Calculate a smooth falloff based on distance from the brush center.
         # This is the key to making the brushes feel natural and not jagged.
-        falloff = (1.0 - (dist_from_center / effective_radius))**2
+        dab_falloff = np.clip(1.0 - dab_distances / effective_radius, 0.0, None) ** 2
+        falloff = dab_falloff.mean(axis=1).astype(np.float32)[:, None]
+        forces = np.zeros_like(co)
 
-        if brush_type == 'PINCH':
+        if brush_type == 'PINCH' and dabs.shape[1]:
             # PINCH has its own special falloff based on distance to each finger,
             # so we don't use the centered falloff.
-            v_world = world_matrix @ v.co
-            for finger_pos in finger_positions_3d:
-                to_finger = finger_pos - v_world
-                dist = to_finger.length
-                if dist < effective_radius:
-                    pinch_falloff = (1.0 - (dist / effective_radius))**2
-                    force += to_finger.normalized() * config.FINGER_FORCE_STRENGTH * pinch_falloff
+            v_world = co @ world_np[:3, :3].T + world_np[:3, 3]
+            to_finger = dabs[None, :, :, :] - v_world[:, None, None, :]
+            dist = np.linalg.norm(to_finger, axis=3)
+            pinch_falloff = np.where(dist < effective_radius, (1.0 - dist / effective_radius) ** 2, 0.0)
+            directions = to_finger / np.maximum(dist, 1e-12)[..., None]
+            forces = (directions * pinch_falloff[..., None]).sum(axis=(1, 2)) * (config.FINGER_FORCE_STRENGTH / dab_count)
 
         elif brush_type == 'GRAB':
             # Moves vertices along with the hand's movement vector, scaled by falloff.
             if hand_move_vector:
-                force = hand_move_vector * config.GRAB_FORCE_STRENGTH * falloff
+                forces = np.array(tuple(hand_move_vector), dtype=np.float32) * config.GRAB_FORCE_STRENGTH * falloff
 
         elif brush_type == 'SMOOTH':
             # Moves vertices towards their neighbors' average position, scaled by falloff.
-            neighbor_avg_pos = mathutils.Vector()
-            linked_verts = [e.other_vert(v) for e in v.link_edges]
-            if linked_verts:
-                for nv in linked_verts:
-                    neighbor_avg_pos += nv.co
-                neighbor_avg_pos /= len(linked_verts)
-                force = (neighbor_avg_pos - v.co) * config.SMOOTH_FORCE_STRENGTH * falloff
-        
-        elif brush_type == 'INFLATE':
-            # Pushes vertices outwards along their normal, scaled by falloff.
-            force = v.normal * config.INFLATE_FORCE_STRENGTH * falloff
-
-        elif brush_type == 'FLATTEN':
-            # Pushes vertices towards a plane, scaled by falloff.
-            if flatten_plane_center and flatten_plane_normal:
-                dist_to_plane = (v.co - flatten_plane_center).dot(flatten_plane_normal)
-                force = -flatten_plane_normal * dist_to_plane * config.FLATTEN_FORCE_STRENGTH * falloff
+            neighbor_avg, has_neighbors = cache.neighbor_mean(indices, coords)
+            forces = (neighbor_avg - co) * config.SMOOTH_FORCE_STRENGTH * falloff
+            forces[~has_neighbors] = 0.0
+
+        elif brush_type in ('INFLATE', 'FLATTEN'):
+            # Normals come from the cache, which only refreshes the ring around
+            # the vertices moved since the last query.
+            with profiler.stage("normals"):
+                normals = cache.vertex_normals(indices, coords)
+            if brush_type == 'INFLATE':
+                # Pushes vertices outwards along their normal, scaled by falloff.
+                forces = normals * config.INFLATE_FORCE_STRENGTH * falloff
+            elif finger_positions_3d:
+                # Pushes vertices towards the average plane of the brush footprint.
+                plane_center = co.mean(axis=0)
+                plane_normal = normals.sum(axis=0)
+                length = np.linalg.norm(plane_normal)
+                if length > 0:
+                    plane_normal /= length
+                    dist_to_plane = (co - plane_center) @ plane_normal
+                    forces = -plane_normal * dist_to_plane[:, None] * config.FLATTEN_FORCE_STRENGTH * falloff
+                    # Expose the plane in world space for the viewport overlay.
+                    operator_instance._flatten_plane = (
+                        world_matrix @ mathutils.Vector(plane_center),
+                        (world_matrix_inv.transposed().to_3x3() @ mathutils.Vector(plane_normal)).normalized(),
+                    )
 
         # Update velocity: add force and apply damping
-        new_velocity = (current_velocity + force) * config.VELOCITY_DAMPING_FACTOR
-        vertex_velocities[v.index] = new_velocity
-        
+        velocities = (cache.velocities[indices] + forces) * config.VELOCITY_DAMPING_FACTOR
+        cache.velocities[indices] = velocities
+
         # Calculate the displacement for this frame
-        displacement = new_velocity * config.DEFORM_TIMESTEP
-        if displacement.length > config.MAX_DISPLACEMENT_PER_FRAME:
-            displacement = displacement.normalized() * config.MAX_DISPLACEMENT_PER_FRAME
-        
-        new_displacements[v.index] = displacement
+        displacements = velocities * config.DEFORM_TIMESTEP
+        lengths = np.linalg.norm(displacements, axis=1)
+        too_long = lengths > config.MAX_DISPLACEMENT_PER_FRAME
+        displacements[too_long] *= (config.MAX_DISPLACEMENT_PER_FRAME / lengths[too_long])[:, None]
+
+    # --- 1b. Mirror Symmetry ---
+    # The brush is evaluated once; its displacements and velocities are reflected
+    # onto the mirror counterparts from the precomputed index map. Vertices the
+    # brush reached directly keep their own result.
+    with profiler.stage("mirror"):
+        if mirror_axis in ('X', 'Y'):
+            axis = 'XY'.index(mirror_axis)
+            targets = cache.mirror_map(axis, coords)[indices]
+            keep = (targets >= 0) & (targets != indices) & ~np.isin(targets, indices)
+            reflect = np.ones(3, dtype=np.float32)
+            reflect[axis] = -1.0
+            cache.velocities[targets[keep]] = velocities[keep] * reflect
+            indices = np.concatenate((indices, targets[keep]))
+            displacements = np.concatenate((displacements, displacements[keep] * reflect))
 
     # --- 2. Apply Displacements ---
-    if new_displacements:
-        for v_index, displacement in new_displacements.items():
-            bm.verts.ensure_lookup_table()
-            # For GRAB, the displacement is in world space, others are local. This is a simplification.
-            # A more robust implementation would handle spaces more carefully.
-            bm.verts[v_index].co += displacement
+    # For GRAB, the displacement is in world space, others are local. This is a simplification.
+    # A more robust implementation would handle spaces more carefully.
+    with profiler.stage("apply"):
+        coords[indices] += displacements
+        cache.record_moved(indices, float(np.linalg.norm(displacements, axis=1).max()))
 
     # --- 3. Volume Preservation ---
-    current_volume = bm.calc_volume(signed=True)
-    if initial_volume != 0:
-        volume_ratio = current_volume / initial_volume
-        if volume_ratio < config.VOLUME_LOWER_LIMIT or volume_ratio > config.VOLUME_UPPER_LIMIT:
-            target_ratio = max(config.VOLUME_LOWER_LIMIT, min(volume_ratio, config.VOLUME_UPPER_LIMIT))
-            scale_factor = (target_ratio / volume_ratio)**(1/3)
-            centroid = mathutils.Vector()
-            for v in bm.verts:
-                centroid += v.co
-            centroid /= len(bm.verts)
-            for v in bm.verts:
-                v.co = centroid + (v.co - centroid) * scale_factor
+    with profiler.stage("volume"):
+        current_volume = cache.volume(coords)
+        if initial_volume != 0:
+            volume_ratio = current_volume / initial_volume
+            if volume_ratio < config.VOLUME_LOWER_LIMIT or volume_ratio > config.VOLUME_UPPER_LIMIT:
+                target_ratio = max(config.VOLUME_LOWER_LIMIT, min(volume_ratio, config.VOLUME_UPPER_LIMIT))
+                scale_factor = (target_ratio / volume_ratio)**(1/3)
+                centroid = coords.mean(axis=0)
+                coords[:] = centroid + (coords - centroid) * scale_factor
+                cache.mark_dirty()
 
     # --- 4. Finalize ---
-    bm.to_mesh(mesh_obj.data)
-    bm.free()
-    mesh_obj.data.update()
+    with profiler.stage("write"):
+        mesh_cache.write_coords(mesh, coords)
 
 
 # === 6. BLENDER MODAL OPERATOR ===
@@ -481,7 +512,6 @@ class ConjureFingertipOperator(bpy.types.Operator):
     _last_command = "none"
     _initial_camera_matrix = None
     _initial_volume = 1.0 # Default value
-    _vertex_velocities = {} # Stores the velocity of each vertex for viscosity simulation
     _history_buffer = None # Holds previous mesh states for the rewind feature
     _current_brush_index = 0
     _current_radius_index = 0
@@ -489,6 +519,11 @@ class ConjureFingertipOperator(bpy.types.Operator):
     _draw_handler = None # For drawing the UI text
     _last_orbit_delta = {"x": 0.0, "y": 0.0}
     marker_states = []
+    _markers = None # Batched writer for the fingertip marker cloud
+    _overlay = None # gpu overlay for the cursors and brush (replaces the marker cloud when enabled)
+    _flatten_plane = None # (center, normal) of the last FLATTEN plane, in world space
+    _stroke = None # Interpolates finger paths between ticks
+    _inbox = None # Commands queued by the launcher
 
     def get_mesh_volume(self, mesh_obj):
         """Calculates the volume of a given mesh object using bmesh."""
@@ -518,6 +553,7 @@ class ConjureFingertipOperator(bpy.types.Operator):
     def handle_spawn_primitive(self, primitive_type):
         """
         Spawns a new primitive by duplicating it from the 'PRIMITIVES' collection.
+        Returns True if it was spawned.
         """
         print(f"DEBUG: handle_spawn_primitive received type: {primitive_type}")
 
@@ -533,7 +569,7 @@ class ConjureFingertipOperator(bpy.types.Operator):
             source_collections = bpy.data.collections.get("PRIMITIVES")
             if not source_collections:
                  print("ERROR: Could not find the 'PRIMITIVES' or 'CONJURE SETUP/PRIMITIVES' collection.")
-            return
+            return False
 
         print(f"DEBUG: Found source collection: {source_collections.name}")
 
@@ -541,7 +577,7 @@ class ConjureFingertipOperator(bpy.types.Operator):
         
         if not template_obj:
             print(f"ERROR: Primitive '{primitive_type}' not found in collection '{source_collections.name}'.")
-            return
+            return False
         
         print(f"DEBUG: Found template object: {template_obj.name}")
 
@@ -567,7 +603,116 @@ class ConjureFingertipOperator(bpy.types.Operator):
         # --- 5. Recalculate Initial Volume for Deformation ---
         self._initial_volume = self.get_mesh_volume(new_obj)
         print(f"Set initial volume for new mesh: {self._initial_volume}")
+        return True
+
+    def snap_to_surface(self, world_positions):
+        """
+        Projects fingertip positions onto the visible surface of the deform mesh.
+
+        A ray is cast from the GestureCamera towards each fingertip. If it hits
+        the mesh before reaching the fingertip, the fingertip is behind or
+        inside the surface and is moved onto the hit point, offset along the
+        surface normal. All rays are cast in one batch against the mesh's
+        cached BVH (see mesh_cache.py), so nothing is re-evaluated per ray.
+        """
+        mesh_obj = bpy.data.objects.get(config.DEFORM_OBJ_NAME)
+        camera = bpy.data.objects.get(config.GESTURE_CAMERA_NAME)
+        if not world_positions or not mesh_obj or not camera or mesh_obj.type != 'MESH':
+            return world_positions
+
+        cache = mesh_cache.get_mesh_cache(mesh_obj)
+        coords = mesh_cache.read_coords(mesh_obj.data)
+
+        world_matrix = mesh_obj.matrix_world
+        world_matrix_inv = world_matrix.inverted()
+        normal_matrix = world_matrix_inv.transposed().to_3x3()
+        origin = world_matrix_inv @ camera.matrix_world.translation
+
+        targets = [world_matrix_inv @ pos for pos in world_positions]
+        directions = [(target - origin).normalized() for target in targets]
+        distances, normals = cache.ray_cast_batch(
+            np.array([origin] * len(targets)), np.array(directions), coords
+        )
+
+        snapped = []
+        for pos, target, direction, hit_distance, normal in zip(world_positions, targets, directions, distances, normals):
+            if hit_distance < (target - origin).length:
+                hit_location = world_matrix @ (origin + direction * float(hit_distance))
+                hit_normal = (normal_matrix @ mathutils.Vector(normal)).normalized()
+                snapped.append(hit_location + hit_normal * config.MARKER_SURFACE_OFFSET)
+            else:
+                snapped.append(pos)
+        return snapped
+
+    def update_fingertip_markers(self, context):
+        """
+        Maps the tracked fingertips into the scene, smooths and surface-snaps
+        them, and writes them to the marker cloud. Markers 0-4 belong to the
+        left hand and 5-9 to the right hand. Fills self.visible_fingers with
+        the fingertips that are currently tracked.
+        """
+        targets = {}
+        for hand_key, first_marker in (("left_hand", 0), ("right_hand", 5)):
+            hand = self.hand_data.get(hand_key) or {}
+            for i, tip in enumerate((hand.get("fingertips") or [])[:5]):
+                targets[first_marker + i] = map_hand_to_3d_space(tip["x"], tip["y"], tip["z"])
+
+        # Smooth the raw positions first, then snap the smoothed cursors in one batch.
+        smoothed = {}
+        for i, target in targets.items():
+            state = self.marker_states[i]
+            if state['missing_frames'] > config.HIDE_GRACE_PERIOD_FRAMES:
+                smoothed[i] = target # Reappearing marker: don't lerp in from far away.
+            else:
+                smoothed[i] = state['last_pos'].lerp(target, config.SMOOTHING_FACTOR)
+            state['last_pos'] = smoothed[i]
+            state['missing_frames'] = 0
+        snapped = dict(zip(smoothed.keys(), self.snap_to_surface(list(smoothed.values()))))
+
+        self.visible_fingers = []
+        positions = self._markers.positions()
+        for i, state in enumerate(self.marker_states):
+            if i in snapped:
+                self.visible_fingers.append({'index': i, 'world_pos': snapped[i]})
+                positions[i] = snapped[i]
+            else:
+                # Keep a briefly lost marker in place to avoid flicker, then hide it.
+                state['missing_frames'] += 1
+                if state['missing_frames'] > config.HIDE_GRACE_PERIOD_FRAMES:
+                    positions[i] = config.MARKER_OUT_OF_VIEW_LOCATION
+        if not self._overlay:
+            self._markers.update(positions)
+
+    def update_overlay(self):
+        """Feeds the current cursors, brush and flatten plane to the viewport overlay."""
+        camera = bpy.data.objects.get(config.GESTURE_CAMERA_NAME)
+        if not self._overlay or not camera:
+            return
 
+        brush_type = config.BRUSH_TYPES[self._current_brush_index]
+        brush_center = self.get_hand_center()
+        brush_radius = get_effective_radius(brush_type, self._current_radius_index)
+        mesh_obj = bpy.data.objects.get(config.DEFORM_OBJ_NAME)
+        if mesh_obj:
+            # Brush radii are measured in the mesh's local space.
+            brush_radius *= max(mesh_obj.matrix_world.to_scale())
+
+        self._overlay.update(
+            [finger['world_pos'] for finger in self.visible_fingers],
+            camera.matrix_world,
+            brush_center=brush_center,
+            brush_radius=brush_radius,
+            flatten_plane=self._flatten_plane if brush_type == 'FLATTEN' and brush_center is not None else None,
+        )
+
+    def get_hand_center(self):
+        """Returns the average world position of the visible fingertips, or None."""
+        if not self.visible_fingers:
+            return None
+        center = mathutils.Vector()
+        for finger in self.visible_fingers:
+            center += finger['world_pos']
+        return center / len(self.visible_fingers)
 
     def draw_ui_text(self, context):
         """Draws the current brush name on the viewport."""
@@ -588,52 +733,39 @@ class ConjureFingertipOperator(bpy.types.Operator):
         blf.draw(font_id, f"Radius: {active_radius}")
 
     def check_for_launcher_requests(self):
-        """Checks state.json for commands from the launcher/agent."""
-        # --- Define the absolute path to state.json relative to this script ---
-        # This is the most robust way to ensure we're always looking in the right place.
-        state_file_path = Path(__file__).parent.parent.parent / "data" / "input" / "state.json"
-
-        # Read the state file
-        try:
-            with open(state_file_path, 'r') as f:
-                state_data = json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            return # File not found or invalid JSON, nothing to do
-
-        command = state_data.get("command")
-        if command:
-            print(f"DEBUG: Operator detected command '{command}' in state file.")
-
-        if command == "spawn_primitive":
-            primitive_type = state_data.get("primitive_type")
-            if primitive_type:
-                self.handle_spawn_primitive(primitive_type)
-                # Clear the command in the state file so it doesn't run again
-                print(f"DEBUG: Clearing command '{command}' from state file.")
-                state_data["command"] = None
-                state_data["primitive_type"] = None
-                with open(state_file_path, 'w') as f:
-                    json.dump(state_data, f, indent=4)
-        
-        # We can add more command handlers here with elif blocks
-        elif command == "import_last_model":
-            # We need to override the context to ensure the operator runs in the 3D view
-            area = next((a for a in bpy.context.screen.areas if a.type == 'VIEW_3D'), None)
-            if area:
-                try:
-                    print("DEBUG: Executing bpy.ops.conjure.import_model() with context override.")
-                    with bpy.context.temp_override(area=area):
-                        bpy.ops.conjure.import_model('EXEC_DEFAULT')
-                except Exception as e:
-                    print(f"ERROR: Failed to execute conjure.import_model operator: {e}")
+        """Runs the commands the launcher queued for Blender, in order, and acknowledges them."""
+        for entry in self._inbox.pending():
+            command = entry.get("command")
+            params = entry.get("params") or {}
+            print(f"DEBUG: Operator received command #{entry['id']} '{command}'.")
+
+            if command == "spawn_primitive":
+                primitive_type = params.get("primitive_type")
+                status = "done" if primitive_type and self.handle_spawn_primitive(primitive_type) else "failed"
+            elif command == "import_last_model":
+                status = self.handle_import_last_model()
             else:
-                print("ERROR: Could not find a 3D View area to run the import operator.")
-            
-            # Clear the command
-            print(f"DEBUG: Clearing command '{command}' from state file.")
-            state_data["command"] = None
-            with open(state_file_path, 'w') as f:
-                json.dump(state_data, f, indent=4)
+                # Acknowledged anyway, so an unknown command can't hold up the ones behind it.
+                print(f"WARNING: No handler for launcher command '{command}'.")
+                status = "unsupported"
+            self._inbox.ack(entry, status)
+        self._inbox.flush()
+
+    def handle_import_last_model(self):
+        """Imports the last generated model. Returns the command status."""
+        # We need to override the context to ensure the operator runs in the 3D view
+        area = next((a for a in bpy.context.screen.areas if a.type == 'VIEW_3D'), None)
+        if not area:
+            print("ERROR: Could not find a 3D View area to run the import operator.")
+            return "failed"
+        try:
+            print("DEBUG: Executing bpy.ops.conjure.import_model() with context override.")
+            with bpy.context.temp_override(area=area):
+                bpy.ops.conjure.import_model('EXEC_DEFAULT')
+        except Exception as e:
+            print(f"ERROR: Failed to execute conjure.import_model operator: {e}")
+            return "failed"
+        return "done"
 
     def modal(self, context, event):
         # The UI panel can set this property to signal the operator to stop
@@ -650,16 +782,20 @@ class ConjureFingertipOperator(bpy.types.Operator):
 
         # --- Main Logic on Timer Tick ---
         if event.type == 'TIMER':
+            profiler.begin_frame()
+
             # Add this call to poll for external commands
-            self.check_for_launcher_requests()
+            with profiler.stage("launcher_requests"):
+                self.check_for_launcher_requests()
 
             # --- 1. Read Hand Data ---
-            try:
-                with open(config.FINGERTIPS_JSON_PATH, 'r') as f:
-                    self.hand_data = json.load(f)
-            except (FileNotFoundError, json.JSONDecodeError):
-                self.hand_data = {} # Reset if file is missing or corrupt
-                pass # Continue silently if the file isn't ready
+            with profiler.stage("read_hand_data"):
+                try:
+                    with open(config.FINGERTIPS_JSON_PATH, 'r') as f:
+                        self.hand_data = json.load(f)
+                except (FileNotFoundError, json.JSONDecodeError):
+                    self.hand_data = {} # Reset if file is missing or corrupt
+                    pass # Continue silently if the file isn't ready
 
             # --- 2. Process Commands & Gestures ---
             command = self.hand_data.get("command", "none")
@@ -671,16 +807,19 @@ class ConjureFingertipOperator(bpy.types.Operator):
             radius_change_request = self.hand_data.get("change_radius", 0) # -1 for prev, 1 for next
 
             # Update the brush or radius if requested
-            if brush_change_request != 0:
-                self.handle_brush_change(brush_change_request)
-            if radius_change_request != 0:
-                self.handle_radius_change(radius_change_request)
+            with profiler.stage("brush_radius"):
+                if brush_change_request != 0:
+                    self.handle_brush_change(brush_change_request)
+                if radius_change_request != 0:
+                    self.handle_radius_change(radius_change_request)
 
             # --- 3. Update Camera Orbit ---
-            self.handle_camera_orbit(rotation_delta)
+            with profiler.stage("orbit"):
+                self.handle_camera_orbit(rotation_delta)
 
             # --- 4. Update Fingertip Markers ---
-            self.update_fingertip_markers(context)
+            with profiler.stage("markers"):
+                self.update_fingertip_markers(context)
 
             # --- 5. Perform Mesh Deformation ---
             deform_obj = bpy.data.objects.get(config.DEFORM_OBJ_NAME)
@@ -696,22 +835,34 @@ class ConjureFingertipOperator(bpy.types.Operator):
                         hand_move_vector = current_hand_center - self._last_hand_center
                 
                 # Always use the viscosity-based deformation now
-                self.deform_mesh_with_viscosity(
-                    deform_obj,
-                    [f['world_pos'] for f in self.visible_fingers],
-                    self._initial_volume,
-                    self._vertex_velocities,
-                    self._history_buffer,
-                    self,
-                    brush_type=brush_type,
-                    hand_move_vector=hand_move_vector
-                )
+                with profiler.stage("deform"):
+                    finger_paths = self._stroke.sample(self.visible_fingers)
+                    deform_mesh_with_viscosity(
+                        deform_obj,
+                        [f['world_pos'] for f in self.visible_fingers],
+                        self._initial_volume,
+                        self._history_buffer,
+                        self,
+                        brush_type=brush_type,
+                        hand_move_vector=hand_move_vector,
+                        mirror_axis=context.scene.conjure_settings.symmetry_axis,
+                        finger_paths=finger_paths
+                    )
+                with profiler.stage("cage_sync"):
+                    if config.CAGE_TRANSFER_EVERY_FRAME:
+                        cage.sync(context.scene)
+            else:
+                # Lifting the hand ends the stroke, so the next one doesn't connect to it.
+                self._stroke.reset()
 
             # --- 6. Handle Gesture-based Rendering ---
-            if closed_fist_detected and not self.last_closed_fist_state:
-                self.handle_gesture_render()
+            with profiler.stage("gesture_render"):
+                if closed_fist_detected and not self.last_closed_fist_state:
+                    self.handle_gesture_render()
 
             # --- 7. Update State & Redraw ---
+            with profiler.stage("overlay"):
+                self.update_overlay()
             self.last_closed_fist_state = closed_fist_detected
             self._last_hand_center = self.get_hand_center() # Update for next frame
             
@@ -719,6 +870,8 @@ class ConjureFingertipOperator(bpy.types.Operator):
             if context.area:
                 context.area.tag_redraw()
 
+            profiler.end_frame()
+
         return {'PASS_THROUGH'}
 
     def execute(self, context):
@@ -741,27 +894,26 @@ class ConjureFingertipOperator(bpy.types.Operator):
         # Calculate and store the initial volume of the mesh
         mesh_obj = bpy.data.objects.get(config.DEFORM_OBJ_NAME)
         if mesh_obj:
-            bm = bmesh.new()
-            bm.from_mesh(mesh_obj.data)
-            self._initial_volume = bm.calc_volume(signed=True)
-            # Initialize velocities for all vertices to zero
-            self._vertex_velocities = {v.index: mathutils.Vector((0,0,0)) for v in bm.verts}
-            bm.free()
+            # Vertex velocities start at zero in the mesh's cache.
+            cache = mesh_cache.get_mesh_cache(mesh_obj)
+            self._initial_volume = cache.volume(mesh_cache.read_coords(mesh_obj.data))
             print(f"Initial mesh volume calculated: {self._initial_volume}")
         else:
             self._initial_volume = 1.0
-            self._vertex_velocities = {}
             print("Warning: Could not find 'Mesh' object to calculate initial volume.")
 
         # Initialize the state for each of the 10 markers
+        self._markers = markers.FingertipMarkers()
         self.marker_states = []
-        for i in range(10):
-            marker_obj = bpy.data.objects.get(f"Fingertip.{i:02d}")
-            initial_pos = marker_obj.location.copy() if marker_obj else mathutils.Vector((0,0,0))
+        for initial_pos in self._markers.positions():
             self.marker_states.append({
-                'last_pos': initial_pos,
+                'last_pos': mathutils.Vector(initial_pos),
                 'missing_frames': 0
             })
+        self.hand_data = {}
+        self.visible_fingers = []
+        self._stroke = stroke.StrokeSampler()
+        self._inbox = command_inbox.CommandInbox()
 
         # Reset the orbit delta tracker
         self._last_orbit_delta = {"x": 0.0, "y": 0.0}
@@ -773,6 +925,14 @@ class ConjureFingertipOperator(bpy.types.Operator):
         # Add the draw handler for the UI text
         self._draw_handler = bpy.types.SpaceView3D.draw_handler_add(self.draw_ui_text, (context,), 'WINDOW', 'POST_PIXEL')
 
+        # The overlay replaces the marker objects, so the cloud is hidden while it runs.
+        if config.OVERLAY_ENABLED:
+            self._overlay = overlay.BrushOverlay()
+            self._overlay.add()
+            cloud = bpy.data.objects.get(config.MARKER_CLOUD_NAME)
+            if cloud:
+                cloud.hide_viewport = True
+
         return {'RUNNING_MODAL'}
 
     def cancel(self, context):
@@ -784,6 +944,12 @@ class ConjureFingertipOperator(bpy.types.Operator):
         if self._draw_handler:
             bpy.types.SpaceView3D.draw_handler_remove(self._draw_handler, 'WINDOW')
             self._draw_handler = None
+        if self._overlay:
+            self._overlay.remove()
+            self._overlay = None
+            cloud = bpy.data.objects.get(config.MARKER_CLOUD_NAME)
+            if cloud:
+                cloud.hide_viewport = False
 
         context.window_manager.event_timer_remove(self._timer)
         print("Conjure Fingertip Operator has been cancelled.")
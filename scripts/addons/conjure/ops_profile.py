@@ -0,0 +1,47 @@
+"""
+Operators for the profiling controls in the CONJURE panel.
+"""
+
+import time
+
+import bpy
+
+from . import config
+from .profiling import profiler
+
+
+class CONJURE_OT_toggle_cprofile(bpy.types.Operator):
+    """Starts or stops a cProfile capture of the running operator"""
+    bl_idname = "conjure.toggle_cprofile"
+    bl_label = "Toggle cProfile Capture"
+
+    def execute(self, context):
+        if profiler.cprofile_active:
+            path = config.PROFILE_EXPORT_DIR / f"capture_{time.strftime('%Y%m%d_%H%M%S')}.prof"
+            profiler.stop_cprofile(path)
+            self.report({'INFO'}, f"cProfile capture saved to {path}")
+        else:
+            profiler.start_cprofile()
+            self.report({'INFO'}, "cProfile capture started.")
+        return {'FINISHED'}
+
+
+class CONJURE_OT_export_profile(bpy.types.Operator):
+    """Exports the rolling per-stage frame timings"""
+    bl_idname = "conjure.export_profile"
+    bl_label = "Export Frame Timings"
+
+    file_format: bpy.props.EnumProperty(
+        name="Format",
+        items=[('json', "JSON", ""), ('csv', "CSV", "")],
+        default='json'
+    )
+
+    def execute(self, context):
+        if not profiler.frames:
+            self.report({'WARNING'}, "No frames recorded yet. Start CONJURE first.")
+            return {'CANCELLED'}
+        path = config.PROFILE_EXPORT_DIR / f"frame_timings_{time.strftime('%Y%m%d_%H%M%S')}.{self.file_format}"
+        profiler.export(path)
+        self.report({'INFO'}, f"Frame timings exported to {path}")
+        return {'FINISHED'}
@@ -0,0 +1,142 @@
+"""
+Viewport overlay for the fingertip cursors and the active brush.
+
+Everything is drawn from a POST_VIEW draw handler with the gpu module, so
+showing the cursors, the brush radius and the flatten plane does not move
+any scene objects or trigger depsgraph evaluation. All shapes go into one
+cached line batch with per-vertex colors; the batch is only rebuilt when
+the cursor positions, brush or camera actually change.
+"""
+
+import math
+
+import bpy
+import gpu
+import numpy as np
+from gpu_extras.batch import batch_for_shader
+
+from . import config
+
+
+def _flat_color_shader():
+    # The builtin shader names lost their '3D_' prefix in Blender 4.0.
+    try:
+        return gpu.shader.from_builtin('FLAT_COLOR')
+    except ValueError:
+        return gpu.shader.from_builtin('3D_FLAT_COLOR')
+
+
+def _circle(center, axis_x, axis_y, radius, segments):
+    """Returns the (2 * segments, 3) line-segment endpoints of a circle."""
+    angles = np.linspace(0.0, 2.0 * math.pi, segments + 1)
+    points = center + radius * (np.outer(np.cos(angles), axis_x) + np.outer(np.sin(angles), axis_y))
+    return np.stack((points[:-1], points[1:]), axis=1).reshape(-1, 3)
+
+
+def _plane_axes(normal):
+    """Returns two unit vectors spanning the plane with the given normal."""
+    helper = np.array((0.0, 0.0, 1.0)) if abs(normal[2]) < 0.9 else np.array((1.0, 0.0, 0.0))
+    axis_x = np.cross(normal, helper)
+    axis_x /= np.linalg.norm(axis_x)
+    return axis_x, np.cross(normal, axis_x)
+
+
+class BrushOverlay:
+    """Cached line batch for the cursors, brush radius and flatten plane."""
+
+    def __init__(self):
+        self._handler = None
+        self._shader = None
+        self._batch = None
+        self._key = None
+
+    def add(self):
+        self._shader = _flat_color_shader()
+        self._handler = bpy.types.SpaceView3D.draw_handler_add(self.draw, (), 'WINDOW', 'POST_VIEW')
+
+    def remove(self):
+        if self._handler:
+            bpy.types.SpaceView3D.draw_handler_remove(self._handler, 'WINDOW')
+            self._handler = None
+        self._batch = None
+        self._key = None
+
+    def update(self, cursors, camera_matrix, brush_center=None, brush_radius=0.0, flatten_plane=None):
+        """
+        Rebuilds the batch if anything visible changed.
+
+        Args:
+            cursors: World-space fingertip positions.
+            camera_matrix: World matrix of the GestureCamera; circles face it.
+            brush_center: World-space center of the brush, or None to hide it.
+            brush_radius: World-space radius of the brush.
+            flatten_plane: (center, normal) of the FLATTEN plane in world space, or None.
+
+        Returns:
+            True if the batch was rebuilt.
+        """
+        cursors = np.array([tuple(c) for c in cursors], dtype=np.float32).reshape(-1, 3)
+        camera = np.array(camera_matrix, dtype=np.float32)
+        center = np.array(brush_center, dtype=np.float32) if brush_center is not None else None
+        plane = np.array([tuple(v) for v in flatten_plane], dtype=np.float32) if flatten_plane else None
+
+        key = (cursors, camera, center, float(brush_radius), plane)
+        if self._key is not None and self._same(key, self._key):
+            return False
+        self._key = key
+
+        # The camera's local X and Y axes span the plane the circles are drawn in.
+        axis_x, axis_y = camera[:3, 0], camera[:3, 1]
+        axis_x = axis_x / np.linalg.norm(axis_x)
+        axis_y = axis_y / np.linalg.norm(axis_y)
+
+        segments, colors = [], []
+
+        def add_lines(points, color):
+            segments.append(points)
+            colors.append(np.tile(color, (len(points), 1)))
+
+        for cursor in cursors:
+            add_lines(_circle(cursor, axis_x, axis_y, config.OVERLAY_CURSOR_SIZE, 12), config.OVERLAY_CURSOR_COLOR)
+
+        if center is not None and brush_radius > 0.0:
+            add_lines(_circle(center, axis_x, axis_y, brush_radius, config.OVERLAY_CIRCLE_SEGMENTS), config.OVERLAY_BRUSH_COLOR)
+
+        if plane is not None:
+            plane_center, plane_normal = plane
+            plane_x, plane_y = _plane_axes(plane_normal / np.linalg.norm(plane_normal))
+            corners = [plane_center + brush_radius * (sx * plane_x + sy * plane_y) for sx, sy in ((-1, -1), (1, -1), (1, 1), (-1, 1))]
+            outline = np.array([p for i in range(4) for p in (corners[i], corners[(i + 1) % 4])])
+            normal_line = np.array([plane_center, plane_center + plane_normal * brush_radius * 0.5])
+            add_lines(np.concatenate((outline, normal_line)), config.OVERLAY_PLANE_COLOR)
+
+        if not segments:
+            self._batch = None
+            return True
+
+        self._batch = batch_for_shader(
+            self._shader, 'LINES',
+            {"pos": np.concatenate(segments).astype(np.float32), "color": np.concatenate(colors).astype(np.float32)},
+        )
+        return True
+
+    @staticmethod
+    def _same(a, b):
+        """Compares two state keys, ignoring cursor jitter below MARKER_MOVE_THRESHOLD."""
+        for new, old in zip(a, b):
+            if isinstance(new, np.ndarray) or isinstance(old, np.ndarray):
+                if new is None or old is None or new.shape != old.shape:
+                    return False
+                if not np.allclose(new, old, atol=config.MARKER_MOVE_THRESHOLD, rtol=0.0):
+                    return False
+            elif new != old:
+                return False
+        return True
+
+    def draw(self):
+        if self._batch is None:
+            return
+        gpu.state.line_width_set(config.OVERLAY_LINE_WIDTH)
+        gpu.state.depth_test_set('NONE')
+        self._batch.draw(self._shader)
+        gpu.state.line_width_set(1.0)
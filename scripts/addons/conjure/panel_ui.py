@@ -1,4 +1,5 @@
 import bpy
+from .profiling import profiler
 
 
 class CONJURE_PT_ui_panel(bpy.types.Panel):
@@ -14,6 +15,7 @@ class CONJURE_PT_ui_panel(bpy.types.Panel):
 
         # Main Operator Button
         layout.operator("conjure.fingertip_operator", text="Start/Stop CONJURE")
+        layout.prop(scene.conjure_settings, "symmetry_axis")
 
         # IO Operators
         box = layout.box()
@@ -21,6 +23,8 @@ class CONJURE_PT_ui_panel(bpy.types.Panel):
         
         # Add the dropdown for generation mode
         box.prop(scene.conjure_settings, "generation_mode")
+        box.prop(scene.conjure_settings, "capture_mode")
+        box.prop(scene.conjure_settings, "capture_passes")
 
         box.operator("conjure.generate_concepts", text="Generate Concepts")
         
@@ -37,6 +41,17 @@ class CONJURE_PT_ui_panel(bpy.types.Panel):
         agent_box.prop(scene, "conjure_user_input", text="")
         agent_box.operator("conjure.send_to_agent", text="Send")
 
+        # Profiling
+        profile_box = layout.box()
+        profile_box.label(text="Profiling")
+        if profiler.cprofile_active:
+            profile_box.operator("conjure.toggle_cprofile", text="Stop cProfile Capture", icon='PAUSE')
+        else:
+            profile_box.operator("conjure.toggle_cprofile", text="Start cProfile Capture", icon='REC')
+        row = profile_box.row(align=True)
+        row.operator("conjure.export_profile", text="Export JSON").file_format = 'json'
+        row.operator("conjure.export_profile", text="Export CSV").file_format = 'csv'
+
 
 class CONJURE_PG_settings(bpy.types.PropertyGroup):
     generation_mode: bpy.props.EnumProperty(
@@ -47,4 +62,29 @@ class CONJURE_PG_settings(bpy.types.PropertyGroup):
             ('turbo', "Turbo", "Use the fast, real-time turbo models.")
         ],
         default='standard'
-    ) 
\ No newline at end of file
+    )
+    capture_mode: bpy.props.EnumProperty(
+        name="Capture",
+        description="How the images sent to the AI pipeline are rendered.",
+        items=[
+            ('AUTO', "Auto", "Fast capture in Turbo mode, full render in Standard mode."),
+            ('FULL', "Full Render", "Render with the scene's render engine."),
+            ('FAST', "Fast Capture", "OpenGL capture at the resolution the workflows use.")
+        ],
+        default='AUTO'
+    )
+    capture_passes: bpy.props.BoolProperty(
+        name="Depth/Normal Passes",
+        description="With fast capture, also write depth and normal passes so ComfyUI can skip its depth estimator.",
+        default=True
+    ) 
+    symmetry_axis: bpy.props.EnumProperty(
+        name="Symmetry",
+        description="Mirror every brush stroke across the mesh's local X or Y plane.",
+        items=[
+            ('NONE', "Off", "No symmetry."),
+            ('X', "X", "Mirror across the local YZ plane."),
+            ('Y', "Y", "Mirror across the local XZ plane.")
+        ],
+        default='NONE'
+    )
@@ -0,0 +1,137 @@
+"""
+Lightweight per-frame profiling for the modal operator.
+
+Stages are timed with a context manager. Nested stages are recorded under
+their full path ('tick/deform/forces'), so a slow frame can be traced to
+the exact step that caused it. Each finished frame is pushed into a ring
+buffer of PROFILE_RING_SIZE samples, from which rolling statistics are
+computed and exported as JSON or CSV.
+
+An on-demand cProfile capture can be switched on from the panel for
+function-level detail; it is written as a .prof file when stopped.
+
+Usage:
+    profiler.begin_frame()
+    with profiler.stage("deform"):
+        with profiler.stage("forces"):
+            ...
+    profiler.end_frame()
+"""
+
+import cProfile
+import csv
+import io
+import json
+import pstats
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+
+from . import config
+
+
+class FrameProfiler:
+    """Hierarchical stage timer with a rolling window of per-frame samples."""
+
+    def __init__(self, size=None):
+        self.frames = deque(maxlen=size or config.PROFILE_RING_SIZE)
+        self._stack = []
+        self._current = None
+        self._frame_start = None
+        self._cprofile = None
+
+    # --- Stage timing ---
+
+    def begin_frame(self):
+        self._current = {}
+        self._stack = []
+        self._frame_start = time.perf_counter()
+
+    def end_frame(self):
+        if self._current is None:
+            return
+        self._current["frame"] = (time.perf_counter() - self._frame_start) * 1000.0
+        self.frames.append(self._current)
+        self._current = None
+
+    @contextmanager
+    def stage(self, name):
+        """Times the enclosed block. Outside a frame this is a no-op."""
+        if self._current is None:
+            yield
+            return
+        self._stack.append(name)
+        path = "/".join(self._stack)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            # A stage entered several times in one frame accumulates.
+            self._current[path] = self._current.get(path, 0.0) + (time.perf_counter() - start) * 1000.0
+            self._stack.pop()
+
+    # --- Rolling statistics ---
+
+    def stats(self):
+        """Returns {stage: {count, mean_ms, p95_ms, max_ms}} over the buffered frames."""
+        samples = {}
+        for frame in self.frames:
+            for path, ms in frame.items():
+                samples.setdefault(path, []).append(ms)
+        result = {}
+        for path, values in sorted(samples.items()):
+            values = np.array(values)
+            result[path] = {
+                "count": len(values),
+                "mean_ms": float(values.mean()),
+                "p95_ms": float(np.percentile(values, 95)),
+                "max_ms": float(values.max()),
+            }
+        return result
+
+    def export(self, path):
+        """Writes the rolling stats to 'path'; the format follows the extension (.json or .csv)."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        stats = self.stats()
+        if path.suffix == ".csv":
+            with open(path, 'w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(["stage", "count", "mean_ms", "p95_ms", "max_ms"])
+                for stage, row in stats.items():
+                    writer.writerow([stage, row["count"], f"{row['mean_ms']:.3f}", f"{row['p95_ms']:.3f}", f"{row['max_ms']:.3f}"])
+        else:
+            with open(path, 'w') as f:
+                json.dump({"frames": len(self.frames), "stages": stats}, f, indent=4)
+        print(f"Exported profile of {len(self.frames)} frames to {path}")
+
+    # --- cProfile capture ---
+
+    @property
+    def cprofile_active(self):
+        return self._cprofile is not None
+
+    def start_cprofile(self):
+        if self._cprofile is None:
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+            print("cProfile capture started.")
+
+    def stop_cprofile(self, path):
+        """Stops the capture, writes it to 'path' and prints the top functions."""
+        if self._cprofile is None:
+            return None
+        self._cprofile.disable()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._cprofile.dump_stats(str(path))
+        summary = io.StringIO()
+        pstats.Stats(self._cprofile, stream=summary).sort_stats("cumulative").print_stats(20)
+        print(summary.getvalue())
+        self._cprofile = None
+        print(f"cProfile capture written to {path}")
+        return path
+
+
+# The shared profiler used by the modal operator and the deformation code.
+profiler = FrameProfiler()
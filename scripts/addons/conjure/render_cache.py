@@ -0,0 +1,101 @@
+"""
+Skip-if-unchanged caching for the AI input renders.
+
+A render is fingerprinted by the deformable mesh's vertex buffer (read with
+foreach_get), its transform, the camera's transform, lens and animation
+keys, and the capture settings. When the fingerprint of a new request
+matches the last completed render of the same kind and the output files are
+still on disk, the render is skipped and the existing images are reused.
+Asking for new concepts with only a changed prompt therefore costs no
+rendering at all.
+"""
+
+import hashlib
+import json
+
+import numpy as np
+
+from . import config
+
+
+def _update_with_matrix(digest, matrix):
+    digest.update(np.array(matrix, dtype=np.float32).tobytes())
+
+
+def _update_with_camera(digest, camera):
+    _update_with_matrix(digest, camera.matrix_world)
+    cam = camera.data
+    digest.update(repr((cam.type, cam.lens, cam.sensor_width, cam.ortho_scale, cam.shift_x, cam.shift_y)).encode())
+
+    # The multi-view camera is animated over frames 1-6, so its keys are part of the view.
+    action = camera.animation_data.action if camera.animation_data else None
+    if action:
+        for fcurve in action.fcurves:
+            keys = np.empty(len(fcurve.keyframe_points) * 2, dtype=np.float32)
+            fcurve.keyframe_points.foreach_get("co", keys)
+            digest.update(f"{fcurve.data_path}[{fcurve.array_index}]".encode())
+            digest.update(keys.tobytes())
+
+
+def render_fingerprint(mesh_obj, camera, settings=()):
+    """
+    Returns a hex digest identifying what a render of mesh_obj from camera
+    would look like, or None if there is nothing to fingerprint.
+
+    Args:
+        mesh_obj: The deformable mesh object.
+        camera: The camera object the render is taken from.
+        settings: Any extra values that change the output (capture mode, resolution...).
+    """
+    if not mesh_obj or mesh_obj.type != 'MESH' or not camera:
+        return None
+
+    digest = hashlib.blake2b(digest_size=16)
+    mesh = mesh_obj.data
+    coords = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", coords)
+    digest.update(coords.tobytes())
+    digest.update(np.array([len(mesh.vertices), len(mesh.polygons), len(mesh.loops)], dtype=np.int64).tobytes())
+    _update_with_matrix(digest, mesh_obj.matrix_world)
+    _update_with_camera(digest, camera)
+    digest.update(repr(settings).encode())
+    return digest.hexdigest()
+
+
+def _load():
+    try:
+        with open(config.RENDER_CACHE_PATH, 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def is_cached(key, fingerprint, output_paths):
+    """
+    True if the last completed render stored under 'key' has the same
+    fingerprint and all of its output files still exist.
+    """
+    if fingerprint is None:
+        return False
+    if _load().get(key) != fingerprint:
+        return False
+    return all(path.exists() for path in output_paths)
+
+
+def store(key, fingerprint):
+    """Records the fingerprint of a completed render."""
+    if fingerprint is None:
+        return
+    cache = _load()
+    cache[key] = fingerprint
+    config.RENDER_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    with open(config.RENDER_CACHE_PATH, 'w') as f:
+        json.dump(cache, f, indent=4)
+
+
+def invalidate(key):
+    """Forgets the fingerprint stored under 'key' (e.g. before a render that may fail)."""
+    cache = _load()
+    if cache.pop(key, None) is not None:
+        with open(config.RENDER_CACHE_PATH, 'w') as f:
+            json.dump(cache, f, indent=4)
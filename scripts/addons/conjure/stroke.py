@@ -0,0 +1,54 @@
+"""
+Sub-frame stroke sampling for the deformation brushes.
+
+Hand tracking arrives at the operator's tick rate, so a fast hand can jump
+a long way between two ticks. Applying the brush only at the newest finger
+positions leaves gaps along the path and concentrates the whole tick's force
+in one spot, where it is then clipped by MAX_DISPLACEMENT_PER_FRAME.
+
+The StrokeSampler remembers where every finger was on the previous tick and
+interpolates each finger's path to the current position. The path is cut
+into evenly spaced steps no longer than STROKE_SPACING (at most
+STROKE_MAX_SUBSTEPS), and the resulting (S, K, 3) array of finger positions
+is handed to deform_mesh_with_viscosity, which evaluates all S dabs in one
+vectorized pass.
+"""
+
+import math
+
+import numpy as np
+
+from . import config
+
+
+class StrokeSampler:
+    """Interpolates fingertip paths between consecutive tracker samples."""
+
+    def __init__(self):
+        self._previous = {}
+
+    def reset(self):
+        """Ends the current stroke; the next sample starts a new one."""
+        self._previous.clear()
+
+    def sample(self, fingers):
+        """
+        Returns the interpolated finger positions since the last call.
+
+        Args:
+            fingers: The visible fingers, as {'index', 'world_pos'} dicts.
+
+        Returns:
+            An (S, K, 3) array for the K given fingers. The last row is the
+            current position; fingers that just appeared stay in place.
+        """
+        current = np.array([tuple(f['world_pos']) for f in fingers], dtype=np.float32).reshape(-1, 3)
+        previous = np.array(
+            [self._previous.get(f['index'], tuple(f['world_pos'])) for f in fingers], dtype=np.float32
+        ).reshape(-1, 3)
+        self._previous = {f['index']: tuple(f['world_pos']) for f in fingers}
+
+        travel = float(np.linalg.norm(current - previous, axis=1).max()) if len(current) else 0.0
+        steps = min(max(math.ceil(travel / config.STROKE_SPACING), 1), config.STROKE_MAX_SUBSTEPS)
+        t = np.arange(1, steps + 1, dtype=np.float32) / steps
+        return previous[None, :, :] + (current - previous)[None, :, :] * t[:, None, None]